@@ -0,0 +1,256 @@
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import time
+from typing import Callable, Dict, List
+
+import snakes.snakes_pb2 as snakes
+from game.engine import GameEngine
+from game.field_manager import FieldManager
+from game.player_manager import Player
+from server import field_manager_class
+from transport import MessageDispatcher
+
+
+# Snakes are laid out in rows with an empty row between them, all crawling LEFT into the gap in front
+# of them, so the field stays in the same steady state for as long as the benchmark runs.
+SCENARIOS = {
+    "default": dict(width=40, height=30, snakes=4, length=4, food=1, seed=1),
+    "medium": dict(width=100, height=100, snakes=50, length=10, food=50, seed=2),
+    "crowded": dict(width=100, height=100, snakes=300, length=15, food=200, seed=3),
+    "sparse_food": dict(width=100, height=100, snakes=100, length=10, food=0, seed=4),
+    "huge": dict(width=1000, height=1000, snakes=3000, length=20, food=2000, seed=5),
+}
+DEFAULT_SCENARIOS = ["default", "medium", "crowded", "sparse_food"]
+
+
+
+class NullTimer:
+    lateness = 0.0
+    skipped = 0
+
+    def start(self, first_delay_ms=None) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+
+class NullNetworkHandler:
+    """Lets a GameEngine run without sockets; only counts what it would have sent."""
+    host = "127.0.0.1"
+    port = 0
+
+    def __init__(self):
+        self.dispatcher = MessageDispatcher()
+        self.sent_bytes = 0
+        self.sent_datagrams = 0
+
+    def multicast(self, message: snakes.GameMessage):
+        pass
+
+    def multicastBytes(self, data: bytes):
+        pass
+
+    def unicast(self, message: snakes.GameMessage, host: str, port: int):
+        self.unicastBytes(message.SerializeToString(), host, port)
+
+    def unicastBytes(self, data: bytes, host: str, port: int):
+        self.sent_bytes += len(data)
+        self.sent_datagrams += 1
+
+    def createTimer(self, delay_ms: int, callback) -> NullTimer:
+        return NullTimer()
+
+
+def snakeRowsMsg(width: int, height: int, count: int, length: int) -> List[snakes.GameState.Snake]:
+    per_row = width // (length + 1)
+    if per_row * (height // 2) < count:
+        raise ValueError(f"{count} snakes of length {length} do not fit on a {width}x{height} field")
+    message_snakes = list()
+    for i in range(count):
+        points = [snakes.GameState.Coord(x=i % per_row * (length + 1), y=i // per_row * 2)]
+        points.extend(snakes.GameState.Coord(x=1, y=0) for _ in range(length - 1))
+        message_snakes.append(snakes.GameState.Snake(
+            player_id=i + 1,
+            points=points,
+            head_direction=snakes.Direction.LEFT,
+            state=snakes.GameState.Snake.SnakeState.ALIVE
+        ))
+    return message_snakes
+
+
+def buildField(field_class, scenario: dict) -> FieldManager:
+    random.seed(scenario["seed"])
+    field_manager = field_class(width=scenario["width"], height=scenario["height"], food_static=scenario["food"])
+    field_manager.snakesFromMsg(snakeRowsMsg(scenario["width"], scenario["height"], scenario["snakes"],
+                                             scenario["length"]))
+    field_manager._replenishFood()
+    return field_manager
+
+
+def buildEngine(field_class, scenario: dict) -> GameEngine:
+    engine = GameEngine(
+        game_name="benchmark",
+        field_width=scenario["width"],
+        field_height=scenario["height"],
+        food_static=scenario["food"],
+        state_delay_ms=100,
+        network_handler=NullNetworkHandler(),
+        client_name="benchmark",
+        client_requested_role=snakes.NodeRole.MASTER,
+        existing_players=None,
+        update_callback=lambda: None,
+        field_manager_class=field_class
+    )
+    engine.start(is_host=True, master_host="127.0.0.1", master_port=0, host_plays=False)
+    engine.field_manager = buildField(field_class, scenario)
+    for i in range(scenario["snakes"]):
+        engine.player_manager.addPlayer(Player(
+            name=f"player-{i + 1}",
+            id=i + 1,
+            ip_address="127.0.0.1",
+            port=10000 + i,
+            supports_state_delta=True
+        ))
+    return engine
+
+
+def measure(run: Callable, repeat: int, setup: Callable = lambda: None) -> Dict[str, float]:
+    timings = list()
+    for _ in range(repeat):
+        argument = setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            run(argument)
+            timings.append((time.perf_counter_ns() - start) / 1e6)
+        finally:
+            gc.enable()
+    return {
+        "repeat": repeat,
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "max_ms": max(timings),
+    }
+
+
+def benchScenario(field_class, scenario: dict, repeat: int) -> Dict[str, Dict[str, float]]:
+    results = dict()
+    width, height = scenario["width"], scenario["height"]
+
+    field_manager = buildField(field_class, scenario)
+    results["tick"] = measure(lambda _: field_manager.tick(), repeat)
+
+    field_manager = buildField(field_class, scenario)
+
+    def invalidateSpawnSites():
+        field_manager._invalidateSpawnSites()
+    results["getPosForNewSnake"] = measure(lambda _: field_manager.getPosForNewSnake(), repeat,
+                                           setup=invalidateSpawnSites)
+
+    def clearFood():
+        field_manager.foodFromMsg([])
+    results["_replenishFood"] = measure(lambda _: field_manager._replenishFood(), repeat, setup=clearFood)
+
+    results["Snake.asMsg"] = measure(
+        lambda _: [snake.asMsg(width, height) for snake in field_manager.getSnakes()], repeat
+    )
+
+    message_snakes = [snake.asMsg(width, height) for snake in field_manager.getSnakes()]
+    results["snakesFromMsg"] = measure(
+        lambda client: client.snakesFromMsg(message_snakes), repeat,
+        setup=lambda: FieldManager(width=width, height=height, food_static=scenario["food"])
+    )
+
+    engine = buildEngine(field_class, scenario)
+
+    def dropEncodings():
+        # Every snake moves each tick, so a real state never finds its encoding cached.
+        for snake in engine.field_manager.getSnakes():
+            snake._encoded = None
+        for player in engine.player_manager.getPlayers():
+            player._encoded = None
+    results["state.serialize"] = measure(lambda _: engine._buildGameStateBody(), repeat, setup=dropEncodings)
+    state_size = len(engine._buildGameStateBody())
+
+    network_handler = engine.network_handler
+    network_handler.sent_bytes = network_handler.sent_datagrams = 0
+    results["engine.tick"] = measure(lambda _: engine._tick(), repeat)
+    results["engine.tick"]["bytes_per_tick"] = network_handler.sent_bytes / repeat
+    results["engine.tick"]["datagrams_per_tick"] = network_handler.sent_datagrams / repeat
+    results["state.serialize"]["bytes"] = state_size
+    return results
+
+
+def gitRevision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def printComparison(report: dict, baseline: dict) -> None:
+    baseline_results = {result["scenario"]: result["benchmarks"] for result in baseline["results"]}
+    for result in report["results"]:
+        old = baseline_results.get(result["scenario"])
+        if old is None:
+            continue
+        for name, timing in result["benchmarks"].items():
+            if name not in old:
+                continue
+            ratio = timing["median_ms"] / old[name]["median_ms"] if old[name]["median_ms"] > 0 else float("inf")
+            print(f"{result['scenario']:<12} {name:<20} {old[name]['median_ms']:10.3f}ms -> "
+                  f"{timing['median_ms']:10.3f}ms  x{ratio:.2f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seeded benchmarks of the tick engine")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS.keys()),
+                        help=f"may be given several times, {', '.join(DEFAULT_SCENARIOS)} by default")
+    parser.add_argument("--backend", choices=("reference", "numpy"), default="reference")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of every benchmark")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare medians with")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(format="[%(levelname)s]: %(message)s", level=logging.ERROR)
+    field_class = field_manager_class(args.backend)
+    report = {
+        "revision": gitRevision(),
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": list(),
+    }
+    for name in args.scenario or DEFAULT_SCENARIOS:
+        scenario = SCENARIOS[name]
+        benchmarks = benchScenario(field_class, scenario, args.repeat)
+        report["results"].append({"scenario": name, "config": scenario, "benchmarks": benchmarks})
+        for benchmark, timing in benchmarks.items():
+            print(f"{name:<12} {benchmark:<20} median={timing['median_ms']:10.3f}ms "
+                  f"min={timing['min_ms']:10.3f}ms")
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            printComparison(report, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
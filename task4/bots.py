@@ -0,0 +1,500 @@
+import argparse
+import asyncio
+import logging
+import signal
+import time
+from collections import Counter, deque
+from typing import Dict, List, Set, Tuple, Union
+
+import snakes.snakes_pb2 as snakes
+from game.field_manager import FieldManager, Snake
+from game.packetizer import StateReassembler
+from game.reliability import ReliableDelivery
+from headless_network import AsyncioNetworkHandler
+from server import bounded_int
+
+
+STEP = {
+    snakes.Direction.UP: (0, -1),
+    snakes.Direction.DOWN: (0, 1),
+    snakes.Direction.LEFT: (-1, 0),
+    snakes.Direction.RIGHT: (1, 0),
+}
+
+
+def chooseDirection(blocked: Set[Tuple[int, int]], food: Set[Tuple[int, int]], width: int, height: int,
+                    head: Tuple[int, int], direction: snakes.Direction, length: int,
+                    search_limit: int) -> snakes.Direction:
+    """Flood-fills from every cell the head can step into, at most search_limit cells each.
+
+    A move is safe if it leads into at least min(length, search_limit) free cells; among safe moves
+    the one closest to food wins, otherwise the move with the most room."""
+    best_direction, best_key = direction, None
+    needed_room = min(length, search_limit)
+    for new_direction, (dx, dy) in STEP.items():
+        if Snake.steer_block[new_direction] == direction:
+            continue
+        start = ((head[0] + dx) % width, (head[1] + dy) % height)
+        if start in blocked:
+            continue
+        food_distance = None
+        seen = {start}
+        frontier = deque(((start, 0),))
+        while frontier and len(seen) < search_limit:
+            (x, y), distance = frontier.popleft()
+            if food_distance is None and (x, y) in food:
+                food_distance = distance
+            for step_x, step_y in STEP.values():
+                cell = ((x + step_x) % width, (y + step_y) % height)
+                if cell not in seen and cell not in blocked:
+                    seen.add(cell)
+                    frontier.append((cell, distance + 1))
+        key = (len(seen) >= needed_room, food_distance is not None, -(food_distance or 0), len(seen))
+        if best_key is None or key > best_key:
+            best_direction, best_key = new_direction, key
+    return best_direction
+
+
+
+class Metrics:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = dict()
+        self.counters: Counter = Counter()
+
+    def record(self, name: str, value_ms: float) -> None:
+        self.samples.setdefault(name, list()).append(value_ms)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def report(self) -> str:
+        lines = list()
+        for name, values in sorted(self.samples.items()):
+            values.sort()
+            lines.append(
+                f"  {name:<12} n={len(values):<7} mean={sum(values) / len(values):8.2f}ms "
+                f"p50={self._percentile(values, 50):8.2f}ms p95={self._percentile(values, 95):8.2f}ms "
+                f"p99={self._percentile(values, 99):8.2f}ms max={values[-1]:8.2f}ms"
+            )
+        if self.counters:
+            lines.append("  " + " ".join(f"{name}={value}" for name, value in sorted(self.counters.items())))
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.counters.clear()
+
+    @staticmethod
+    def _percentile(values: List[float], percent: int) -> float:
+        return values[min(len(values) - 1, len(values) * percent // 100)]
+
+
+
+class SharedWorld:
+    """The latest game state, decoded once and shared by every bot of the swarm.
+
+    Every bot receives its own copy of each state datagram; only the first one to arrive is applied."""
+
+    def __init__(self, width: int, height: int):
+        self.field_manager = FieldManager(width=width, height=height, food_static=0)
+        self.state_order = -1
+        self.has_keyframe = False
+        self._view_order = None
+        self._blocked: Set[Tuple[int, int]] = set()
+        self._food: Set[Tuple[int, int]] = set()
+        self._snakes_by_id: Dict[int, Snake] = dict()
+
+    def onState(self, state: snakes.GameState) -> None:
+        if state.state_order <= self.state_order:
+            return
+        self.field_manager.foodFromMsg(state.foods)
+        self.field_manager.snakesFromMsg(state.snakes)
+        self.state_order = state.state_order
+        self.has_keyframe = True
+
+    def onDelta(self, delta: snakes.GameStateDelta) -> bool:
+        if delta.state_order <= self.state_order:
+            return True
+        if not self.has_keyframe or delta.base_state_order != self.state_order:
+            return False
+        if not self.field_manager.applyDeltaMsg(delta):
+            self.has_keyframe = False
+            return False
+        self.state_order = delta.state_order
+        return True
+
+    def _refreshView(self) -> None:
+        if self._view_order == self.state_order:
+            return
+        width, height = self.field_manager.width, self.field_manager.height
+        self._snakes_by_id = {snake.player_id: snake for snake in self.field_manager.getSnakes()}
+        self._food = self.field_manager.getFood()
+        self._blocked = set()
+        for snake in self._snakes_by_id.values():
+            self._blocked.add((snake.head_x % width, snake.head_y % height))
+            self._blocked.update((x % width, y % height) for x, y in snake.tail)
+        self._view_order = self.state_order
+
+    def steer(self, player_id: int, search_limit: int) -> Union[snakes.Direction, None]:
+        self._refreshView()
+        snake = self._snakes_by_id.get(player_id)
+        if snake is None:
+            return None
+        width, height = self.field_manager.width, self.field_manager.height
+        direction = chooseDirection(
+            self._blocked, self._food, width, height,
+            (snake.head_x % width, snake.head_y % height), snake.direction, len(snake.tail) + 1, search_limit
+        )
+        return None if direction == snake.direction else direction
+
+
+
+class Bot:
+    """Minimal ROBOT player: joins, keeps the connection alive, steers and measures the master.
+
+    Unlike GameEngine it only ever talks to the MASTER, so a swarm does not ping itself quadratically."""
+    DROPPED_AFTER_STATES = 10
+    REQUESTED_ROLE = snakes.NORMAL
+    HANDLED_TYPES = ("ack", "state", "state_delta", "role_change", "error")
+
+    def __init__(self, swarm: "Swarm", network_handler: AsyncioNetworkHandler, name: str):
+        self.swarm = swarm
+        self.network_handler = network_handler
+        for message_type in self.HANDLED_TYPES:
+            self.network_handler.dispatcher.addHandler(message_type, self._onMessage)
+        self.name = name
+        self.player_id: Union[int, None] = None
+        self.master_id: Union[int, None] = None
+        self.alive = False
+        self.__msg_seq = 0
+        self._join_seq: Union[int, None] = None
+        self._reliability = ReliableDelivery(
+            initial_rto_s=swarm.state_delay_ms / 10 / 1000,
+            max_rto_s=swarm.state_delay_ms / 1000,
+            granularity_s=swarm.state_delay_ms / 10 / 1000
+        )
+        self._state_parts = StateReassembler(timeout_s=swarm.state_delay_ms / 1000)
+        self._last_message_sent = 0
+        self._last_state_arrival: Union[int, None] = None
+        self._last_state_order = -1
+        self._last_steer_order = -1
+        self._timer = self.network_handler.createTimer(swarm.state_delay_ms // 10, self._onTimer)
+
+    def _msg_seq(self):
+        msg_seq = self.__msg_seq
+        self.__msg_seq += 1
+        return msg_seq
+
+    def start(self) -> None:
+        joinMessage = snakes.GameMessage(
+            msg_seq=self._msg_seq(),
+            join=snakes.GameMessage.JoinMsg(
+                player_type=snakes.ROBOT,
+                player_name=self.name,
+                game_name=self.swarm.game_name,
+                requested_role=self.REQUESTED_ROLE,
+                supports_state_delta=True,
+                supports_state_chunks=True
+            )
+        )
+        self._join_seq = joinMessage.msg_seq
+        self._send(joinMessage, expect_ack=True)
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+        for message_type in self.HANDLED_TYPES:
+            self.network_handler.dispatcher.removeHandler(message_type, self._onMessage)
+        self.network_handler.close()
+
+    def _send(self, message: snakes.GameMessage, expect_ack: bool = False) -> None:
+        if self.player_id is not None:
+            message.sender_id = self.player_id
+            message.receiver_id = self.master_id
+        if expect_ack:
+            self._reliability.track(message, *self.swarm.master_address)
+        self.network_handler.unicast(message, *self.swarm.master_address)
+        self._last_message_sent = time.perf_counter_ns()
+
+    def _acknowledge(self, message: snakes.GameMessage) -> None:
+        ackMessage = snakes.GameMessage(
+            msg_seq=message.msg_seq,
+            sender_id=message.receiver_id,
+            receiver_id=message.sender_id,
+            ack=snakes.GameMessage.AckMsg()
+        )
+        self.network_handler.unicast(ackMessage, *self.swarm.master_address)
+
+    def _onTimer(self) -> None:
+        if self._last_state_arrival is not None and time.perf_counter_ns() - self._last_state_arrival > \
+                self.DROPPED_AFTER_STATES * self.swarm.state_delay_ms * 1e6:
+            # The MASTER has kicked us and will not answer anymore.
+            logging.debug(f"{self.name}#{self.player_id} got no state for too long, giving up")
+            self.alive = False
+            self.swarm.metrics.count("dropped")
+            self._timer.stop()
+            return
+        dropped = self._reliability.dropped
+        for pending in self._reliability.due():
+            self.network_handler.unicast(pending.message, *self.swarm.master_address)
+            self.swarm.metrics.count("retransmits")
+        if self._reliability.dropped > dropped:
+            self.swarm.metrics.count("lost", self._reliability.dropped - dropped)
+        if self.player_id is not None and \
+                time.perf_counter_ns() - self._last_message_sent > self.swarm.state_delay_ms // 10 * 1e6:
+            self._send(snakes.GameMessage(msg_seq=self._msg_seq(), ping=snakes.GameMessage.PingMsg()))
+
+    def _onMessage(self, message: snakes.GameMessage, host: str, port: int):
+        try:
+            match message.WhichOneof("Type"):
+                case "ack":
+                    self._onAck(message)
+                case "state":
+                    message = self._state_parts.add(message)
+                    if message is None:
+                        return
+                    self._onState(message)
+                case "state_delta":
+                    self._onStateArrival(message.state_delta.delta.state_order)
+                    if not self.swarm.world.onDelta(message.state_delta.delta):
+                        self.swarm.metrics.count("delta_misses")
+                        self._send(snakes.GameMessage(msg_seq=self._msg_seq(), resync=snakes.GameMessage.ResyncMsg()))
+                    self._steer()
+                case "role_change":
+                    if message.role_change.receiver_role == snakes.VIEWER and self.alive:
+                        # The snake is gone, so the MASTER will not ack steers that are still in flight.
+                        self.alive = False
+                        self._reliability.clear()
+                        self.swarm.metrics.count("deaths")
+                    self._acknowledge(message)
+                case "error":
+                    logging.warning(f"{self.name}: {message.error.error_message}")
+                    self.swarm.metrics.count("errors")
+                    self._reliability.forget(message.msg_seq)
+                    self._acknowledge(message)
+        except Exception as e:
+            print("Bot._onMessage", e)
+
+    def _onAck(self, message: snakes.GameMessage) -> None:
+        pending = self._reliability.acknowledge(message.msg_seq)
+        if pending is None:
+            return
+        elapsed_ms = (time.monotonic() - pending.first_sent) * 1000
+        if message.msg_seq == self._join_seq:
+            self.player_id = message.receiver_id
+            self.master_id = message.sender_id
+            self.alive = True
+            self.swarm.metrics.record("join", elapsed_ms)
+            self.swarm.metrics.count("joined")
+            self._onJoined()
+        else:
+            self.swarm.metrics.record("ack_rtt", elapsed_ms)
+
+    def _onJoined(self) -> None:
+        pass
+
+    def _onState(self, message: snakes.GameMessage) -> None:
+        self._onStateArrival(message.state.state.state_order)
+        self.swarm.world.onState(message.state.state)
+        self._steer()
+
+    def _onStateArrival(self, state_order: int) -> None:
+        if state_order <= self._last_state_order:
+            return
+        now = time.perf_counter_ns()
+        if self._last_state_arrival is not None:
+            interval_ms = (now - self._last_state_arrival) / 1e6
+            skipped = state_order - self._last_state_order
+            self.swarm.metrics.record("jitter", abs(interval_ms - skipped * self.swarm.state_delay_ms))
+        self._last_state_arrival = now
+        self._last_state_order = state_order
+        self.swarm.metrics.count("states")
+
+    def _steer(self) -> None:
+        world = self.swarm.world
+        if not self.alive or self._last_steer_order == world.state_order or not world.has_keyframe:
+            return
+        self._last_steer_order = world.state_order
+        direction = world.steer(self.player_id, self.swarm.search_limit)
+        if direction is None:
+            return
+        message = snakes.GameMessage(
+            msg_seq=self._msg_seq(),
+            steer=snakes.GameMessage.SteerMsg(direction=direction)
+        )
+        self._send(message, expect_ack=True)
+
+
+
+class Viewer(Bot):
+    """VIEWER that subscribes to a viewport and counts what the MASTER sends it.
+
+    Its states are partial most of the time, so they are never applied to the shared world."""
+    REQUESTED_ROLE = snakes.VIEWER
+
+    def __init__(self, swarm: "Swarm", network_handler: AsyncioNetworkHandler, name: str,
+                 viewport: Tuple[int, int, int, int]):
+        super().__init__(swarm, network_handler, name)
+        self.viewport = viewport
+        self._viewport_master_id: Union[int, None] = None
+
+    def _onJoined(self) -> None:
+        self._sendViewport()
+
+    def _sendViewport(self) -> None:
+        x, y, width, height = self.viewport
+        self._send(
+            snakes.GameMessage(
+                msg_seq=self._msg_seq(),
+                viewport=snakes.GameMessage.ViewportMsg(x=x, y=y, width=width, height=height)
+            ),
+            expect_ack=True
+        )
+        self._viewport_master_id = self.master_id
+
+    def _onState(self, message: snakes.GameMessage) -> None:
+        self._onStateArrival(message.state.state.state_order)
+        self.swarm.metrics.count("viewer_bytes", message.ByteSize())
+        self.swarm.metrics.count("viewer_partial" if message.state.partial else "viewer_full")
+        if self.player_id is not None and message.sender_id != self._viewport_master_id:
+            # A new MASTER does not know which part of the field we show.
+            self.master_id = message.sender_id
+            self._sendViewport()
+
+
+
+class Swarm:
+    def __init__(self, master_address: Tuple[str, int], game_name: str, search_limit: int):
+        self.master_address = master_address
+        self.game_name = game_name
+        self.search_limit = search_limit
+        self.state_delay_ms = 1000
+        self.world: Union[SharedWorld, None] = None
+        self.metrics = Metrics()
+        self.bots: List[Bot] = list()
+
+    async def discover(self, timeout_s: float = 3) -> None:
+        loop = asyncio.get_running_loop()
+        network_handler = await AsyncioNetworkHandler.create(listen_multicast=False)
+        found = loop.create_future()
+
+        def onAnnouncement(message: snakes.GameMessage, host: str, port: int):
+            # A multi-room host splits its games across several announcements.
+            for game in message.announcement.games:
+                if not found.done() and (self.game_name is None or game.game_name == self.game_name):
+                    found.set_result(game)
+
+        network_handler.dispatcher.addHandler("announcement", onAnnouncement)
+        try:
+            network_handler.unicast(
+                snakes.GameMessage(msg_seq=0, discover=snakes.GameMessage.DiscoverMsg()), *self.master_address
+            )
+            game = await asyncio.wait_for(found, timeout_s)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"No game named {self.game_name} at {self.master_address}")
+        finally:
+            network_handler.close()
+
+        self.game_name = game.game_name
+        self.state_delay_ms = game.config.state_delay_ms
+        self.world = SharedWorld(game.config.width, game.config.height)
+
+    async def spawnBots(self, count: int, rate: float) -> None:
+        for i in range(count):
+            network_handler = await AsyncioNetworkHandler.create(listen_multicast=False)
+            bot = Bot(self, network_handler, name=f"bot-{i}")
+            self.bots.append(bot)
+            bot.start()
+            await asyncio.sleep(1 / rate)
+
+    async def spawnViewers(self, count: int, rate: float, viewport: Tuple[int, int, int, int]) -> None:
+        for i in range(count):
+            network_handler = await AsyncioNetworkHandler.create(listen_multicast=False)
+            viewer = Viewer(self, network_handler, name=f"viewer-{i}", viewport=viewport)
+            self.bots.append(viewer)
+            viewer.start()
+            await asyncio.sleep(1 / rate)
+
+    def report(self) -> None:
+        alive = sum(bot.alive for bot in self.bots)
+        logging.info(f"bots={len(self.bots)} alive={alive} state_order={self.world.state_order}\n"
+                     f"{self.metrics.report()}")
+        self.metrics.reset()
+
+    def stop(self) -> None:
+        for bot in self.bots:
+            bot.stop()
+
+
+def viewport(value: str) -> Tuple[int, int, int, int]:
+    try:
+        x, y, width, height = (int(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected X,Y,WIDTH,HEIGHT, got {value}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("the viewport must not be empty")
+    return x, y, width, height
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Swarm of headless ROBOT players for load-testing a master")
+    parser.add_argument("host", help="MASTER address")
+    parser.add_argument("port", type=int, help="MASTER port")
+    parser.add_argument("--game", default=None, help="game name, the first announced game by default")
+    parser.add_argument("--bots", type=bounded_int(1, 10000), default=100,
+                        help="bots in this process, each one opens its own UDP socket")
+    parser.add_argument("--viewers", type=bounded_int(0, 10000), default=0,
+                        help="VIEWERs in this process, joined after the bots")
+    parser.add_argument("--viewport", type=viewport, default=None, metavar="X,Y,WIDTH,HEIGHT",
+                        help="region the VIEWERs subscribe to, the whole field by default")
+    parser.add_argument("--rate", type=float, default=20, help="bots joined per second")
+    parser.add_argument("--search-limit", type=bounded_int(1, 10000), default=64,
+                        help="cells flood-filled per candidate move")
+    parser.add_argument("--report", type=float, default=5, help="seconds between metric reports")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run, forever by default")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    return args
+
+
+async def run(args: argparse.Namespace) -> None:
+    swarm = Swarm((args.host, args.port), args.game, args.search_limit)
+    await swarm.discover()
+    logging.info(f"Joining '{swarm.game_name}' at {args.host}:{args.port} "
+                 f"({swarm.world.field_manager.width}x{swarm.world.field_manager.height}, "
+                 f"{swarm.state_delay_ms} ms) with {args.bots} bots")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+    if args.duration > 0:
+        loop.call_later(args.duration, stop_event.set)
+
+    async def spawn():
+        await swarm.spawnBots(args.bots, args.rate)
+        if args.viewers > 0:
+            field = swarm.world.field_manager
+            await swarm.spawnViewers(args.viewers, args.rate, args.viewport or (0, 0, field.width, field.height))
+    spawner = asyncio.create_task(spawn())
+    try:
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), args.report)
+            except asyncio.TimeoutError:
+                pass
+            swarm.report()
+    finally:
+        spawner.cancel()
+        swarm.stop()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(format="[%(levelname)s]: %(message)s", level=arguments.log_level)
+    asyncio.run(run(arguments))
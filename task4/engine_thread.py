@@ -0,0 +1,154 @@
+import asyncio
+import threading
+from typing import Callable, NamedTuple, Tuple, Union
+
+import snakes.snakes_pb2 as snakes
+from game.engine import GameEngine
+from headless_network import AsyncioNetworkHandler
+
+
+
+class SnakeView(NamedTuple):
+    player_id: int
+    head_x: int
+    head_y: int
+    tail: Tuple[Tuple[int, int], ...]
+
+
+
+class PlayerView(NamedTuple):
+    name: str
+    id: int
+    score: int
+    role: snakes.NodeRole
+
+
+
+class Snapshot(NamedTuple):
+    """Everything GameWidget draws, copied out of the engine so it can be read from another thread."""
+    state_order: int
+    food: frozenset
+    snakes: Tuple[SnakeView, ...]
+    players: Tuple[PlayerView, ...]
+    master_name: Union[str, None]
+    client_player_id: int
+    width: int
+    height: int
+    food_static: int
+    telemetry: Tuple[str, ...]
+
+
+
+class SnapshotSlot:
+    """Single-slot mailbox between one writer and one reader thread; the newest snapshot wins.
+
+    publish() replaces one attribute and take() reads it, both atomic in CPython, so neither side
+    ever waits for the other."""
+
+    def __init__(self):
+        self._latest: Tuple[int, Union[Snapshot, None]] = (0, None)
+        self._taken = 0
+
+    def publish(self, snapshot: Snapshot) -> None:
+        self._latest = (self._latest[0] + 1, snapshot)
+
+    def take(self) -> Union[Snapshot, None]:
+        """The snapshot published since the last take(), or None."""
+        version, snapshot = self._latest
+        if version == self._taken:
+            return None
+        self._taken = version
+        return snapshot
+
+
+
+class EngineThread(threading.Thread):
+    """Runs a GameEngine with its own sockets on an asyncio loop in a separate thread.
+
+    The engine is only ever touched from that thread: calls from the GUI go through call(), and
+    every state the engine applies is published to the slot as an immutable Snapshot. on_publish
+    is called from the engine thread after each publish and must be thread-safe, such as emitting
+    a Qt signal."""
+
+    def __init__(self, engine_kwargs: dict, on_publish: Callable[[], None] = lambda: None):
+        super().__init__(name="GameEngine", daemon=True)
+        self.slot = SnapshotSlot()
+        self._engine_kwargs = engine_kwargs
+        self._on_publish = on_publish
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._error: Union[Exception, None] = None
+        self.engine: Union[GameEngine, None] = None
+        self.network_handler: Union[AsyncioNetworkHandler, None] = None
+
+    def run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._setUp())
+        except Exception as e:
+            self._error = e
+        self._ready.set()
+        if self._error is None:
+            self._loop.run_forever()
+        if self.engine is not None:
+            self.engine.stop()
+        if self.network_handler is not None:
+            self.network_handler.close()
+        self._loop.run_until_complete(asyncio.sleep(0))
+        self._loop.close()
+
+    async def _setUp(self) -> None:
+        self.network_handler = await AsyncioNetworkHandler.create()
+        self.engine = GameEngine(
+            network_handler=self.network_handler,
+            update_callback=self._publish,
+            **self._engine_kwargs
+        )
+
+    def startEngine(self, is_host: bool, master_host: str, master_port: int) -> None:
+        self.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        if is_host:
+            # The game is hosted on the engine's own socket, not on the one that found the game.
+            master_host, master_port = self.network_handler.host, self.network_handler.port
+        self.call(self.engine.start, is_host, master_host, master_port)
+
+    def call(self, function: Callable, *args) -> None:
+        """Runs function(*args) on the engine thread and publishes the result."""
+        def run():
+            try:
+                function(*args)
+            except Exception as e:
+                print("EngineThread.call", e)
+            self._publish()
+        self._loop.call_soon_threadsafe(run)
+
+    def stop(self) -> None:
+        if self.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self.join()
+
+    def _publish(self) -> None:
+        engine = self.engine
+        master = engine.player_manager.getMaster()
+        self.slot.publish(Snapshot(
+            state_order=engine.state_order,
+            food=frozenset(engine.field_manager.getFood()),
+            snakes=tuple(
+                SnakeView(snake.player_id, snake.head_x, snake.head_y, tuple(snake.tail))
+                for snake in engine.getPredictedSnakes()
+            ),
+            players=tuple(
+                PlayerView(player.name, player.id, player.score, player.role)
+                for player in engine.player_manager.getPlayers()
+            ),
+            master_name=None if master is None else master.name,
+            client_player_id=engine.player_manager.client_player.id,
+            width=engine.field_manager.width,
+            height=engine.field_manager.height,
+            food_static=engine.field_manager.food_static,
+            telemetry=tuple(engine.telemetry.lines())
+        ))
+        self._on_publish()
@@ -2,19 +2,40 @@ import logging
 import random
 import time
 
-from PyQt6.QtCore import QTimer
-from PyQt6.QtNetwork import QNetworkDatagram
-
 import snakes.snakes_pb2 as snakes
 from game.player_manager import PlayerManager, Player
 from game.field_manager import FieldManager, Snake
+from game.reliability import ReliableDelivery, TokenBucket
+from game.prediction import ClientPrediction
+from game.replay import ReplayRecorder
+from game.packetizer import StatePacketizer, StateReassembler
+from game.relay import RelayTree
+from game.telemetry import TickTelemetry
+from game.wire import StateFragments, coord, encodeGameState, encodeStateMsg
 from typing import Union, List, Tuple, Set, Dict
 from types import FunctionType
 
-from network import NetworkHandler, Subscriber
 
+class GameEngine:
+    KEYFRAME_INTERVAL = 20
+    RETRANSMIT_CHECK_MS = 10
+    # DiscoverMsg replies per second, so a flood of small requests is not answered with big announcements.
+    DISCOVER_REPLY_RATE = 10
+    # Players with a viewport get the whole field only every OVERVIEW_INTERVAL-th state.
+    OVERVIEW_INTERVAL = 50
+    # Targets a relay forwards one RelayMsg to at most, whatever the MASTER asks for.
+    MAX_RELAY_TARGETS = 64
+    # Share of state_delay_ms of silence after which a hot-standby DEPUTY takes over. The MASTER sends
+    # it something at least every ping interval, a tenth of state_delay_ms, so this is five missed
+    # ones, and still early enough for the DEPUTY to make the old MASTER's next tick on time.
+    STANDBY_TIMEOUT = 0.5
+    ACKED_TYPES = ("join", "steer", "role_change", "error", "viewport")
+    # Announcements are not listed, so the engine never decodes them.
+    HANDLED_TYPES = (
+        "ack", "ping", "error", "role_change", "discover", "steer", "join", "state", "state_delta", "viewport",
+        "inputs", "resync", "relay", "standby"
+    )
 
-class GameEngine(Subscriber):
     def __init__(
             self,
             game_name: str,
@@ -22,18 +43,24 @@ class GameEngine(Subscriber):
             field_height: int,
             food_static: int,
             state_delay_ms: int,
-            network_handler: NetworkHandler,
+            network_handler,
             client_name: str,
             client_requested_role: snakes.NodeRole,
             existing_players: snakes.GamePlayers,
-            update_callback
+            update_callback,
+            field_manager_class=FieldManager,
+            replay_path: Union[str, None] = None,
+            lockstep: bool = False,
+            relay_fanout: int = 0,
+            hot_standby: bool = False
     ):
         self._update_callback = update_callback
         self.game_name = game_name
         self.state_delay_ms = state_delay_ms
         self.network_handler = network_handler
 
-        self.network_handler.subscribe(self)
+        for message_type in self.HANDLED_TYPES:
+            self.network_handler.dispatcher.addHandler(message_type, self._onMessage)
 
         self.__player_id = 0
         self.player_manager = PlayerManager(
@@ -43,24 +70,73 @@ class GameEngine(Subscriber):
                 ip_address=network_handler.host,
                 port=network_handler.port,
                 role=client_requested_role,
-                is_client=True
+                is_client=True,
+                supports_state_delta=True,
+                supports_state_chunks=True,
+                supports_lockstep=True,
+                supports_relay=True
             ),
             existing_players=existing_players
         )
 
-        self.field_manager = FieldManager(
+        self.field_manager = field_manager_class(
             width=field_width,
             height=field_height,
             food_static=food_static
         )
-        self._timers: Set[QTimer] = set()
+        self._timers = set()
 
-        self._messages_expecting_ack = dict()
+        retransmit_check_ms = min(self.RETRANSMIT_CHECK_MS, self.state_delay_ms // 10)
+        self._reliability = ReliableDelivery(
+            initial_rto_s=self.state_delay_ms / 10 / 1000,
+            max_rto_s=self.state_delay_ms / 1000,
+            granularity_s=retransmit_check_ms / 1000
+        )
+        self._receive_key = None
         self.__msg_seq = 0
         self._state_order = 0
+        self._has_keyframe = False
+        self.prediction = ClientPrediction()
+        self._delta_snapshot = None
+        # VIEWERs get their states from relays when relay_fanout is set, see RelayTree.
+        self._relay_tree: Union[RelayTree, None] = None
+        if relay_fanout > 0:
+            self._relay_tree = RelayTree(relay_fanout)
+            # Room for the RelayMsg around every part, so forwarded parts still fit a datagram.
+            self._packetizer = StatePacketizer(StatePacketizer.MAX_DATAGRAM - RelayTree.envelopeSize(relay_fanout))
+        else:
+            self._packetizer = StatePacketizer()
+        self.telemetry = TickTelemetry(budget_ms=self.state_delay_ms)
+        self._state_parts = StateReassembler(timeout_s=self.state_delay_ms / 1000)
+        self._recorder: Union[ReplayRecorder, None] = None
+        self._record_snapshot = None
+        if replay_path is not None:
+            self._recorder = ReplayRecorder(replay_path, self._configMsg())
+        self._delta_receivers: Set[int] = set()
+        self._viewport: Union[Tuple[int, int, int, int], None] = None
+        # Lockstep: players that hold our latest state and get InputsMsg instead of the next one.
+        self.lockstep = False
+        self._lockstep_receivers: Set[int] = set()
+        self._lockstep_hash = 0
+        self._lockstep_players = None
+        self._lockstep_zombies: Set[int] = set()
+        if lockstep:
+            self._enableLockstep()
+        # Hot standby: the MASTER streams its DEPUTY what a state does not hold, see StandbyMsg.
+        self.hot_standby = False
+        # Seed of the field's random numbers in the coming tick, drawn a tick ahead so the DEPUTY knows it.
+        self._next_seed = random.getrandbits(63)
+        self._standby: Dict[int, snakes.GameMessage.StandbyMsg] = dict()
+        self._next_tick_at: Union[float, None] = None
+        if hot_standby:
+            self._enableHotStandby()
+        self._viewport_master_id: Union[int, None] = None
+        # The announcement without its msg_seq and what it was built from.
+        self._announcement: Union[Tuple[Tuple, bytes], None] = None
+        self._discover_replies = TokenBucket(rate=self.DISCOVER_REPLY_RATE, burst=self.DISCOVER_REPLY_RATE)
         self._ack_timer = self._init_timer(
-            delay_ms=self.state_delay_ms // 10,
-            callback=self._retrySending2Master
+            delay_ms=retransmit_check_ms,
+            callback=self._retransmit
         )
 
         self._ping_timer = self._init_timer(
@@ -78,13 +154,14 @@ class GameEngine(Subscriber):
             callback=self._announce
         )
 
-    def start(self, is_host: bool, master_host: str, master_port: int) -> None:
+    def start(self, is_host: bool, master_host: str, master_port: int, host_plays: bool = True) -> None:
         try:
             if is_host:
                 self.player_manager.client_player.id = self._player_id()
                 self._becomeMaster()
-                x, y = self.field_manager.getPosForNewSnake()
-                self.field_manager.spawnSnake(x, y, self.player_manager.client_player.id)
+                if host_plays:
+                    x, y = self.field_manager.getPosForNewSnake()
+                    self.field_manager.spawnSnake(x, y, self.player_manager.client_player.id)
 
             else:
                 joinMessage = snakes.GameMessage(
@@ -93,7 +170,11 @@ class GameEngine(Subscriber):
                         player_type=snakes.HUMAN,
                         player_name=self.player_manager.client_player.name,
                         game_name=self.game_name,
-                        requested_role=self.player_manager.client_player.role
+                        requested_role=self.player_manager.client_player.role,
+                        supports_state_delta=True,
+                        supports_state_chunks=True,
+                        supports_lockstep=True,
+                        supports_relay=True
                     )
                 )
                 self._sendMessage(message=joinMessage, host=master_host, port=master_port, expect_ack=True)
@@ -112,7 +193,11 @@ class GameEngine(Subscriber):
         for timer in self._timers:
             timer.stop()
 
-        self.network_handler.unsubscribe(self)
+        for message_type in self.HANDLED_TYPES:
+            self.network_handler.dispatcher.removeHandler(message_type, self._onMessage)
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
 
     def moveClientSnake(self, direction: snakes.Direction) -> None:
         if self.player_manager.client_player.role == snakes.VIEWER:
@@ -123,14 +208,42 @@ class GameEngine(Subscriber):
             )
         )
         self._sendMessage2Master(message, expect_ack=True)
+        self.prediction.steer(direction, self._state_order)
         master = self.player_manager.getMaster()
         logging.info(f"Sent steer message {direction} to {master.name}#{master.id} {master.ip_address}:{master.port}")
 
-    def _init_timer(self, delay_ms: int, callback, start: bool = False) -> QTimer:
-        timer = QTimer()
-        timer.setInterval(delay_ms)
-        timer.timeout.connect(callback)
-        timer.setSingleShot(False)
+    def setViewport(self, x: int, y: int, width: int, height: int) -> None:
+        """Asks the MASTER for only the part of the field that is shown; a zero size asks for all of it again."""
+        self._viewport = (x, y, width, height) if width > 0 and height > 0 else None
+        self._sendViewport()
+
+    def _sendViewport(self) -> None:
+        x, y, width, height = self._viewport if self._viewport is not None else (0, 0, 0, 0)
+        message = snakes.GameMessage(
+            viewport=snakes.GameMessage.ViewportMsg(x=x, y=y, width=width, height=height)
+        )
+        self._sendMessage2Master(message, expect_ack=True)
+        master = self.player_manager.getMaster()
+        self._viewport_master_id = None if master is None else master.id
+
+    @property
+    def state_order(self) -> int:
+        return self._state_order
+
+    def getPredictedSnakes(self) -> Set[Snake]:
+        """Snakes as they should be drawn: the own snake already follows steers the MASTER has not shown yet."""
+        field_snakes = self.field_manager.getSnakes()
+        client_id = self.player_manager.client_player.id
+        own = next((snake for snake in field_snakes if snake.player_id == client_id), None)
+        self.prediction.reconcile(own, self._state_order)
+        predicted = self.prediction.predict(own)
+        if predicted is not None:
+            field_snakes.discard(own)
+            field_snakes.add(predicted)
+        return field_snakes
+
+    def _init_timer(self, delay_ms: int, callback, start: bool = False):
+        timer = self.network_handler.createTimer(delay_ms, callback)
         self._timers.add(timer)
         if start:
             timer.start()
@@ -169,17 +282,39 @@ class GameEngine(Subscriber):
         self._sendMessage(message=message, host=player.ip_address, port=player.port, expect_ack=expect_ack)
         player.last_socket_message_sent = time.time_ns()
 
+    def _sendSerialized2Player(self, body: bytes, player: Player, sender_id: Union[int, None] = None) -> None:
+        # A serialized protobuf message followed by another one parses as their merge, so a tiny
+        # per-recipient header can be prepended to a body that was encoded once for everyone.
+        header = snakes.GameMessage(
+            msg_seq=self._msg_seq(),
+            sender_id=self.player_manager.client_player.id if sender_id is None else sender_id,
+            receiver_id=player.id
+        )
+        self.network_handler.unicastBytes(header.SerializeToString() + body, player.ip_address, player.port)
+        player.last_socket_message_sent = time.time_ns()
+
     def _sendMessage(self, message: snakes.GameMessage, host: str, port: int, expect_ack: bool = False) -> None:
         if expect_ack:
-            self._messages_expecting_ack[message.msg_seq] = message
+            self._reliability.track(message, host, port)
         self.network_handler.unicast(message=message, host=host, port=port)
 
-    def _retrySending2Master(self):
+    def _retransmit(self):
         try:
-            for message in self._messages_expecting_ack.values():
-                self._sendMessage2Master(message, expect_ack=True, calibrate=False)
+            master = self.player_manager.getMaster()
+            for pending in self._reliability.due():
+                message = pending.message
+                receiver = None
+                if message.HasField("receiver_id"):
+                    receiver = self.player_manager.getPlayerByID(message.receiver_id)
+                if receiver is not None and receiver is not master:
+                    self._sendMessage2Player(message, player=receiver, expect_ack=True, calibrate=False)
+                elif master is self.player_manager.client_player:
+                    # Addressed to ourselves or to a player that is gone: nobody is left to ack it.
+                    self._reliability.forget(message.msg_seq)
+                else:
+                    self._sendMessage2Master(message, expect_ack=True, calibrate=False)
         except Exception as e:
-            print("_retrySending2Master", e)
+            print("_retransmit", e)
 
     def _acknowledge(self, message: snakes.GameMessage, host: str, port: int):
         ackMessage = snakes.GameMessage(
@@ -188,34 +323,45 @@ class GameEngine(Subscriber):
             receiver_id=message.sender_id,
             ack=snakes.GameMessage.AckMsg()
         )
-        self._sendMessage(message=ackMessage, host=host, port=port, expect_ack=False)
-
-    def _announce(self, address: tuple[str, int] = None):
-        announceMessage = snakes.GameMessage(
-            msg_seq=self._msg_seq(),
-            announcement=snakes.GameMessage.AnnouncementMsg(
-                games=[
-                    snakes.GameAnnouncement(
-                        can_join=self.field_manager.getPosForNewSnake() is not None,
-                        game_name=self.game_name,
-                        config=snakes.GameConfig(
-                            width=self.field_manager.width,
-                            height=self.field_manager.height,
-                            food_static=self.field_manager.food_static,
-                            state_delay_ms=self.state_delay_ms
-                        ),
-                        players=snakes.GamePlayers(
-                            players=self.player_manager.asMsg()
+        data = ackMessage.SerializeToString()
+        self.network_handler.unicastBytes(data, host, port)
+        if self._receive_key is not None:
+            self._reliability.rememberReply(self._receive_key, data, host, port)
+
+    def _announcementBody(self) -> bytes:
+        """The serialized announcement without msg_seq, rebuilt only when the players, the config or
+        whether a snake can spawn have changed since the last one."""
+        field = self.field_manager
+        key = (
+            tuple(self.player_manager.encoded()),
+            (field.width, field.height, field.food_static, self.state_delay_ms),
+            field.canSpawnSnake()
+        )
+        if self._announcement is None or self._announcement[0] != key:
+            announceMessage = snakes.GameMessage(
+                announcement=snakes.GameMessage.AnnouncementMsg(
+                    games=[
+                        snakes.GameAnnouncement(
+                            can_join=key[2],
+                            game_name=self.game_name,
+                            config=self._configMsg(),
+                            players=snakes.GamePlayers(
+                                players=self.player_manager.asMsg()
+                            )
                         )
-                    )
-                ]
+                    ]
+                )
             )
-        )
+            self._announcement = (key, announceMessage.SerializePartialToString())
+        return self._announcement[1]
+
+    def _announce(self, address: tuple[str, int] = None):
+        data = snakes.GameMessage(msg_seq=self._msg_seq()).SerializeToString() + self._announcementBody()
         if address is not None:
             host, port = address
-            self._sendMessage(message=announceMessage, host=host, port=port, expect_ack=False)
+            self.network_handler.unicastBytes(data, host, port)
             return
-        self.network_handler.multicast(message=announceMessage)
+        self.network_handler.multicastBytes(data)
 
     def _ping(self):
         try:
@@ -230,7 +376,11 @@ class GameEngine(Subscriber):
                     pingMessage = snakes.GameMessage(ping=snakes.GameMessage.PingMsg())
                     self._sendMessage2Player(message=pingMessage, player=player)
 
-                if current_time - player.last_socket_message_got > self.state_delay_ms * 0.8 * 1e6:
+                timeout = 0.8
+                if self.hot_standby and player.role == snakes.MASTER and \
+                        self.player_manager.client_player.role == snakes.DEPUTY:
+                    timeout = self.STANDBY_TIMEOUT
+                if current_time - player.last_socket_message_got > self.state_delay_ms * timeout * 1e6:
                     logging.warning(f"{player.name}#{player.id} does not respond. Kicked from formation.")
                     to_be_deleted.add(player)
 
@@ -250,11 +400,9 @@ class GameEngine(Subscriber):
                             self._becomeMaster()
             for player in to_be_deleted:
                 self.player_manager.removePlayerByID(player.id)
-                snakes_with_id = set(
-                    filter(lambda s: s.player_id == player.id, self.field_manager.getSnakes())
-                )
-                for snake in snakes_with_id:
-                    snake.state = snakes.GameState.Snake.SnakeState.ZOMBIE
+                if self.player_manager.client_player.role == snakes.MASTER:
+                    # Everyone else learns of the ZOMBIE from the MASTER, in lockstep with its ticks.
+                    self._zombify(player.id)
         except Exception as e:
             print("_ping", e)
 
@@ -290,6 +438,18 @@ class GameEngine(Subscriber):
     def _becomeMaster(self):
         logging.info("I am now MASTER")
         self.player_manager.client_player.role = snakes.MASTER
+        self._delta_snapshot = None
+        self._delta_receivers.clear()
+        self._lockstep_receivers.clear()
+        self._lockstep_players = None
+        self._lockstep_zombies.clear()
+        self.field_manager.sortSnakes()
+        first_tick_ms = None
+        if len(self._standby) > 0:
+            # Hot standby: the ids the old MASTER gave out stay taken, and we tick when it would have.
+            next_player_ids = [standby.next_player_id for standby in self._standby.values()]
+            self.__player_id = max(self.__player_id, *next_player_ids)
+            first_tick_ms = max(0.0, (self._next_tick_at - time.monotonic()) * 1000)
         deputy = self._findNewDeputy()
         if deputy is None:
             logging.info("Could not assign new DEPUTY.")
@@ -305,7 +465,7 @@ class GameEngine(Subscriber):
             )
             self._sendMessage2Player(message=newMasterMessage, player=other_player)
 
-        self._tick_timer.start()
+        self._tick_timer.start(first_tick_ms)
         self._announce_timer.start()
 
     def becomeViewer(self):
@@ -332,28 +492,240 @@ class GameEngine(Subscriber):
                 )
                 self._sendMessage2Player(roleChangeMessage, player=deputy, expect_ack=True)
 
-    def _sendGameState(self, player: Player = None):
-        gameStateMessage = snakes.GameMessage(
-            state=snakes.GameMessage.StateMsg(
-                state=snakes.GameState(
-                    state_order=self._state_order + 1,
-                    players=snakes.GamePlayers(
-                        players=self.player_manager.asMsg()
-                    ),
-                    foods=[snakes.GameState.Coord(x=x, y=y) for x, y in self.field_manager.getFood()],
-                    snakes=[snake.asMsg(self.field_manager.width, self.field_manager.height)
-                            for snake in self.field_manager.getSnakes()]
-                )
+    def _configMsg(self) -> snakes.GameConfig:
+        return snakes.GameConfig(
+            width=self.field_manager.width,
+            height=self.field_manager.height,
+            food_static=self.field_manager.food_static,
+            state_delay_ms=self.state_delay_ms
+        )
+
+    def _recordState(self) -> None:
+        if self._recorder is None:
+            return
+        if self._record_snapshot is None or self._recorder.wantsKeyframe(self._state_order):
+            self._recorder.writeKeyframe(self._state_order, encodeGameState(self._stateFragments()))
+        else:
+            field_snapshot, players_snapshot = self._record_snapshot
+            delta = snakes.GameStateDelta(
+                state_order=self._state_order,
+                base_state_order=self._recorder.last_state_order
             )
+            self.field_manager.fillDeltaMsg(delta, field_snapshot)
+            self.player_manager.fillDeltaMsg(delta, players_snapshot)
+            self._recorder.writeDelta(delta)
+        self._record_snapshot = (self.field_manager.takeSnapshot(), self.player_manager.takeSnapshot())
+
+    def _stateFragments(self) -> StateFragments:
+        width, height = self.field_manager.width, self.field_manager.height
+        return StateFragments(
+            state_order=self._state_order,
+            players=self.player_manager.encoded(),
+            snakes=[snake.encoded(width, height) for snake in self.field_manager.getSnakes()],
+            foods=[coord(x, y) for x, y in self.field_manager.getFood()]
         )
-        if player is not None:
-            self._sendMessage2Player(message=gameStateMessage, player=player, expect_ack=False)
+
+    def _buildGameStateBody(self) -> bytes:
+        return encodeStateMsg(encodeGameState(self._stateFragments()))
+
+    def _viewportBodies(self, player: Player) -> List[bytes]:
+        width, height = self.field_manager.width, self.field_manager.height
+        region_snakes, region_food = self.field_manager.getRegion(*player.viewport)
+        # Only the owners of the snakes in view and the MASTER, the others are updated by the overview.
+        owners = {snake.player_id for snake in region_snakes}
+        owners.add(self.player_manager.client_player.id)
+        fragments = StateFragments(
+            state_order=self._state_order,
+            players=[other.encoded() for other in self.player_manager.getPlayers() if other.id in owners],
+            snakes=[snake.encoded(width, height) for snake in region_snakes],
+            foods=[coord(x, y) for x, y in region_food]
+        )
+        if player.supports_state_chunks:
+            return self._packetizer.split(fragments, partial=True)
+        return [encodeStateMsg(encodeGameState(fragments), partial=True)]
+
+    def _enableLockstep(self) -> None:
+        self.lockstep = True
+        self.field_manager.random = random.Random()
+
+    def _enableHotStandby(self) -> None:
+        self.hot_standby = True
+        self.field_manager.random = random.Random()
+
+    def _seedTick(self) -> int:
+        """Seeds the field for the coming tick with the seed drawn a tick earlier."""
+        seed, self._next_seed = self._next_seed, random.getrandbits(63)
+        self.field_manager.random.seed(seed)
+        return seed
+
+    def _buildInputsBody(self, seed: int) -> bytes:
+        """InputsMsg for the coming tick, whose field is seeded with seed."""
+        inputs = snakes.GameMessage.InputsMsg(
+            state_order=self._state_order + 1,
+            seed=seed,
+            base_hash=self._lockstep_hash,
+            steers=[snakes.GameMessage.InputsMsg.Steer(player_id=player_id, direction=direction)
+                    for player_id, direction in self.field_manager.pendingTurns()],
+            zombies=sorted(self._lockstep_zombies)
+        )
+        if self._lockstep_players is not None:
+            self.player_manager.fillDeltaMsg(inputs, self._lockstep_players)
+        self._lockstep_players = self.player_manager.takeSnapshot()
+        self._lockstep_zombies.clear()
+        return snakes.GameMessage(inputs=inputs).SerializePartialToString()
+
+    def _sendStandby(self) -> None:
+        deputy = self.player_manager.getDeputy()
+        if deputy is None:
             return
+        standby = snakes.GameMessage.StandbyMsg(
+            state_order=self._state_order + 1,
+            seed=self._next_seed,
+            next_player_id=self.__player_id,
+            steers=[snakes.GameMessage.InputsMsg.Steer(player_id=player_id, direction=direction)
+                    for player_id, direction in self.field_manager.pendingTurns()]
+        )
+        self._sendMessage2Player(message=snakes.GameMessage(standby=standby), player=deputy)
+
+    def _zombify(self, player_id: int) -> None:
+        snake = self.field_manager.getSnake(player_id)
+        if snake is not None:
+            snake.state = snakes.GameState.Snake.SnakeState.ZOMBIE
+            if self.lockstep and self.player_manager.client_player.role == snakes.MASTER:
+                self._lockstep_zombies.add(player_id)
+
+    def _buildGameStateDeltaMsg(self) -> snakes.GameMessage:
+        field_snapshot, players_snapshot = self._delta_snapshot
+        delta = snakes.GameStateDelta(
+            state_order=self._state_order,
+            base_state_order=self._state_order - 1
+        )
+        self.field_manager.fillDeltaMsg(delta, field_snapshot)
+        self.player_manager.fillDeltaMsg(delta, players_snapshot)
+        return snakes.GameMessage(state_delta=snakes.GameMessage.StateDeltaMsg(delta=delta))
+
+    def _sendGameState(self, player: Player = None, inputs_body: Union[bytes, None] = None) -> int:
+        """Sends the current state to one player or to everyone; returns the nanoseconds spent serializing.
+
+        With inputs_body, players that can follow in lockstep and hold the previous state get it instead."""
+        if player is not None:
+            if player.supports_state_chunks:
+                bodies = self._packetizer.split(self._stateFragments())
+            else:
+                bodies = [self._buildGameStateBody()]
+            for body in bodies:
+                self._sendSerialized2Player(body=body, player=player)
+            return 0
+
+        is_keyframe = self._delta_snapshot is None or self._state_order % self.KEYFRAME_INTERVAL == 0
+        state_fragments = None
+        state_bodies = None
+        state_chunks = None
+        delta_body = None
+        viewport_bodies: Dict[Tuple[Tuple[int, int, int, int], bool], List[bytes]] = dict()
+        is_overview = self._state_order % self.OVERVIEW_INTERVAL == 0
+        has_delta_receivers = False
+        serialize_ns = 0
+        # Relay id -> body -> the VIEWERs it is forwarded to.
+        relayed: Dict[int, Dict[bytes, List[int]]] = dict()
+        if self._relay_tree is not None:
+            self._relay_tree.update(self.player_manager.getPlayers(), self._canRelay, self._rtt)
         for player in self.player_manager.getPlayers():
-            self._sendMessage2Player(message=gameStateMessage, player=player, expect_ack=False)
+            if player == self.player_manager.client_player:
+                continue
+            # The DEPUTY always gets the whole field, it may have to take over the game.
+            if player.viewport is not None and player.role != snakes.DEPUTY and not is_overview:
+                started = time.perf_counter_ns()
+                key = (player.viewport, player.supports_state_chunks)
+                if key not in viewport_bodies:
+                    viewport_bodies[key] = self._viewportBodies(player)
+                serialize_ns += time.perf_counter_ns() - started
+                for body in viewport_bodies[key]:
+                    self._sendBroadcastBody(body, player, relayed)
+                # A partial state is no base for a delta.
+                self._delta_receivers.discard(player.id)
+                self._lockstep_receivers.discard(player.id)
+                continue
+            if inputs_body is not None and player.supports_lockstep:
+                if player.id in self._lockstep_receivers:
+                    self._sendBroadcastBody(inputs_body, player, relayed)
+                    continue
+                self._lockstep_receivers.add(player.id)
+            elif player.supports_state_delta:
+                has_delta_receivers = True
+                if not is_keyframe and player.id in self._delta_receivers:
+                    if delta_body is None:
+                        started = time.perf_counter_ns()
+                        delta_body = self._buildGameStateDeltaMsg().SerializePartialToString()
+                        serialize_ns += time.perf_counter_ns() - started
+                    # A delta too big for one datagram is replaced by the split full state.
+                    if not player.supports_state_chunks or self._packetizer.fits(delta_body):
+                        self._sendBroadcastBody(delta_body, player, relayed)
+                        continue
+                self._delta_receivers.add(player.id)
+            started = time.perf_counter_ns()
+            if state_fragments is None:
+                state_fragments = self._stateFragments()
+            if player.supports_state_chunks:
+                if state_chunks is None:
+                    state_chunks = self._packetizer.split(state_fragments)
+                bodies = state_chunks
+            else:
+                if state_bodies is None:
+                    state_bodies = [encodeStateMsg(encodeGameState(state_fragments))]
+                bodies = state_bodies
+            serialize_ns += time.perf_counter_ns() - started
+            for body in bodies:
+                self._sendBroadcastBody(body, player, relayed)
+
+        self._sendRelayed(relayed)
+        started = time.perf_counter_ns()
+        if has_delta_receivers:
+            self._delta_snapshot = (self.field_manager.takeSnapshot(), self.player_manager.takeSnapshot())
+        else:
+            self._delta_snapshot = None
+        return serialize_ns + time.perf_counter_ns() - started
+
+    def _sendBroadcastBody(self, body: bytes, player: Player, relayed: Dict[int, Dict[bytes, List[int]]]) -> None:
+        relay_id = None if self._relay_tree is None else self._relay_tree.relayOf(player.id)
+        if relay_id is None:
+            self._sendSerialized2Player(body=body, player=player)
+            return
+        relayed.setdefault(relay_id, dict()).setdefault(body, list()).append(player.id)
+        # The relay sends it on our behalf, so the player needs no ping from us.
+        player.last_socket_message_sent = time.time_ns()
+
+    def _sendRelayed(self, relayed: Dict[int, Dict[bytes, List[int]]]) -> None:
+        for relay_id, bodies in relayed.items():
+            relay = self.player_manager.getPlayerByID(relay_id)
+            if relay is None:
+                continue
+            for body, targets in bodies.items():
+                message = snakes.GameMessage(relay=snakes.GameMessage.RelayMsg(targets=targets, body=body))
+                self._sendMessage2Player(message=message, player=relay)
+
+    def _canRelay(self, player: Player) -> bool:
+        # Half of the time after which _ping kicks a player: a relay that is late gets no VIEWERs
+        # before it is gone, and gets them back if it recovers.
+        return time.time_ns() - player.last_socket_message_got < self.state_delay_ms * 0.4 * 1e6
+
+    def _rtt(self, player: Player) -> Union[float, None]:
+        return self._reliability.srtt(player.ip_address, player.port)
 
     def _tick(self) -> None:
+        tick_started = time.perf_counter_ns()
+        standby = self._standby.pop(self._state_order + 1, None)
+        if standby is not None:
+            # We were the DEPUTY: the turns and the seed the MASTER had for this tick.
+            for steer in standby.steers:
+                snake = self.field_manager.getSnake(steer.player_id)
+                if snake is not None:
+                    snake.turn(steer.direction)
+            self._next_seed = standby.seed
+        seed = self._seedTick() if self.lockstep or self.hot_standby else None
+        inputs_body = self._buildInputsBody(seed) if self.lockstep else None
         player_updates = self.field_manager.tick()
+        self._state_order += 1
 
         master_died = False
         for player_id, update_id in player_updates:
@@ -377,22 +749,38 @@ class GameEngine(Subscriber):
                     )
                     self._sendMessage2Player(message=roleChangeMessage, player=player, expect_ack=True)
 
+        if self.lockstep:
+            self._lockstep_hash = self.field_manager.stateHash()
+
         # Step 3. Send states
-        self._sendGameState()
+        simulated = time.perf_counter_ns()
+        serialize_ns = self._sendGameState(inputs_body=inputs_body)
+        if self.hot_standby:
+            self._sendStandby()
+        sent = time.perf_counter_ns()
+        self._recordState()
+        self.telemetry.record(
+            simulation_ns=simulated - tick_started,
+            serialization_ns=serialize_ns + time.perf_counter_ns() - sent,
+            send_ns=sent - simulated - serialize_ns,
+            lateness_s=self._tick_timer.lateness,
+            skipped=self._tick_timer.skipped
+        )
+        self._update_callback()
         if master_died:
             self.becomeViewer()
 
-    def notify(self, datagram: QNetworkDatagram):
-        current_time = time.time_ns()
-
-        raw = bytes(datagram.data())
-        message = snakes.GameMessage()
-        message.ParseFromString(raw)
+    def _onMessage(self, message: snakes.GameMessage, host: str, port: int):
         # print(message.WhichOneof("Type"), type(message))
-        match message.WhichOneof("Type"):
-            case "announcement":
+        self._receive_key = None
+        if message.WhichOneof("Type") in self.ACKED_TYPES:
+            self._receive_key = self._reliability.receiveKey(message, host, port)
+            reply = self._reliability.replyTo(self._receive_key)
+            if reply is not None:
+                # Already handled, only our ack got lost.
+                self.network_handler.unicastBytes(*reply)
                 return
-
+        match message.WhichOneof("Type"):
             case "ack":
                 try:
                     self._on_notify_ack(message)
@@ -402,38 +790,71 @@ class GameEngine(Subscriber):
                 pass  
             case "error":
                 logging.error(message.error.error_message)
-                self._acknowledge(
-                    message,
-                    datagram.senderAddress().toString().replace("::ffff:", ""),
-                    datagram.senderPort()
-                )
+                self._acknowledge(message, host, port)
             case "role_change":
                 try:
-                    self._on_notify_role_change(message, datagram)
+                    self._on_notify_role_change(message, host, port)
                 except Exception as e:
                     print("role_change", e)
 
             case "discover":
-                self._announce((datagram.senderAddress(), datagram.senderPort()))
+                # Only the MASTER hosts the game, and it answers a limited number of requests per second.
+                if self.player_manager.client_player.role == snakes.MASTER and self._discover_replies.take():
+                    self._announce((host, port))
 
             case "steer":
                 try:
-                    self._on_notify_steer(message, datagram)
+                    self._on_notify_steer(message, host, port)
                 except Exception as e:
                     print("steer", e)
 
             case "join":
                 try:
-                    self._on_notify_join(message, datagram)
+                    self._on_notify_join(message, host, port)
                 except Exception as e:
                     print("join", e)
 
             case "state":
                 try:
-                    self._on_notify_state(message)
+                    self._on_notify_state(message, host, port)
                 except Exception as e:
                     print("state", e)
 
+            case "state_delta":
+                try:
+                    self._on_notify_state_delta(message)
+                except Exception as e:
+                    print("state_delta", e)
+
+            case "viewport":
+                try:
+                    self._on_notify_viewport(message, host, port)
+                except Exception as e:
+                    print("viewport", e)
+
+            case "inputs":
+                try:
+                    self._on_notify_inputs(message)
+                except Exception as e:
+                    print("inputs", e)
+
+            case "resync":
+                # The next state sent to the node is a full one.
+                self._lockstep_receivers.discard(message.sender_id)
+                self._delta_receivers.discard(message.sender_id)
+
+            case "relay":
+                try:
+                    self._on_notify_relay(message, host, port)
+                except Exception as e:
+                    print("relay", e)
+
+            case "standby":
+                try:
+                    self._on_notify_standby(message)
+                except Exception as e:
+                    print("standby", e)
+
         try:
             player = self.player_manager.getPlayerByID(message.sender_id)
             if player is None:
@@ -444,20 +865,127 @@ class GameEngine(Subscriber):
         except Exception as e:
             print("last_socket_message_got", e)
 
-    def _on_notify_state(self, message: snakes.GameMessage):
+    def _on_notify_state(self, message: snakes.GameMessage, host: str, port: int):
+        if self.player_manager.client_player.role == snakes.MASTER:
+            # Another node still sends states, most likely the MASTER we took over from without it noticing.
+            claim = snakes.GameMessage(
+                msg_seq=self._msg_seq(),
+                sender_id=self.player_manager.client_player.id,
+                receiver_id=message.sender_id,
+                role_change=snakes.GameMessage.RoleChangeMsg(sender_role=snakes.MASTER, receiver_role=snakes.MASTER)
+            )
+            self._sendMessage(message=claim, host=host, port=port)
+            return
+        message = self._state_parts.add(message)
+        if message is None:
+            return
         if message.state.state.state_order > self._state_order:
             self._state_order = message.state.state.state_order
             if self.player_manager.client_player.role != snakes.MASTER:
                 self.field_manager.foodFromMsg(message.state.state.foods)
                 self.field_manager.snakesFromMsg(message.state.state.snakes)
+                # Same order as the MASTER's, which lockstep ticks depend on.
+                self.field_manager.sortSnakes()
                 self.player_manager.playersFromMsg(message.state.state.players.players)
                 self.__player_id = self.player_manager.getMaxPlayerID() + 1
+                self._has_keyframe = not message.state.partial
+                self._recordState()
+                if self._viewport is not None and message.sender_id != self._viewport_master_id:
+                    # A new MASTER does not know which part of the field we show.
+                    self._sendViewport()
 
             self._update_callback()
 
+    def _on_notify_state_delta(self, message: snakes.GameMessage):
+        delta = message.state_delta.delta
+        if delta.state_order <= self._state_order or self.player_manager.client_player.role == snakes.MASTER:
+            return
+        if not self._has_keyframe or delta.base_state_order != self._state_order or \
+                not self.field_manager.applyDeltaMsg(delta):
+            logging.info(f"Skipping state delta {delta.state_order}, asking for a full state")
+            self._has_keyframe = False
+            self._sendMessage2Master(snakes.GameMessage(resync=snakes.GameMessage.ResyncMsg()))
+            return
+        self.player_manager.applyDeltaMsg(delta)
+        self._state_order = delta.state_order
+        self.__player_id = self.player_manager.getMaxPlayerID() + 1
+        self._recordState()
+        self._update_callback()
+
+    def _on_notify_inputs(self, message: snakes.GameMessage):
+        inputs = message.inputs
+        if inputs.state_order <= self._state_order or self.player_manager.client_player.role == snakes.MASTER:
+            return
+        if not self.lockstep:
+            self._enableLockstep()
+        if not self._has_keyframe or inputs.state_order != self._state_order + 1 or \
+                self.field_manager.stateHash() != inputs.base_hash:
+            logging.info(f"Lockstep inputs {inputs.state_order} do not fit our state, asking for a full state")
+            self._has_keyframe = False
+            self._sendMessage2Master(snakes.GameMessage(resync=snakes.GameMessage.ResyncMsg()))
+            return
+        for player_id in inputs.zombies:
+            self._zombify(player_id)
+        for steer in inputs.steers:
+            snake = self.field_manager.getSnake(steer.player_id)
+            if snake is not None:
+                snake.turn(steer.direction)
+        self.field_manager.random.seed(inputs.seed)
+        self.field_manager.tick()
+        self.player_manager.applyDeltaMsg(inputs)
+        self._state_order = inputs.state_order
+        self.__player_id = self.player_manager.getMaxPlayerID() + 1
+        self._recordState()
+        self._update_callback()
+
+    def _on_notify_relay(self, message: snakes.GameMessage, host: str, port: int):
+        master = self.player_manager.getMaster()
+        # Only the MASTER may make us send, or we would reflect anybody's datagrams.
+        if master is None or master is self.player_manager.client_player or message.sender_id != master.id or \
+                (host, port) != (master.ip_address, master.port):
+            return
+        for target_id in message.relay.targets[:self.MAX_RELAY_TARGETS]:
+            target = self.player_manager.getPlayerByID(target_id)
+            if target is None or target is self.player_manager.client_player:
+                continue
+            self._sendSerialized2Player(body=message.relay.body, player=target, sender_id=master.id)
+
+    def _on_notify_standby(self, message: snakes.GameMessage):
+        master = self.player_manager.getMaster()
+        if self.player_manager.client_player.role != snakes.DEPUTY or master is None or \
+                message.sender_id != master.id:
+            return
+        if not self.hot_standby:
+            self._enableHotStandby()
+        standby = message.standby
+        if standby.state_order <= self._state_order:
+            return
+        if standby.state_order not in self._standby:
+            # The MASTER sends the first one for a state_order right after its tick.
+            self._next_tick_at = time.monotonic() + self.state_delay_ms / 1000
+        # Every StandbyMsg holds all turns so far, so the latest replaces the ones before.
+        self._standby[standby.state_order] = standby
+        for state_order in [state_order for state_order in self._standby if state_order <= self._state_order]:
+            self._standby.pop(state_order)
+
+    def _on_notify_viewport(self, message: snakes.GameMessage, host: str, port: int):
+        if self.player_manager.client_player.role != snakes.MASTER:
+            return
+        player = self.player_manager.getPlayerByID(message.sender_id)
+        if player is None:
+            return
+        viewport = message.viewport
+        if viewport.width > 0 and viewport.height > 0:
+            player.viewport = (
+                viewport.x % self.field_manager.width, viewport.y % self.field_manager.height,
+                min(viewport.width, self.field_manager.width), min(viewport.height, self.field_manager.height)
+            )
+        else:
+            player.viewport = None
+        self._acknowledge(message, host, port)
+
     def _on_notify_ack(self, message: snakes.GameMessage):
-        if message.msg_seq in self._messages_expecting_ack.keys():
-            self._messages_expecting_ack.pop(message.msg_seq)
+        if self._reliability.acknowledge(message.msg_seq) is not None:
             match message.WhichOneof("Type"):
                 case "role_change":
                     self.player_manager.client_player.role = message.role_change.sender_role
@@ -469,29 +997,26 @@ class GameEngine(Subscriber):
             self.player_manager.client_player.id = message.receiver_id
             self.__player_id = message.receiver_id
 
-    def _on_notify_steer(self, message: snakes.GameMessage, datagram: QNetworkDatagram):
+    def _on_notify_steer(self, message: snakes.GameMessage, host: str, port: int):
         snakes_with_id = set(filter(lambda s: s.player_id == message.sender_id, self.field_manager.getSnakes()))
         if len(snakes_with_id) > 0:
             for snake in snakes_with_id:
                 if Snake.steer_block[message.steer.direction] != snake.direction:
                     snake.turn(message.steer.direction)
-            self._acknowledge(message=message, host=datagram.senderAddress(), port=datagram.senderPort())
-
-    def _on_notify_role_change(self, message: snakes.GameMessage, datagram: QNetworkDatagram):
+            if self.hot_standby and self.player_manager.client_player.role == snakes.MASTER:
+                # The DEPUTY learns of the turn before its sender does, so an acked turn is never lost.
+                self._sendStandby()
+            self._acknowledge(message=message, host=host, port=port)
+
+    def _on_notify_role_change(self, message: snakes.GameMessage, host: str, port: int):
+        if message.role_change.sender_role == snakes.MASTER:
+            self._followMaster(message.sender_id)
         if message.role_change.sender_role == snakes.MASTER and message.role_change.receiver_role == snakes.VIEWER:
             self.player_manager.client_player.role = snakes.VIEWER
-            self._acknowledge(
-                message,
-                datagram.senderAddress().toString().replace("::ffff:", ""),
-                datagram.senderPort()
-            )
+            self._acknowledge(message, host, port)
         elif message.role_change.sender_role == snakes.MASTER and message.role_change.receiver_role == snakes.MASTER:
             if self.player_manager.client_player.role == snakes.DEPUTY:
-                self._acknowledge(
-                    message,
-                    datagram.senderAddress().toString().replace("::ffff:", ""),
-                    datagram.senderPort()
-                )
+                self._acknowledge(message, host, port)
                 master = self.player_manager.getMaster()
                 master.role = snakes.VIEWER
                 self._becomeMaster()
@@ -500,11 +1025,7 @@ class GameEngine(Subscriber):
                 player = self.player_manager.getPlayerByID(message.sender_id)
                 if player is not None:
                     player.role = snakes.VIEWER
-                    snakes_with_id = set(
-                        filter(lambda s: s.player_id == player.id, self.field_manager.getSnakes())
-                    )
-                    for snake in snakes_with_id:
-                        snake.state = snakes.GameState.Snake.SnakeState.ZOMBIE
+                    self._zombify(player.id)
                     self._acknowledge(message, player.ip_address, player.port)
                 else:
                     logging.warning(f"Player with id {message.sender_id} requested changing role "
@@ -528,22 +1049,44 @@ class GameEngine(Subscriber):
             logging.warning("Unsupported role_change request:")
             logging.warning(message)
             return
-        self._acknowledge(message, datagram.senderAddress().toString().replace("::ffff:", ""), datagram.senderPort())
+        self._acknowledge(message, host, port)
+
+    def _followMaster(self, player_id: int) -> None:
+        """Takes the player for the MASTER it says it is. A DEPUTY that took over tells everyone so,
+        possibly before they notice that the old MASTER is gone."""
+        player = self.player_manager.getPlayerByID(player_id)
+        master = self.player_manager.getMaster()
+        if player is None or player is master:
+            return
+        if master is self.player_manager.client_player:
+            if player.role != snakes.DEPUTY:
+                return
+            # Our DEPUTY has taken us for dead, and two MASTERs would split the game.
+            logging.warning(f"{player.name}#{player.id} took over as MASTER")
+            self._tick_timer.stop()
+            self._announce_timer.stop()
+        if master is not None:
+            master.role = snakes.VIEWER
+        player.role = snakes.MASTER
 
-    def _on_notify_join(self, message: snakes.GameMessage, datagram: QNetworkDatagram):
-        ip_address = datagram.senderAddress().toString().replace("::ffff:", "")
+    def _on_notify_join(self, message: snakes.GameMessage, host: str, port: int):
         if message.join.requested_role == snakes.VIEWER:
             player_id = self._player_id()
             player = Player(
                 name=message.join.player_name,
                 id=player_id,
-                ip_address=ip_address,
-                port=datagram.senderPort(),
-                role=snakes.VIEWER
+                ip_address=host,
+                port=port,
+                role=snakes.VIEWER,
+                type=message.join.player_type,
+                supports_state_delta=message.join.supports_state_delta,
+                supports_state_chunks=message.join.supports_state_chunks,
+                supports_lockstep=message.join.supports_lockstep,
+                supports_relay=message.join.supports_relay
             )
             self.player_manager.addPlayer(player)
             message.sender_id, message.receiver_id = player_id, self.player_manager.client_player.id
-            self._acknowledge(message=message, host=ip_address, port=datagram.senderPort())
+            self._acknowledge(message=message, host=host, port=port)
             self._sendGameState(player)
             logging.info(f"{player.name}#{player.id} ({player.ip_address}:{player.port}) has joined as VIEWER.")
             return
@@ -556,24 +1099,31 @@ class GameEngine(Subscriber):
                     error_message="Could not find space on field."
                 )
             )
-            self._sendMessage(message=errorMessage, host=ip_address, port=datagram.senderPort())
+            self._sendMessage(message=errorMessage, host=host, port=port)
             return
 
         player_id = self._player_id()
         player = Player(
             name=message.join.player_name,
             id=player_id,
-            ip_address=ip_address,
-            port=datagram.senderPort(),
-            role=snakes.VIEWER if message.join.requested_role == snakes.VIEWER else snakes.NORMAL
+            ip_address=host,
+            port=port,
+            role=snakes.VIEWER if message.join.requested_role == snakes.VIEWER else snakes.NORMAL,
+            type=message.join.player_type,
+            supports_state_delta=message.join.supports_state_delta,
+            supports_state_chunks=message.join.supports_state_chunks,
+            supports_lockstep=message.join.supports_lockstep,
+            supports_relay=message.join.supports_relay
         )
         self.player_manager.addPlayer(player)
 
         snake_x, snake_y = pos
         self.field_manager.spawnSnake(x=snake_x, y=snake_y, player_id=player_id)
+        # Nobody else can compute the new snake, so everyone gets the next state in full.
+        self._lockstep_receivers.clear()
 
         message.sender_id, message.receiver_id = player_id, self.player_manager.client_player.id
-        self._acknowledge(message=message, host=ip_address, port=datagram.senderPort())
+        self._acknowledge(message=message, host=host, port=port)
         self._sendGameState(player)
 
         if self.player_manager.getDeputy() is None:
@@ -1,8 +1,11 @@
+import hashlib
 import random, logging
-from typing import Union, List, Tuple, Iterable, Set, Dict
+from collections import deque
+from typing import Union, List, Tuple, Iterable, Set, Dict, Deque
 
 from google.protobuf.internal.containers import RepeatedCompositeFieldContainer
 import snakes.snakes_pb2 as snakes
+from game.wire import coord, encodeSnake
 
 
 
@@ -22,13 +25,15 @@ class Snake:
             direction: snakes.Direction = snakes.UP,
             state: snakes.GameState.Snake.SnakeState = snakes.GameState.Snake.SnakeState.ALIVE,
     ):
+        # Serialized GameState.Snake for (width, height), dropped whenever the snake changes.
+        self._encoded: Union[Tuple[int, int, bytes], None] = None
         self.player_id = player_id
         self.state = state
         self.direction = direction
         self._requested_direction = None
         self.head_x = head_x
         self.head_y = head_y
-        self.tail = list()
+        self.tail: Deque[Tuple[int, int]] = deque()
         if self.direction == snakes.Direction.UP:
             self.tail.append((self.head_x, self.head_y + 1))
         elif self.direction == snakes.Direction.DOWN:
@@ -38,10 +43,29 @@ class Snake:
         elif self.direction == snakes.Direction.RIGHT:
             self.tail.append((self.head_x - 1, self.head_y))
 
+    @property
+    def state(self) -> snakes.GameState.Snake.SnakeState:
+        return self._state
+
+    @state.setter
+    def state(self, state: snakes.GameState.Snake.SnakeState) -> None:
+        self._state = state
+        self._encoded = None
+
+    @property
+    def direction(self) -> snakes.Direction:
+        return self._direction
+
+    @direction.setter
+    def direction(self, direction: snakes.Direction) -> None:
+        self._direction = direction
+        self._encoded = None
+
     def turn(self, direction: snakes.Direction):
         self._requested_direction = direction
 
     def move(self):
+        self._encoded = None
         new_x, new_y = self.head_x, self.head_y
         if self._requested_direction is not None:
             self.direction = self._requested_direction
@@ -54,19 +78,32 @@ class Snake:
             new_x -= 1
         elif self.direction == snakes.Direction.RIGHT:
             new_x += 1
-        last = self.tail[-1]
-        self.tail = [(self.head_x, self.head_y)] + self.tail[:-1]
+        self.tail.appendleft((self.head_x, self.head_y))
+        last = self.tail.pop()
         self.head_x, self.head_y = new_x, new_y
         return last
 
+    def grow(self, block: Tuple[int, int]) -> None:
+        self._encoded = None
+        self.tail.append(block)
+
+    def advance(self, head_x: int, head_y: int, tail_retracted: int = 1) -> None:
+        self._encoded = None
+        self.tail.appendleft((self.head_x, self.head_y))
+        self.head_x, self.head_y = head_x, head_y
+        for _ in range(tail_retracted):
+            self.tail.pop()
+
     def toPoints(self, width: int, height: int) -> List[Tuple[int, int]]:
         points = list()
         old_x = self.head_x % width
         old_y = self.head_y % height
         points.append((old_x, old_y))
         for x, y in self.tail:
-            dx = (x % width) - old_x
-            dy = (y % height) - old_y
+            x, y = x % width, y % height
+            # The shortest offset across the border, so a wrapped snake is still made of unit steps.
+            dx = (x - old_x + width // 2) % width - width // 2
+            dy = (y - old_y + height // 2) % height - height // 2
             points.append((dx, dy))
             old_x, old_y = x, y
         return points
@@ -75,6 +112,7 @@ class Snake:
         if len(points) < 2:
             logging.warning("Snake's length is less than 2, something is very wrong!!")
             return
+        self._encoded = None
         head = points[0]
         if type(head) is snakes.GameState.Coord:
             old_x, old_y = head.x, head.y
@@ -104,27 +142,64 @@ class Snake:
             state=self.state
         )
 
+    def encoded(self, width: int, height: int) -> bytes:
+        """asMsg(width, height) serialized, cached until the snake moves or changes state.
+
+        The tail must only be changed through move(), grow(), advance() and fromPoints()."""
+        if self._encoded is None or self._encoded[:2] != (width, height):
+            self._encoded = (width, height, encodeSnake(self.player_id, self.toPoints(width, height),
+                                                        self.state, self.direction))
+        return self._encoded[2]
+
 
 class FieldManager:
     UPDATE_SCORE = 1
     UPDATE_DEATH = 2
+    SPAWN_RADIUS = 2
+    BUCKET_SIZE = 8
 
     def __init__(self, width: int, height: int, food_static: int):
         self.width = width
         self.height = height
         self.food_static = food_static
-        self._snakes: Set[Snake] = set()
+        # Source of every random draw; a seeded random.Random() makes ticks reproducible on every node.
+        self.random = random
+        # Keyed by player_id; insertion order fixes the order of random draws within a tick.
+        self._snakes: Dict[int, Snake] = dict()
         self._food: Set[Tuple[int, int]] = set()
+        self._spawn_sites: Union[List[Tuple[int, int]], None] = None
+        self._buckets: Union[Tuple[Dict[Tuple[int, int], List[Snake]],
+                                   Dict[Tuple[int, int], List[Tuple[int, int]]]], None] = None
 
     def getSnakes(self) -> Set[Snake]:
-        return self._snakes.copy()
+        return set(self._snakes.values())
 
     def getFood(self) -> Set[Tuple[int, int]]:
         return self._food.copy()
 
+    def getSnake(self, player_id: int) -> Union[Snake, None]:
+        return self._snakes.get(player_id)
+
+    def sortSnakes(self) -> None:
+        """Orders snakes by player_id, so that nodes which got the same state draw random numbers in the same order."""
+        self._snakes = dict(sorted(self._snakes.items()))
+
+    def pendingTurns(self) -> List[Tuple[int, snakes.Direction]]:
+        return [(snake.player_id, snake._requested_direction) for snake in self._snakes.values()
+                if snake._requested_direction is not None]
+
+    def stateHash(self) -> int:
+        """64-bit digest of the snakes and food, equal on two nodes only if their fields are."""
+        digest = hashlib.blake2b(digest_size=8)
+        for snake in sorted(self.getSnakes(), key=lambda snake: snake.player_id):
+            digest.update(snake.encoded(self.width, self.height))
+        for x, y in sorted(self.getFood()):
+            digest.update(coord(x, y))
+        return int.from_bytes(digest.digest(), "little")
+
     def _getOccupiedBlocks(self):
         occupied_blocks = self._food.copy()
-        for snake in self._snakes:
+        for snake in self._snakes.values():
             occupied_blocks.add((snake.head_x % self.width, snake.head_y % self.height))
             for x, y in snake.tail:
                 occupied_blocks.add((x % self.width, y % self.height))
@@ -134,8 +209,8 @@ class FieldManager:
         if occupied_blocks is None:
             occupied_blocks = set()
         while True:
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
+            x = self.random.randint(0, self.width - 1)
+            y = self.random.randint(0, self.height - 1)
             if (x, y) not in occupied_blocks:
                 self._food.add((x, y))
                 return x, y
@@ -151,13 +226,13 @@ class FieldManager:
     def _spawnFoodFromSnake(self, snake: Snake) -> None:
         snake_blocks = [(x % self.width, y % self.height) for x, y in snake.tail]
         for block in snake_blocks:
-            if random.random() < 0.5:
+            if self.random.random() < 0.5:
                 self._food.add(block)
 
     def _tickDeath(self) -> Set[Tuple[int, int]]:
         updates: Set[Tuple[int, int]] = set()
         killing_blocks: Dict[Tuple[int, int], List[Snake]] = dict()
-        for snake in self._snakes:
+        for snake in self._snakes.values():
             head_pos = (snake.head_x % self.width, snake.head_y % self.height)
             if head_pos not in killing_blocks.keys():
                 killing_blocks[head_pos] = list()
@@ -167,8 +242,8 @@ class FieldManager:
                 if pos not in killing_blocks.keys():
                     killing_blocks[pos] = list()
                 killing_blocks[pos].append(snake)
-        dead_snakes = set()
-        for snake in self._snakes:
+        dead_snakes = list()
+        for snake in self._snakes.values():
             head_pos = (snake.head_x % self.width, snake.head_y % self.height)
             if head_pos in killing_blocks.keys():
                 killers = [s for s in killing_blocks[head_pos]]
@@ -178,22 +253,22 @@ class FieldManager:
                 for killer in killers:
                     if killer != snake:
                         updates.add((snake.player_id, FieldManager.UPDATE_SCORE))
-                dead_snakes.add(snake)
+                dead_snakes.append(snake)
                 self._spawnFoodFromSnake(snake)
                 updates.add((snake.player_id, FieldManager.UPDATE_DEATH))
         for snake in dead_snakes:
-            self._snakes.remove(snake)
+            self._snakes.pop(snake.player_id)
         return updates
 
     def _tickFood(self) -> Set[Tuple[int, int]]:
         updates: Set[Tuple[int, int]] = set()
         food_to_be_deleted = set()
-        for snake in self._snakes:
+        for snake in self._snakes.values():
             last = snake.move()
             pos = (snake.head_x % self.width, snake.head_y % self.height)
             if pos in self._food:
                 food_to_be_deleted.add(pos)
-                snake.tail.append(last)
+                snake.grow(last)
                 updates.add((snake.player_id, FieldManager.UPDATE_SCORE))
         self._food.difference_update(food_to_be_deleted)
         return updates
@@ -205,24 +280,91 @@ class FieldManager:
         death_updates = self._tickDeath()
         updates.update(death_updates)
         self._replenishFood()
+        self._invalidateSpawnSites()
         return updates
 
+    def _invalidateSpawnSites(self) -> None:
+        # Called after every change of the field, which also outdates the bucket index.
+        self._spawn_sites = None
+        self._buckets = None
+
+    def _findSpawnSites(self) -> List[Tuple[int, int]]:
+        # Summed-area table over the field padded by SPAWN_RADIUS cells with wrap-around,
+        # so every (2r+1)x(2r+1) toroidal window is summed in O(1).
+        r = self.SPAWN_RADIUS
+        side = 2 * r + 1
+        padded_width = self.width + 2 * r
+        padded_height = self.height + 2 * r
+        occupied = [bytearray(self.width) for _ in range(self.height)]
+        for x, y in self._getOccupiedBlocks():
+            occupied[y][x] = 1
+
+        sat = [[0] * (padded_width + 1)]
+        for py in range(padded_height):
+            row = occupied[(py - r) % self.height]
+            prev = sat[py]
+            current = [0] * (padded_width + 1)
+            row_sum = 0
+            for px in range(padded_width):
+                row_sum += row[(px - r) % self.width]
+                current[px + 1] = prev[px + 1] + row_sum
+            sat.append(current)
+
+        sites = list()
+        for y in range(self.height):
+            top, bottom = sat[y], sat[y + side]
+            for x in range(self.width):
+                if bottom[x + side] - top[x + side] - bottom[x] + top[x] == 0:
+                    sites.append((x, y))
+        return sites
+
+    def _getSpawnSites(self) -> List[Tuple[int, int]]:
+        if self._spawn_sites is None:
+            self._spawn_sites = self._findSpawnSites()
+        return self._spawn_sites
+
+    def canSpawnSnake(self) -> bool:
+        return len(self._getSpawnSites()) > 0
+
     def getPosForNewSnake(self) -> Union[Tuple[int, int], None]:
-        def f(lx, ly): return lx % self.width, ly % self.height
-        k = 30
-        occupied_blocks = self._getOccupiedBlocks()
-        while k:
-            k -= 1
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            is_occupied = False
-            for dx in range(-2, 3):
-                for dy in range(-2, 3):
-                    if f(x + dx, y + dy) in occupied_blocks:
-                        is_occupied = True
-            if not is_occupied:
-                return x, y
-        return None
+        sites = self._getSpawnSites()
+        if len(sites) == 0:
+            return None
+        return self.random.choice(sites)
+
+    def _getBuckets(self):
+        if self._buckets is None:
+            b = self.BUCKET_SIZE
+            snake_buckets: Dict[Tuple[int, int], List[Snake]] = dict()
+            for snake in self.getSnakes():
+                keys = {((x % self.width) // b, (y % self.height) // b) for x, y in snake.tail}
+                keys.add(((snake.head_x % self.width) // b, (snake.head_y % self.height) // b))
+                for key in keys:
+                    snake_buckets.setdefault(key, list()).append(snake)
+            food_buckets: Dict[Tuple[int, int], List[Tuple[int, int]]] = dict()
+            for x, y in self.getFood():
+                food_buckets.setdefault((x // b, y // b), list()).append((x, y))
+            self._buckets = (snake_buckets, food_buckets)
+        return self._buckets
+
+    def getRegion(self, x: int, y: int, width: int, height: int) -> Tuple[List[Snake], List[Tuple[int, int]]]:
+        """Snakes and food in the width x height cells from (x, y), wrapping around the field edges.
+
+        Looks up BUCKET_SIZE x BUCKET_SIZE buckets of an index that is kept until the field changes, so
+        a snake passing through a bucket the region only partly covers is returned as well."""
+        columns = {(x + i) % self.width for i in range(min(width, self.width))}
+        rows = {(y + i) % self.height for i in range(min(height, self.height))}
+        b = self.BUCKET_SIZE
+        snake_buckets, food_buckets = self._getBuckets()
+        region_snakes: Dict[int, Snake] = dict()
+        food = list()
+        for bucket_x in {column // b for column in columns}:
+            for bucket_y in {row // b for row in rows}:
+                for snake in snake_buckets.get((bucket_x, bucket_y), ()):
+                    region_snakes[snake.player_id] = snake
+                food.extend((food_x, food_y) for food_x, food_y in food_buckets.get((bucket_x, bucket_y), ())
+                            if food_x in columns and food_y in rows)
+        return list(region_snakes.values()), food
 
     def spawnSnake(
             self,
@@ -234,36 +376,90 @@ class FieldManager:
         snake = Snake(
             player_id=player_id,
             head_x=x, head_y=y,
-            direction=random.choice(
+            direction=self.random.choice(
                 [snakes.Direction.UP, snakes.Direction.DOWN, snakes.Direction.LEFT, snakes.Direction.RIGHT]
             ),
             state=state
         )
-        self._snakes.add(snake)
+        self._snakes[player_id] = snake
+        self._invalidateSpawnSites()
+
+    @staticmethod
+    def _snakeFromMsg(snake: snakes.GameState.Snake) -> Snake:
+        new_snake = Snake(
+            player_id=snake.player_id,
+            direction=snake.head_direction,
+            head_x=0, head_y=0,
+            state=snake.state
+        )
+        new_snake.fromPoints(snake.points)
+        return new_snake
 
     def snakesFromMsg(self, message_snakes: RepeatedCompositeFieldContainer[snakes.GameState.Snake]):
         alive_ids = set()
         for snake in message_snakes:
             alive_ids.add(snake.player_id)
-            found = False
-            for old_snake in self._snakes:
-                if old_snake.player_id == snake.player_id:
-                    old_snake.direction = snake.head_direction
-                    old_snake.fromPoints(snake.points)
-                    found = True
-                    break
-            if not found:
-                new_snake = Snake(
-                    player_id=snake.player_id,
-                    direction=snake.head_direction,
-                    head_x=0, head_y=0,
-                    state=snake.state
-                )
-                new_snake.fromPoints(snake.points)
-                self._snakes.add(new_snake)
-        self._snakes = set(filter(lambda snake: snake.player_id in alive_ids, self._snakes))
+            old_snake = self._snakes.get(snake.player_id)
+            if old_snake is not None:
+                old_snake.state = snake.state
+                old_snake.direction = snake.head_direction
+                old_snake.turn(None)
+                old_snake.fromPoints(snake.points)
+            else:
+                self._snakes[snake.player_id] = self._snakeFromMsg(snake)
+        for player_id in [player_id for player_id in self._snakes.keys() if player_id not in alive_ids]:
+            self._snakes.pop(player_id)
+        self._invalidateSpawnSites()
 
     def foodFromMsg(self, foods: RepeatedCompositeFieldContainer[snakes.GameState.Coord]):
         self._food.clear()
         for coord in foods:
             self._food.add((coord.x, coord.y))
+        self._invalidateSpawnSites()
+
+    def takeSnapshot(self) -> Tuple[Dict[int, int], Set[Tuple[int, int]]]:
+        return {snake.player_id: len(snake.tail) for snake in self._snakes.values()}, self._food.copy()
+
+    def fillDeltaMsg(self, delta: snakes.GameStateDelta, snapshot: Tuple[Dict[int, int], Set[Tuple[int, int]]]) -> None:
+        tail_lengths, food = snapshot
+        for snake in self._snakes.values():
+            if snake.player_id not in tail_lengths:
+                delta.new_snakes.append(snake.asMsg(self.width, self.height))
+                continue
+            snake_delta = delta.moved_snakes.add(
+                player_id=snake.player_id,
+                head=snakes.GameState.Coord(x=snake.head_x % self.width, y=snake.head_y % self.height),
+                head_direction=snake.direction
+            )
+            if snake.state != snakes.GameState.Snake.SnakeState.ALIVE:
+                snake_delta.state = snake.state
+            tail_retracted = tail_lengths[snake.player_id] + 1 - len(snake.tail)
+            if tail_retracted != 1:
+                snake_delta.tail_retracted = tail_retracted
+        delta.removed_snakes.extend(player_id for player_id in tail_lengths.keys() if player_id not in self._snakes)
+        delta.added_foods.extend(snakes.GameState.Coord(x=x, y=y) for x, y in self._food - food)
+        delta.removed_foods.extend(snakes.GameState.Coord(x=x, y=y) for x, y in food - self._food)
+
+    def applyDeltaMsg(self, delta: snakes.GameStateDelta) -> bool:
+        for snake_delta in delta.moved_snakes:
+            snake = self._snakes.get(snake_delta.player_id)
+            if snake is None or snake_delta.tail_retracted > len(snake.tail) + 1:
+                logging.warning(f"State delta does not match snake of player {snake_delta.player_id}")
+                return False
+
+        removed_ids = set(delta.removed_snakes)
+        removed_ids.update(snake.player_id for snake in delta.new_snakes)
+        for player_id in removed_ids:
+            self._snakes.pop(player_id, None)
+        for snake_delta in delta.moved_snakes:
+            snake = self._snakes[snake_delta.player_id]
+            snake.advance(snake_delta.head.x, snake_delta.head.y, snake_delta.tail_retracted)
+            snake.direction = snake_delta.head_direction
+            snake.state = snake_delta.state
+        for snake in delta.new_snakes:
+            self._snakes[snake.player_id] = self._snakeFromMsg(snake)
+
+        self._food.difference_update((coord.x, coord.y) for coord in delta.removed_foods)
+        self._food.update((coord.x, coord.y) for coord in delta.added_foods)
+        self._invalidateSpawnSites()
+        return True
@@ -0,0 +1,96 @@
+import logging
+import time
+from typing import Dict, List, Tuple, Union
+
+import snakes.snakes_pb2 as snakes
+from game.wire import StateFragments, encodeGameState, encodeStateMsg, fieldSize
+
+
+
+class StatePacketizer:
+    """Splits a state that does not fit into one datagram into StateMsg parts that each fit.
+
+    Every part is a complete GameState with the same state_order and a share of the players, snakes
+    and foods, so no part depends on another being decoded first. A single snake longer than a
+    datagram cannot be split and gets a part of its own."""
+    # 1500-byte Ethernet MTU minus the IPv4 and UDP headers.
+    MAX_DATAGRAM = 1472
+    # Left for the msg_seq, sender_id and receiver_id prepended to every recipient's copy.
+    HEADER_RESERVE = 32
+
+    def __init__(self, max_datagram: int = MAX_DATAGRAM):
+        self.budget = max_datagram - self.HEADER_RESERVE
+
+    def fits(self, body: bytes) -> bool:
+        return len(body) <= self.budget
+
+    def split(self, fragments: StateFragments, partial: bool = False) -> List[bytes]:
+        body = encodeStateMsg(encodeGameState(fragments), partial=partial)
+        if self.fits(body):
+            return [body]
+        empty = encodeStateMsg(encodeGameState(StateFragments(fragments.state_order, [], [], [])), 2 ** 20, 2 ** 20,
+                               partial=partial)
+        # The length prefixes of the nested messages grow with their content.
+        room = self.budget - len(empty) - 6
+
+        items = [("players", player) for player in fragments.players]
+        items.extend(("snakes", snake) for snake in fragments.snakes)
+        items.extend(("foods", food) for food in fragments.foods)
+        chunks: List[StateFragments] = list()
+        used = room
+        for field, item in items:
+            cost = fieldSize(item)
+            if used + cost > room:
+                chunks.append(StateFragments(fragments.state_order, list(), list(), list()))
+                used = 0
+            getattr(chunks[-1], field).append(item)
+            used += cost
+
+        return [encodeStateMsg(encodeGameState(chunk), i, len(chunks), partial=partial)
+                for i, chunk in enumerate(chunks)]
+
+
+
+class StateReassembler:
+    """Collects the parts of split states; a state whose parts are not all in within timeout_s is dropped."""
+
+    def __init__(self, timeout_s: float):
+        self.timeout_s = timeout_s
+        self._parts: Dict[int, Tuple[float, int, Dict[int, snakes.GameState]]] = dict()
+        self._last_complete = -1
+        self.incomplete = 0
+
+    def add(self, message: snakes.GameMessage) -> Union[snakes.GameMessage, None]:
+        """Returns the whole state once its last part arrives, and an unsplit state right away."""
+        state_msg = message.state
+        if state_msg.chunk_count <= 1:
+            return message
+        state_order = state_msg.state.state_order
+        now = time.monotonic()
+        for stale in [order for order, (first_seen, _, _) in self._parts.items()
+                      if first_seen + self.timeout_s < now]:
+            self._parts.pop(stale)
+            self.incomplete += 1
+            logging.info(f"Dropped state {stale}, not all of its parts arrived")
+        if state_order <= self._last_complete or not 0 <= state_msg.chunk_index < state_msg.chunk_count:
+            return None
+
+        first_seen, chunk_count, parts = self._parts.setdefault(state_order, (now, state_msg.chunk_count, dict()))
+        if state_msg.chunk_index >= chunk_count:
+            return None
+        parts[state_msg.chunk_index] = state_msg.state
+        if len(parts) < chunk_count:
+            return None
+
+        state = snakes.GameState()
+        for i in range(chunk_count):
+            state.MergeFrom(parts[i])
+        for order in [order for order in self._parts.keys() if order <= state_order]:
+            self._parts.pop(order)
+        self._last_complete = state_order
+        whole = snakes.GameMessage()
+        whole.CopyFrom(message)
+        whole.state.state.CopyFrom(state)
+        whole.state.ClearField("chunk_index")
+        whole.state.ClearField("chunk_count")
+        return whole
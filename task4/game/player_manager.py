@@ -1,11 +1,18 @@
 import logging
-from typing import Set, Union, List
+import time
+from typing import Set, Union, List, Dict, Tuple
 from google.protobuf.internal.containers import RepeatedCompositeFieldContainer
 import snakes.snakes_pb2 as snakes
 
 
 
 class Player:
+    __slots__ = (
+        "name", "_id", "ip_address", "port", "_role", "score", "type", "is_client", "supports_state_delta",
+        "supports_state_chunks", "supports_lockstep", "supports_relay", "last_socket_message_got",
+        "last_socket_message_sent", "_manager", "_encoded", "viewport"
+    )
+
     def __init__(
             self,
             name: str,
@@ -15,18 +22,51 @@ class Player:
             role: snakes.NodeRole = snakes.NORMAL,
             type: snakes.PlayerType = snakes.HUMAN,
             score: int = 0,
-            is_client: bool = False
+            is_client: bool = False,
+            supports_state_delta: bool = False,
+            supports_state_chunks: bool = False,
+            supports_lockstep: bool = False,
+            supports_relay: bool = False
     ):
+        self._manager: Union["PlayerManager", None] = None
+        self._encoded: Union[Tuple[Tuple, bytes], None] = None
         self.name = name
-        self.id = id
+        self._id = id
         self.ip_address = ip_address
         self.port = port
-        self.role = role
+        self._role = role
         self.score = score
         self.type = type
         self.is_client = is_client
-        self.last_socket_message_got = 0
+        self.supports_state_delta = supports_state_delta
+        self.supports_state_chunks = supports_state_chunks
+        self.supports_lockstep = supports_lockstep
+        self.supports_relay = supports_relay
+        # A player we have not heard from yet still gets a full timeout before being kicked.
+        self.last_socket_message_got = time.time_ns()
         self.last_socket_message_sent = 0
+        # (x, y, width, height) from the player's ViewportMsg, kept only by the MASTER.
+        self.viewport: Union[Tuple[int, int, int, int], None] = None
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @id.setter
+    def id(self, id: int) -> None:
+        old_id, self._id = self._id, id
+        if self._manager is not None and old_id != id:
+            self._manager._onIDChanged(self, old_id)
+
+    @property
+    def role(self) -> snakes.NodeRole:
+        return self._role
+
+    @role.setter
+    def role(self, role: snakes.NodeRole) -> None:
+        old_role, self._role = self._role, role
+        if self._manager is not None and old_role != role:
+            self._manager._onRoleChanged(self, old_role)
 
     def asMsg(self):
         return snakes.GamePlayer(
@@ -35,14 +75,32 @@ class Player:
             ip_address=self.ip_address,
             port=self.port,
             role=self.role,
-            score=self.score
+            type=self.type,
+            score=self.score,
+            supports_state_delta=self.supports_state_delta,
+            supports_state_chunks=self.supports_state_chunks,
+            supports_lockstep=self.supports_lockstep,
+            supports_relay=self.supports_relay
         )
 
+    def snapshot(self) -> Tuple:
+        return self.name, self.role, self.type, self.score, self.supports_state_delta, self.supports_state_chunks, \
+            self.supports_lockstep, self.supports_relay
+
+    def encoded(self) -> bytes:
+        """asMsg() serialized, re-encoded only when one of the fields it carries has changed."""
+        key = (self._id, self.ip_address, self.port) + self.snapshot()
+        if self._encoded is None or self._encoded[0] != key:
+            self._encoded = (key, self.asMsg().SerializePartialToString())
+        return self._encoded[1]
+
 
 class PlayerManager:
     def __init__(self, client_player: Player, existing_players: snakes.GamePlayers):
         self.client_player = client_player
-        self._players: set[Player] = set()
+        self._players: Set[Player] = set()
+        self._players_by_id: Dict[int, Player] = dict()
+        self._players_by_role: Dict[snakes.NodeRole, Set[Player]] = dict()
         self.addPlayer(client_player)
         if existing_players is not None:
             try:
@@ -51,33 +109,25 @@ class PlayerManager:
                 print(e)
 
     def asMsg(self) -> List[snakes.GamePlayer]:
-        game_players = list()
-        for player in self._players:
-            game_player = snakes.GamePlayer(
-                name=player.name,
-                id=player.id,
-                ip_address=player.ip_address,
-                port=player.port,
-                role=player.role,
-                type=player.type,
-                score=player.score
-            )
-            game_players.append(game_player)
-        return game_players
+        return [player.asMsg() for player in self._players]
+
+    def encoded(self) -> List[bytes]:
+        return [player.encoded() for player in self._players]
 
     def playersFromMsg(self, players: RepeatedCompositeFieldContainer[snakes.GamePlayer]):
         for player in players:
-            found = False
-            for old_player in self._players:
-                if player.id == old_player.id:
-                    old_player.name = player.name
-                    old_player.role = player.role
-                    old_player.type = player.type
-                    old_player.score = player.score
-                    found = True
-                    break
-            if not found:
-                self._players.add(
+            old_player = self._players_by_id.get(player.id)
+            if old_player is not None:
+                old_player.name = player.name
+                old_player.role = player.role
+                old_player.type = player.type
+                old_player.score = player.score
+                old_player.supports_state_delta = player.supports_state_delta
+                old_player.supports_state_chunks = player.supports_state_chunks
+                old_player.supports_lockstep = player.supports_lockstep
+                old_player.supports_relay = player.supports_relay
+            else:
+                self.addPlayer(
                     Player(
                         name=player.name,
                         id=player.id,
@@ -85,53 +135,93 @@ class PlayerManager:
                         port=player.port,
                         role=player.role,
                         type=player.type,
-                        score=player.score
+                        score=player.score,
+                        supports_state_delta=player.supports_state_delta,
+                        supports_state_chunks=player.supports_state_chunks,
+                        supports_lockstep=player.supports_lockstep,
+                        supports_relay=player.supports_relay
                     )
                 )
 
+    def takeSnapshot(self) -> Dict[int, Tuple]:
+        return {player.id: player.snapshot() for player in self._players}
+
+    def fillDeltaMsg(self, delta: snakes.GameStateDelta, snapshot: Dict[int, Tuple]) -> None:
+        for player in self._players:
+            if snapshot.get(player.id) != player.snapshot():
+                delta.changed_players.append(player.asMsg())
+        delta.removed_players.extend(id for id in snapshot.keys() if id not in self._players_by_id)
+
+    def applyDeltaMsg(self, delta: snakes.GameStateDelta) -> None:
+        self.playersFromMsg(delta.changed_players)
+        for id in delta.removed_players:
+            if id != self.client_player.id:
+                self.removePlayerByID(id)
+
+    def _indexID(self, player: Player) -> None:
+        other = self._players_by_id.get(player.id)
+        if other is not None and other is not player:
+            logging.warning(f"More than 1 player have id {player.id}")
+            # The shadowed player is dropped, unless it is the client, which always keeps its id.
+            if other is self.client_player:
+                self._removePlayer(player)
+                return
+            self._removePlayer(other)
+        self._players_by_id[player.id] = player
+
+    def _unindexID(self, player: Player, id: int) -> None:
+        if self._players_by_id.get(id) is player:
+            self._players_by_id.pop(id)
+
+    def _onIDChanged(self, player: Player, old_id: int) -> None:
+        self._unindexID(player, old_id)
+        self._indexID(player)
+
+    def _onRoleChanged(self, player: Player, old_role: snakes.NodeRole) -> None:
+        self._players_by_role[old_role].discard(player)
+        self._players_by_role.setdefault(player.role, set()).add(player)
+
     def getPlayers(self, fn=lambda x: True) -> Set[Player]:
         return set(filter(fn, self._players))
 
     def getPlayerByID(self, id: int) -> Union[Player, None]:
-        players_with_id = self.getPlayers(lambda x: x.id == id)
-        if len(players_with_id) == 0:
-            return None
-        if len(players_with_id) > 1:
-            logging.warning(f"More than 1 player have id {id}")
-        return players_with_id.pop()
+        return self._players_by_id.get(id)
 
     def getPlayersWithRole(self, role: snakes.NodeRole) -> Set[Player]:
-        players_with_role = self.getPlayers(lambda x: x.role == role)
-        return players_with_role
+        return self._players_by_role.get(role, set()).copy()
 
-    def getMaster(self) -> Union[Player, None]:
-        masters = self.getPlayersWithRole(snakes.MASTER)
-        if len(masters) == 0:
+    def _getSinglePlayerWithRole(self, role: snakes.NodeRole) -> Union[Player, None]:
+        players_with_role = self._players_by_role.get(role)
+        if not players_with_role:
             return None
-        if len(masters) > 1:
-            logging.warning("More than 1 player with MASTER role were found.")
-        return masters.pop()
+        if len(players_with_role) > 1:
+            logging.warning(f"More than 1 player with {snakes.NodeRole.Name(role)} role were found.")
+        return next(iter(players_with_role))
+
+    def getMaster(self) -> Union[Player, None]:
+        return self._getSinglePlayerWithRole(snakes.MASTER)
 
     def getDeputy(self) -> Union[Player, None]:
-        deputies = self.getPlayersWithRole(snakes.DEPUTY)
-        if len(deputies) == 0:
-            return None
-        if len(deputies) > 1:
-            logging.warning("More than 1 player with DEPUTY role were found.")
-        return deputies.pop()
+        return self._getSinglePlayerWithRole(snakes.DEPUTY)
 
     def addPlayer(self, player: Player) -> None:
+        if player in self._players:
+            return
         self._players.add(player)
+        player._manager = self
+        self._players_by_role.setdefault(player.role, set()).add(player)
+        self._indexID(player)
 
     def removePlayerByID(self, id: int) -> None:
-        players_with_id = set(filter(lambda x: x.id == id, self._players))
-        if len(players_with_id) > 1:
-            logging.warning(f"More than 1 player have id {id}")
-        self._players.difference_update(players_with_id)
+        player = self._players_by_id.get(id)
+        if player is not None:
+            self._removePlayer(player)
+
+    def _removePlayer(self, player: Player) -> None:
+        self._unindexID(player, player.id)
+        self._players.discard(player)
+        self._players_by_role[player.role].discard(player)
+        player._manager = None
 
     def getMaxPlayerID(self) -> int:
-        max_ = -1
-        for player in self._players:
-            if player.id > max_:
-                max_ = player.id
-        return max_
+        return max(self._players_by_id.keys(), default=-1)
@@ -0,0 +1,57 @@
+from collections import deque
+from typing import List, Tuple, Union
+
+import snakes.snakes_pb2 as snakes
+from game.field_manager import Snake
+
+
+
+class ClientPrediction:
+    """Steers of the client's own snake that no state from the MASTER reflects yet.
+
+    While a steer is pending the own snake is drawn one tick ahead in the steered direction, so a key
+    press shows at once. The next state normally puts the snake exactly there; if it does not, the
+    state wins and the prediction is dropped."""
+    # A steer that reaches the MASTER in time shows in the next state, a late one in the state after.
+    STEER_LIFETIME = 2
+
+    def __init__(self):
+        self._pending: List[Tuple[snakes.Direction, int]] = list()
+
+    def steer(self, direction: snakes.Direction, state_order: int) -> None:
+        self._pending.append((direction, state_order))
+
+    def clear(self) -> None:
+        self._pending.clear()
+
+    def reconcile(self, snake: Union[Snake, None], state_order: int) -> None:
+        if snake is None:
+            self._pending.clear()
+            return
+        applied = -1
+        for i, (direction, sent_order) in enumerate(self._pending):
+            if sent_order < state_order and direction == snake.direction:
+                applied = i
+        self._pending = [
+            (direction, sent_order) for direction, sent_order in self._pending[applied + 1:]
+            if state_order - sent_order < self.STEER_LIFETIME
+        ]
+
+    def predict(self, snake: Union[Snake, None]) -> Union[Snake, None]:
+        if snake is None:
+            return None
+        # Same rule as the MASTER: a reversing steer is ignored, the last accepted one wins.
+        accepted = [direction for direction, _ in self._pending if Snake.steer_block[direction] != snake.direction]
+        if len(accepted) == 0:
+            return None
+        predicted = Snake(
+            player_id=snake.player_id,
+            head_x=snake.head_x,
+            head_y=snake.head_y,
+            direction=snake.direction,
+            state=snake.state
+        )
+        predicted.tail = deque(snake.tail)
+        predicted.turn(accepted[-1])
+        predicted.move()
+        return predicted
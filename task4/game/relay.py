@@ -0,0 +1,89 @@
+import math
+from typing import Callable, Dict, Iterable, List, Set, Union
+
+import snakes.snakes_pb2 as snakes
+from game.player_manager import Player
+
+
+
+class RelayTree:
+    """Which relay forwards the states of each VIEWER, kept by the MASTER.
+
+    Relays are NORMAL or VIEWER players with supports_relay, picked by the lowest smoothed RTT, and
+    each forwards to at most fanout VIEWERs, so the MASTER sends one RelayMsg per relay instead of one
+    datagram per VIEWER. A rebuild keeps every VIEWER with its relay while that relay is still
+    usable: only VIEWERs of relays that left or stopped responding, and new ones, are moved. VIEWERs
+    no relay has room for get their states from the MASTER directly."""
+    # Bytes a RelayMsg wraps around a body at most: its field tag and length, the body's tag and
+    # length, the targets' tag and length, and an id below 2**21 per target.
+    ENVELOPE_SIZE = 12
+    TARGET_SIZE = 3
+
+    def __init__(self, fanout: int):
+        self.fanout = fanout
+        self._relay_of: Dict[int, int] = dict()
+        self._key = None
+
+    @classmethod
+    def envelopeSize(cls, fanout: int) -> int:
+        return cls.ENVELOPE_SIZE + cls.TARGET_SIZE * fanout
+
+    def relayOf(self, player_id: int) -> Union[int, None]:
+        return self._relay_of.get(player_id)
+
+    def relays(self) -> Set[int]:
+        return set(self._relay_of.values())
+
+    def clear(self) -> None:
+        self._relay_of.clear()
+        self._key = None
+
+    def update(self, players: Iterable[Player], usable: Callable[[Player], bool],
+               rtt: Callable[[Player], Union[float, None]]) -> None:
+        """Rebalances the tree if the VIEWERs or the players that could relay have changed."""
+        viewers = {player.id for player in players if player.role == snakes.VIEWER and not player.is_client}
+        candidates = [
+            player for player in players
+            if player.role in (snakes.NORMAL, snakes.VIEWER) and player.supports_relay and not player.is_client
+            and usable(player)
+        ]
+        key = (frozenset(viewers), frozenset(player.id for player in candidates))
+        if key == self._key:
+            return
+        self._key = key
+
+        def rank(player: Player):
+            player_rtt = rtt(player)
+            return (math.inf if player_rtt is None else player_rtt), player.id
+
+        candidates.sort(key=rank)
+        current = self.relays()
+        # Relays that still qualify first, so the tree changes as little as possible.
+        candidates.sort(key=lambda player: player.id not in current)
+        relays: List[int] = list()
+        targets = set(viewers)
+        for candidate in candidates:
+            if len(relays) * self.fanout >= len(targets):
+                break
+            relays.append(candidate.id)
+            targets.discard(candidate.id)
+
+        load = {relay_id: 0 for relay_id in relays}
+        relay_of: Dict[int, int] = dict()
+        unassigned = list()
+        for target in sorted(targets):
+            relay_id = self._relay_of.get(target)
+            if relay_id in load and load[relay_id] < self.fanout:
+                relay_of[target] = relay_id
+                load[relay_id] += 1
+            else:
+                unassigned.append(target)
+        for target in unassigned:
+            if len(load) == 0:
+                break
+            relay_id = min(load, key=load.get)
+            if load[relay_id] >= self.fanout:
+                break
+            relay_of[target] = relay_id
+            load[relay_id] += 1
+        self._relay_of = relay_of
@@ -0,0 +1,175 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Union, Hashable
+
+import snakes.snakes_pb2 as snakes
+
+
+
+class PendingMessage:
+    __slots__ = ("message", "address", "first_sent", "deadline", "timeout", "retries")
+
+    def __init__(self, message: snakes.GameMessage, address: Tuple[str, int], now: float, timeout: float):
+        self.message = message
+        self.address = address
+        self.first_sent = now
+        self.timeout = timeout
+        self.deadline = now + timeout
+        self.retries = 0
+
+
+
+class PeerLink:
+    """Smoothed RTT and retransmission timeout of one destination, as in RFC 6298."""
+
+    def __init__(self, initial_rto: float):
+        self.srtt: Union[float, None] = None
+        self.rttvar = 0.0
+        self.rto = initial_rto
+        self.pending: Dict[int, PendingMessage] = dict()
+
+    def onSample(self, rtt: float, granularity: float, min_rto: float, max_rto: float) -> None:
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(max_rto, max(min_rto, self.srtt + max(granularity, 4 * self.rttvar)))
+
+
+
+class ReliableDelivery:
+    """Bookkeeping for messages that expect an AckMsg, and for acks already sent.
+
+    Sent messages are queued per destination and retransmitted once their timeout passes, doubling
+    the timeout each time, until they are acknowledged or MAX_RETRIES is exceeded. Only acks of
+    messages that were never retransmitted feed the RTT estimate (Karn's algorithm).
+
+    On the receiving side the ack sent for every (sender_id, msg_seq) is remembered, so a duplicate
+    of an already handled message is answered with the same ack instead of being handled again."""
+    MAX_RETRIES = 8
+    MIN_RTO_S = 0.02
+    REPLY_CACHE_SIZE = 4096
+
+    def __init__(self, initial_rto_s: float, max_rto_s: float, granularity_s: float):
+        self.initial_rto = max(self.MIN_RTO_S, initial_rto_s)
+        self.max_rto = max(self.initial_rto, max_rto_s)
+        self.granularity = granularity_s
+        self._peers: Dict[Tuple[str, int], PeerLink] = dict()
+        self._pending: Dict[int, PendingMessage] = dict()
+        self._replies: "OrderedDict[Hashable, Tuple[bytes, str, int]]" = OrderedDict()
+        self.dropped = 0
+
+    def _peer(self, address: Tuple[str, int]) -> PeerLink:
+        peer = self._peers.get(address)
+        if peer is None:
+            peer = PeerLink(self.initial_rto)
+            self._peers[address] = peer
+        return peer
+
+    def track(self, message: snakes.GameMessage, host: str, port: int) -> None:
+        address = (host, port)
+        pending = self._pending.get(message.msg_seq)
+        if pending is not None:
+            # A retransmission, possibly redirected to a new MASTER: keep its backoff, move its queue.
+            if pending.address != address:
+                self._peer(pending.address).pending.pop(message.msg_seq, None)
+                pending.address = address
+                self._peer(address).pending[message.msg_seq] = pending
+            pending.message = message
+            return
+        peer = self._peer(address)
+        pending = PendingMessage(message, address, time.monotonic(), peer.rto)
+        self._pending[message.msg_seq] = pending
+        peer.pending[message.msg_seq] = pending
+
+    def acknowledge(self, msg_seq: int) -> Union[PendingMessage, None]:
+        pending = self._forget(msg_seq)
+        if pending is not None and pending.retries == 0:
+            self._peer(pending.address).onSample(
+                time.monotonic() - pending.first_sent, self.granularity, self.MIN_RTO_S, self.max_rto
+            )
+        return pending
+
+    def forget(self, msg_seq: int) -> None:
+        self._forget(msg_seq)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        for peer in self._peers.values():
+            peer.pending.clear()
+
+    def _forget(self, msg_seq: int) -> Union[PendingMessage, None]:
+        pending = self._pending.pop(msg_seq, None)
+        if pending is not None:
+            self._peer(pending.address).pending.pop(msg_seq, None)
+        return pending
+
+    def due(self) -> List[PendingMessage]:
+        now = time.monotonic()
+        retransmit = list()
+        for address, peer in list(self._peers.items()):
+            for msg_seq, pending in list(peer.pending.items()):
+                if pending.deadline > now:
+                    continue
+                if pending.retries >= self.MAX_RETRIES:
+                    logging.warning(f"No ack for {pending.message.WhichOneof('Type')} #{msg_seq} "
+                                    f"to {address[0]}:{address[1]} after {pending.retries} retries, dropped")
+                    self._forget(msg_seq)
+                    self.dropped += 1
+                    continue
+                pending.retries += 1
+                pending.timeout = min(self.max_rto, pending.timeout * 2)
+                pending.deadline = now + pending.timeout
+                retransmit.append(pending)
+            if len(peer.pending) == 0 and peer.srtt is None:
+                self._peers.pop(address)
+        return retransmit
+
+    def rto(self, host: str, port: int) -> float:
+        peer = self._peers.get((host, port))
+        return self.initial_rto if peer is None else peer.rto
+
+    def srtt(self, host: str, port: int) -> Union[float, None]:
+        peer = self._peers.get((host, port))
+        return None if peer is None else peer.srtt
+
+    def pendingCount(self) -> int:
+        return len(self._pending)
+
+    @staticmethod
+    def receiveKey(message: snakes.GameMessage, host: str, port: int) -> Hashable:
+        # A JoinMsg comes before the sender has an id, its address stands in for it.
+        sender = message.sender_id if message.HasField("sender_id") else (host, port)
+        return sender, message.msg_seq
+
+    def rememberReply(self, key: Hashable, data: bytes, host: str, port: int) -> None:
+        self._replies[key] = (data, host, port)
+        self._replies.move_to_end(key)
+        while len(self._replies) > self.REPLY_CACHE_SIZE:
+            self._replies.popitem(last=False)
+
+    def replyTo(self, key: Hashable) -> Union[Tuple[bytes, str, int], None]:
+        return self._replies.get(key)
+
+
+
+class TokenBucket:
+    """Allows rate events per second on average, and bursts of up to burst events."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
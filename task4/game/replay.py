@@ -0,0 +1,170 @@
+import bisect
+import mmap
+import os
+import struct
+from typing import Dict, Union
+
+import snakes.snakes_pb2 as snakes
+from game.field_manager import FieldManager
+
+
+MAGIC = b"SNAKES-REPLAY-1\n"
+CONFIG_LENGTH = struct.Struct("<I")
+# kind, state_order, payload length; the payload is a serialized GameState or GameStateDelta.
+FRAME_HEADER = struct.Struct("<BiI")
+# state_order and file offset of every keyframe, in the "<path>.idx" file next to the replay.
+INDEX_RECORD = struct.Struct("<iQ")
+KEYFRAME = 1
+DELTA = 2
+
+
+def indexPath(path: str) -> str:
+    return path + ".idx"
+
+
+
+class ReplayRecorder:
+    """Writes applied states to a new replay file: a keyframe every KEYFRAME_INTERVAL states, deltas in between.
+
+    A delta only describes a single step, so a state that does not directly follow the previous
+    recorded one is stored as a keyframe too. An existing replay is never overwritten."""
+    KEYFRAME_INTERVAL = 100
+
+    def __init__(self, path: str, config: snakes.GameConfig):
+        if os.path.exists(indexPath(path)):
+            raise FileExistsError(f"{indexPath(path)} already exists")
+        self._file = open(path, "xb")
+        self._index = open(indexPath(path), "xb")
+        config_bytes = config.SerializeToString()
+        self._file.write(MAGIC + CONFIG_LENGTH.pack(len(config_bytes)) + config_bytes)
+        self._offset = self._file.tell()
+        self.last_state_order: Union[int, None] = None
+        self._since_keyframe = 0
+
+    def wantsKeyframe(self, state_order: int) -> bool:
+        return self.last_state_order is None or state_order != self.last_state_order + 1 or \
+            self._since_keyframe >= self.KEYFRAME_INTERVAL
+
+    def writeKeyframe(self, state_order: int, state: bytes) -> None:
+        """state is a serialized GameState."""
+        self._index.write(INDEX_RECORD.pack(state_order, self._offset))
+        self._write(KEYFRAME, state_order, state)
+        self._since_keyframe = 0
+        self._index.flush()
+
+    def writeDelta(self, delta: snakes.GameStateDelta) -> None:
+        self._write(DELTA, delta.state_order, delta.SerializePartialToString())
+        self._since_keyframe += 1
+
+    def _write(self, kind: int, state_order: int, payload: bytes) -> None:
+        self._file.write(FRAME_HEADER.pack(kind, state_order, len(payload)))
+        self._file.write(payload)
+        self._offset += FRAME_HEADER.size + len(payload)
+        self.last_state_order = state_order
+        # A crash loses at most the frame being written, which the reader skips.
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+        self._index.close()
+
+
+
+class ReplayReader:
+    """Random access to a replay through mmap.
+
+    seek() finds the last keyframe at or before the wanted state_order by binary search over the
+    index and applies the deltas after it, so it never decodes more than one keyframe interval."""
+
+    def __init__(self, path: str):
+        if not os.path.exists(indexPath(path)) or os.path.getsize(indexPath(path)) == 0:
+            raise ValueError(f"{path} has no recorded states")
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(indexPath(path), "rb") as file:
+            self._index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a replay")
+        config_length, = CONFIG_LENGTH.unpack_from(self._data, len(MAGIC))
+        config_start = len(MAGIC) + CONFIG_LENGTH.size
+        self.config = snakes.GameConfig()
+        self.config.ParseFromString(self._data[config_start:config_start + config_length])
+        self._keyframes = len(self._index) // INDEX_RECORD.size
+
+        self.field = FieldManager(self.config.width, self.config.height, self.config.food_static)
+        self.players: Dict[int, snakes.GamePlayer] = dict()
+        self.state_order: Union[int, None] = None
+        self._offset = 0
+        self.first_state_order = self._keyframeAt(0)[0]
+        self.last_state_order = self.seek(2 ** 31 - 1)
+
+    def _keyframeAt(self, i: int):
+        return INDEX_RECORD.unpack_from(self._index, i * INDEX_RECORD.size)
+
+    def _findKeyframe(self, state_order: int) -> int:
+        return bisect.bisect_right(range(self._keyframes), state_order, key=lambda i: self._keyframeAt(i)[0]) - 1
+
+    def _readFrame(self, offset: int):
+        if offset + FRAME_HEADER.size > len(self._data):
+            return None
+        kind, state_order, length = FRAME_HEADER.unpack_from(self._data, offset)
+        end = offset + FRAME_HEADER.size + length
+        if end > len(self._data):
+            # The recorder stopped in the middle of this frame.
+            return None
+        return kind, state_order, self._data[offset + FRAME_HEADER.size:end], end
+
+    def _applyKeyframe(self, payload: bytes) -> None:
+        state = snakes.GameState()
+        state.ParseFromString(payload)
+        self.field.foodFromMsg(state.foods)
+        self.field.snakesFromMsg(state.snakes)
+        self.players = {player.id: player for player in state.players.players}
+        self.state_order = state.state_order
+
+    def _applyDelta(self, payload: bytes) -> bool:
+        delta = snakes.GameStateDelta()
+        delta.ParseFromString(payload)
+        if delta.base_state_order != self.state_order or not self.field.applyDeltaMsg(delta):
+            return False
+        for player in delta.changed_players:
+            self.players[player.id] = player
+        for player_id in delta.removed_players:
+            self.players.pop(player_id, None)
+        self.state_order = delta.state_order
+        return True
+
+    def seek(self, state_order: int) -> Union[int, None]:
+        """Moves to the last recorded state not after state_order and returns its state_order."""
+        i = self._findKeyframe(state_order)
+        if i < 0:
+            i = 0
+        _, offset = self._keyframeAt(i)
+        frame = self._readFrame(offset)
+        if frame is None:
+            return self.state_order
+        self._applyKeyframe(frame[2])
+        self._offset = frame[3]
+        while self.state_order < state_order:
+            frame = self._readFrame(self._offset)
+            if frame is None or frame[1] > state_order or not self.step():
+                break
+        return self.state_order
+
+    def step(self) -> bool:
+        """Moves to the next recorded state; False at the end of the replay."""
+        frame = self._readFrame(self._offset)
+        if frame is None:
+            return False
+        kind, _, payload, end = frame
+        if kind == KEYFRAME:
+            self._applyKeyframe(payload)
+        elif not self._applyDelta(payload):
+            return False
+        self._offset = end
+        return True
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
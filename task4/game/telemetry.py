@@ -0,0 +1,52 @@
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+
+
+class TickTelemetry:
+    """Timings of the last WINDOW ticks of a MASTER, split into simulation, serialization and sending.
+
+    Lateness is how long after its deadline a tick started; skipped counts ticks the timer dropped
+    because it had fallen a whole interval behind."""
+    WINDOW = 100
+    PHASES = ("simulation", "serialization", "send")
+
+    def __init__(self, budget_ms: int):
+        self.budget_ms = budget_ms
+        self._ticks: Deque[Tuple[int, int, int, float]] = deque(maxlen=self.WINDOW)
+        self.skipped = 0
+
+    def record(self, simulation_ns: int, serialization_ns: int, send_ns: int, lateness_s: float, skipped: int) -> None:
+        self._ticks.append((simulation_ns, serialization_ns, send_ns, lateness_s))
+        self.skipped = skipped
+
+    def summary(self) -> Dict[str, float]:
+        if len(self._ticks) == 0:
+            return dict()
+        count = len(self._ticks)
+        totals = [sum(tick[:3]) / 1e6 for tick in self._ticks]
+        summary = {
+            "ticks": count,
+            "total_ms": sum(totals) / count,
+            "total_max_ms": max(totals),
+            "lateness_ms": sum(tick[3] for tick in self._ticks) / count * 1000,
+            "lateness_max_ms": max(tick[3] for tick in self._ticks) * 1000,
+            "skipped": self.skipped,
+        }
+        for i, phase in enumerate(self.PHASES):
+            summary[f"{phase}_ms"] = sum(tick[i] for tick in self._ticks) / count / 1e6
+        summary["budget_used"] = summary["total_ms"] / self.budget_ms
+        return summary
+
+    def lines(self) -> List[str]:
+        summary = self.summary()
+        if len(summary) == 0:
+            return ["no ticks yet"]
+        return [
+            f"tick {summary['total_ms']:.2f} ms (max {summary['total_max_ms']:.2f}) of {self.budget_ms} ms, "
+            f"{summary['budget_used']:.1%} used",
+            f"sim {summary['simulation_ms']:.2f}  ser {summary['serialization_ms']:.2f}  "
+            f"send {summary['send_ms']:.2f} ms",
+            f"late {summary['lateness_ms']:.2f} ms (max {summary['lateness_max_ms']:.2f}), "
+            f"skipped {summary['skipped']}",
+        ]
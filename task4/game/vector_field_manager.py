@@ -0,0 +1,392 @@
+from collections import deque
+from typing import Tuple, Set, Dict, Deque, List, Union
+
+import numpy as np
+from google.protobuf.internal.containers import RepeatedCompositeFieldContainer
+import snakes.snakes_pb2 as snakes
+from game.field_manager import FieldManager, Snake
+from game.wire import encodeSnake
+
+
+# Head offsets indexed by snakes.Direction (UP=1, DOWN=2, LEFT=3, RIGHT=4)
+DX = np.array([0, 0, 0, -1, 1], dtype=np.int64)
+DY = np.array([0, -1, 1, 0, 0], dtype=np.int64)
+
+
+
+class SnakeView:
+    """Snake-compatible handle onto one snake stored in a VectorFieldManager."""
+    steer_block = Snake.steer_block
+    toPoints = Snake.toPoints
+    asMsg = Snake.asMsg
+
+    def __init__(self, field: "VectorFieldManager", player_id: int):
+        self._field = field
+        self.player_id = player_id
+
+    @property
+    def _row(self) -> int:
+        return self._field._index[self.player_id]
+
+    @property
+    def head_x(self) -> int:
+        return int(self._field._head_x[self._row])
+
+    @property
+    def head_y(self) -> int:
+        return int(self._field._head_y[self._row])
+
+    @property
+    def direction(self) -> snakes.Direction:
+        return int(self._field._direction[self._row])
+
+    @direction.setter
+    def direction(self, direction: snakes.Direction) -> None:
+        self._field._direction[self._row] = direction
+
+    @property
+    def state(self) -> snakes.GameState.Snake.SnakeState:
+        return int(self._field._state[self._row])
+
+    @state.setter
+    def state(self, state: snakes.GameState.Snake.SnakeState) -> None:
+        self._field._state[self._row] = state
+
+    @property
+    def tail(self) -> Deque[Tuple[int, int]]:
+        xs, ys = self._field._cells(self._row)
+        return deque(zip(xs[1:].tolist(), ys[1:].tolist()))
+
+    def turn(self, direction: snakes.Direction):
+        self._field._requested[self._row] = direction
+
+    def encoded(self, width: int, height: int) -> bytes:
+        # Views are created per call and every snake moves on every tick, so nothing is cached here.
+        return encodeSnake(self.player_id, self.toPoints(width, height), self.state, self.direction)
+
+
+
+class SpawnSites:
+    """Read-only sequence of (x, y) free spawn centres backed by coordinate arrays.
+
+    Same order as the list built by FieldManager._findSpawnSites, so random.choice picks the same site."""
+
+    def __init__(self, xs: np.ndarray, ys: np.ndarray):
+        self._xs = xs
+        self._ys = ys
+
+    def __len__(self) -> int:
+        return len(self._xs)
+
+    def __getitem__(self, i: int) -> Tuple[int, int]:
+        return int(self._xs[i]), int(self._ys[i])
+
+
+
+class VectorFieldManager(FieldManager):
+    """FieldManager backend that keeps the board and snakes in NumPy arrays.
+
+    Every snake is a row in the per-snake arrays, and its body is a ring inside the flat _ring_x/_ring_y
+    buffers, with the head at _head and the tail end _length - 1 cells after it. _occupancy counts
+    snake cells per board cell, so a head collides exactly when its cell count is above one.
+    Movement, wrap-around, eating and collision checks run as array operations; only dying snakes
+    and random draws are handled one by one, in the same order as FieldManager.tick, so both backends
+    produce the same field from the same random seed."""
+    INITIAL_RING_CAPACITY = 8
+    _SNAKE_ARRAYS = (
+        ("_ids", np.int64), ("_head_x", np.int64), ("_head_y", np.int64), ("_direction", np.int8),
+        ("_requested", np.int8), ("_state", np.int8), ("_length", np.int64), ("_base", np.int64),
+        ("_capacity", np.int64), ("_head", np.int64)
+    )
+
+    def __init__(self, width: int, height: int, food_static: int):
+        super().__init__(width, height, food_static)
+        self._food_board = np.zeros((height, width), dtype=bool)
+        self._occupancy = np.zeros((height, width), dtype=np.int32)
+        self._clearSnakes()
+
+    def _clearSnakes(self) -> None:
+        self._index: Dict[int, int] = dict()
+        for name, dtype in self._SNAKE_ARRAYS:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self._ring_x = np.zeros(64, dtype=np.int32)
+        self._ring_y = np.zeros(64, dtype=np.int32)
+        self._ring_used = 0
+        self._ring_waste = 0
+        self._occupancy[:] = 0
+
+    def _allocRing(self, capacity: int) -> int:
+        if self._ring_used + capacity > len(self._ring_x):
+            size = max(2 * len(self._ring_x), self._ring_used + capacity)
+            self._ring_x = np.resize(self._ring_x, size)
+            self._ring_y = np.resize(self._ring_y, size)
+        base = self._ring_used
+        self._ring_used += capacity
+        return base
+
+    def _cells(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        capacity = self._capacity[row]
+        idx = self._base[row] + (self._head[row] + np.arange(self._length[row])) % capacity
+        return self._ring_x[idx], self._ring_y[idx]
+
+    def _growRing(self, row: int) -> None:
+        xs, ys = self._cells(row)
+        capacity = int(self._capacity[row]) * 2
+        base = self._allocRing(capacity)
+        self._ring_x[base:base + len(xs)] = xs
+        self._ring_y[base:base + len(ys)] = ys
+        self._ring_waste += int(self._capacity[row])
+        self._base[row] = base
+        self._capacity[row] = capacity
+        self._head[row] = 0
+
+    def _compactRings(self) -> None:
+        total = int(self._capacity.sum())
+        new_base = np.zeros(len(self._ids), dtype=np.int64)
+        np.cumsum(self._capacity[:-1], out=new_base[1:])
+        src = np.arange(total, dtype=np.int64) + np.repeat(self._base - new_base, self._capacity)
+        ring_x = np.zeros(max(64, 2 * total), dtype=np.int32)
+        ring_y = np.zeros(max(64, 2 * total), dtype=np.int32)
+        ring_x[:total] = self._ring_x[src]
+        ring_y[:total] = self._ring_y[src]
+        self._ring_x, self._ring_y = ring_x, ring_y
+        self._base = new_base
+        self._ring_used = total
+        self._ring_waste = 0
+
+    def _appendSnake(self, snake: Snake, requested: int = 0) -> None:
+        if snake.player_id in self._index:
+            self._removeRows(np.array([self._index[snake.player_id]]))
+        xs = np.array([snake.head_x] + [x for x, _ in snake.tail], dtype=np.int64) % self.width
+        ys = np.array([snake.head_y] + [y for _, y in snake.tail], dtype=np.int64) % self.height
+        length = len(xs)
+        capacity = self.INITIAL_RING_CAPACITY
+        while capacity < 2 * length:
+            capacity *= 2
+        base = self._allocRing(capacity)
+        self._ring_x[base:base + length] = xs
+        self._ring_y[base:base + length] = ys
+        values = {
+            "_ids": snake.player_id, "_head_x": xs[0], "_head_y": ys[0], "_direction": snake.direction,
+            "_requested": requested, "_state": snake.state, "_length": length, "_base": base,
+            "_capacity": capacity, "_head": 0
+        }
+        for name, dtype in self._SNAKE_ARRAYS:
+            setattr(self, name, np.append(getattr(self, name), np.array([values[name]], dtype=dtype)))
+        self._index[snake.player_id] = len(self._ids) - 1
+        np.add.at(self._occupancy, (ys, xs), 1)
+
+    def _removeRows(self, rows: np.ndarray) -> None:
+        for row in rows.tolist():
+            xs, ys = self._cells(row)
+            np.subtract.at(self._occupancy, (ys, xs), 1)
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[rows] = False
+        self._ring_waste += int(self._capacity[rows].sum())
+        for name, _ in self._SNAKE_ARRAYS:
+            setattr(self, name, getattr(self, name)[keep])
+        self._index = {player_id: row for row, player_id in enumerate(self._ids.tolist())}
+        if self._ring_waste > self._ring_used // 2:
+            self._compactRings()
+
+    def _toReference(self) -> FieldManager:
+        reference = FieldManager(self.width, self.height, self.food_static)
+        for row, player_id in enumerate(self._ids.tolist()):
+            xs, ys = self._cells(row)
+            snake = Snake(
+                player_id=player_id,
+                head_x=int(xs[0]), head_y=int(ys[0]),
+                direction=int(self._direction[row]),
+                state=int(self._state[row])
+            )
+            snake.tail = deque(zip(xs[1:].tolist(), ys[1:].tolist()))
+            if self._requested[row] != 0:
+                snake.turn(int(self._requested[row]))
+            reference._snakes[player_id] = snake
+        reference._food = self.getFood()
+        return reference
+
+    def _loadFrom(self, reference: FieldManager) -> None:
+        self._clearSnakes()
+        for snake in reference._snakes.values():
+            requested = snake._requested_direction if snake._requested_direction is not None else 0
+            self._appendSnake(snake, requested)
+        self._setFood(reference._food)
+        self._invalidateSpawnSites()
+
+    def _setFood(self, food: Set[Tuple[int, int]]) -> None:
+        self._food_board[:] = False
+        if len(food) > 0:
+            xs, ys = zip(*food)
+            self._food_board[np.array(ys) % self.height, np.array(xs) % self.width] = True
+
+    def getSnakes(self) -> Set[SnakeView]:
+        return {SnakeView(self, player_id) for player_id in self._ids.tolist()}
+
+    def getFood(self) -> Set[Tuple[int, int]]:
+        ys, xs = np.nonzero(self._food_board)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    def getSnake(self, player_id: int) -> Union[SnakeView, None]:
+        return SnakeView(self, player_id) if player_id in self._index else None
+
+    def sortSnakes(self) -> None:
+        # Rows are ticked in order, like the reference iterates its dict; rings stay where they are.
+        order = np.argsort(self._ids, kind="stable")
+        for name, _ in self._SNAKE_ARRAYS:
+            setattr(self, name, getattr(self, name)[order])
+        self._index = {player_id: row for row, player_id in enumerate(self._ids.tolist())}
+
+    def pendingTurns(self) -> List[Tuple[int, snakes.Direction]]:
+        rows = np.nonzero(self._requested)[0]
+        return list(zip(self._ids[rows].tolist(), self._requested[rows].tolist()))
+
+    def _getOccupiedBoard(self) -> np.ndarray:
+        return self._food_board | (self._occupancy > 0)
+
+    def _getOccupiedBlocks(self):
+        ys, xs = np.nonzero(self._getOccupiedBoard())
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    def _findSpawnSites(self) -> SpawnSites:
+        r = self.SPAWN_RADIUS
+        side = 2 * r + 1
+        padded = np.pad(self._getOccupiedBoard().astype(np.int32), r, mode="wrap")
+        sat = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=np.int32)
+        sat[1:, 1:] = padded.cumsum(axis=0).cumsum(axis=1)
+        window = sat[side:, side:] - sat[:-side, side:] - sat[side:, :-side] + sat[:-side, :-side]
+        ys, xs = np.nonzero(window == 0)
+        return SpawnSites(xs, ys)
+
+    def _replenishFood(self) -> None:
+        target = self.food_static + len(self._ids)
+        food_count = int(np.count_nonzero(self._food_board))
+        if food_count < target:
+            occupied = self._getOccupiedBoard()
+            occupied_count = int(np.count_nonzero(occupied))
+            while food_count < target:
+                while True:
+                    x = self.random.randint(0, self.width - 1)
+                    y = self.random.randint(0, self.height - 1)
+                    if not occupied[y, x]:
+                        break
+                self._food_board[y, x] = True
+                occupied[y, x] = True
+                food_count += 1
+                occupied_count += 1
+                if occupied_count == self.width * self.height:
+                    break
+
+    def _tickFood(self) -> Set[Tuple[int, int]]:
+        requested = self._requested != 0
+        self._direction[requested] = self._requested[requested]
+        self._requested[:] = 0
+        new_x = (self._head_x + DX[self._direction]) % self.width
+        new_y = (self._head_y + DY[self._direction]) % self.height
+        eaten = self._food_board[new_y, new_x]
+
+        retracting = np.flatnonzero(~eaten)
+        tail_idx = self._base[retracting] + (
+                self._head[retracting] + self._length[retracting] - 1) % self._capacity[retracting]
+        np.subtract.at(self._occupancy, (self._ring_y[tail_idx], self._ring_x[tail_idx]), 1)
+        for row in np.flatnonzero(eaten & (self._length == self._capacity)).tolist():
+            self._growRing(row)
+
+        self._head = (self._head - 1) % self._capacity
+        head_idx = self._base + self._head
+        self._ring_x[head_idx] = new_x
+        self._ring_y[head_idx] = new_y
+        self._head_x, self._head_y = new_x, new_y
+        self._length += eaten
+        np.add.at(self._occupancy, (new_y, new_x), 1)
+        self._food_board[new_y[eaten], new_x[eaten]] = False
+        return {(player_id, FieldManager.UPDATE_SCORE) for player_id in self._ids[eaten].tolist()}
+
+    def _tickDeath(self) -> Set[Tuple[int, int]]:
+        updates: Set[Tuple[int, int]] = set()
+        head_counts = self._occupancy[self._head_y, self._head_x]
+        dead_rows = np.flatnonzero(head_counts > 1)
+        for row in dead_rows.tolist():
+            player_id = int(self._ids[row])
+            xs, ys = self._cells(row)
+            own_cells_at_head = np.count_nonzero((xs == xs[0]) & (ys == ys[0]))
+            if head_counts[row] > own_cells_at_head:
+                updates.add((player_id, FieldManager.UPDATE_SCORE))
+            for x, y in zip(xs[1:].tolist(), ys[1:].tolist()):
+                if self.random.random() < 0.5:
+                    self._food_board[y, x] = True
+            updates.add((player_id, FieldManager.UPDATE_DEATH))
+        if len(dead_rows) > 0:
+            self._removeRows(dead_rows)
+        return updates
+
+    def tick(self) -> Set[Tuple[int, int]]:
+        updates: Set[Tuple[int, int]] = set()
+        if len(self._ids) > 0:
+            updates.update(self._tickFood())
+            updates.update(self._tickDeath())
+        self._replenishFood()
+        self._invalidateSpawnSites()
+        return updates
+
+    def spawnSnake(
+            self,
+            x: int,
+            y: int,
+            player_id: int,
+            state: snakes.GameState.Snake.SnakeState = snakes.GameState.Snake.SnakeState.ALIVE
+    ) -> None:
+        snake = Snake(
+            player_id=player_id,
+            head_x=x, head_y=y,
+            direction=self.random.choice(
+                [snakes.Direction.UP, snakes.Direction.DOWN, snakes.Direction.LEFT, snakes.Direction.RIGHT]
+            ),
+            state=state
+        )
+        self._appendSnake(snake)
+        self._invalidateSpawnSites()
+
+    def snakesFromMsg(self, message_snakes: RepeatedCompositeFieldContainer[snakes.GameState.Snake]):
+        reference = self._toReference()
+        reference.snakesFromMsg(message_snakes)
+        self._loadFrom(reference)
+
+    def foodFromMsg(self, foods: RepeatedCompositeFieldContainer[snakes.GameState.Coord]):
+        self._setFood({(coord.x, coord.y) for coord in foods})
+        self._invalidateSpawnSites()
+
+    def applyDeltaMsg(self, delta: snakes.GameStateDelta) -> bool:
+        reference = self._toReference()
+        if not reference.applyDeltaMsg(delta):
+            return False
+        self._loadFrom(reference)
+        return True
+
+    def takeSnapshot(self) -> Tuple[Dict[int, int], Set[Tuple[int, int]]]:
+        return dict(zip(self._ids.tolist(), (self._length - 1).tolist())), self.getFood()
+
+    def fillDeltaMsg(self, delta: snakes.GameStateDelta, snapshot: Tuple[Dict[int, int], Set[Tuple[int, int]]]) -> None:
+        tail_lengths, food = snapshot
+        rows = zip(
+            self._ids.tolist(), self._head_x.tolist(), self._head_y.tolist(),
+            self._direction.tolist(), self._state.tolist(), self._length.tolist()
+        )
+        for player_id, head_x, head_y, direction, state, length in rows:
+            if player_id not in tail_lengths:
+                delta.new_snakes.append(SnakeView(self, player_id).asMsg(self.width, self.height))
+                continue
+            snake_delta = delta.moved_snakes.add(
+                player_id=player_id,
+                head=snakes.GameState.Coord(x=head_x, y=head_y),
+                head_direction=direction
+            )
+            if state != snakes.GameState.Snake.SnakeState.ALIVE:
+                snake_delta.state = state
+            tail_retracted = tail_lengths[player_id] + 1 - (length - 1)
+            if tail_retracted != 1:
+                snake_delta.tail_retracted = tail_retracted
+        delta.removed_snakes.extend(player_id for player_id in tail_lengths.keys() if player_id not in self._index)
+        current_food = self.getFood()
+        delta.added_foods.extend(snakes.GameState.Coord(x=x, y=y) for x, y in current_food - food)
+        delta.removed_foods.extend(snakes.GameState.Coord(x=x, y=y) for x, y in food - current_food)
@@ -0,0 +1,101 @@
+from functools import lru_cache
+from typing import List, NamedTuple, Union
+
+import snakes.snakes_pb2 as snakes
+
+
+# Field numbers of the messages assembled by hand below, see snakes.proto.
+GAME_MESSAGE_STATE = 5
+STATE_MSG_STATE = 1
+STATE_MSG_CHUNK_INDEX = 100
+STATE_MSG_CHUNK_COUNT = 101
+STATE_MSG_PARTIAL = 102
+GAME_STATE_STATE_ORDER = 1
+GAME_STATE_SNAKES = 2
+GAME_STATE_FOODS = 3
+GAME_STATE_PLAYERS = 4
+GAME_PLAYERS_PLAYERS = 1
+SNAKE_PLAYER_ID = 1
+SNAKE_POINTS = 2
+SNAKE_STATE = 3
+SNAKE_HEAD_DIRECTION = 4
+
+_VARINT = 0
+_LENGTH_DELIMITED = 2
+
+
+def varint(value: int) -> bytes:
+    # Negative int32 values take ten bytes of two's complement, as protobuf writes them.
+    value &= 0xFFFFFFFFFFFFFFFF
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+@lru_cache(maxsize=None)
+def tag(field_number: int, wire_type: int) -> bytes:
+    return varint(field_number << 3 | wire_type)
+
+
+def varintField(field_number: int, value: int) -> bytes:
+    return tag(field_number, _VARINT) + varint(value)
+
+
+def lengthDelimited(field_number: int, payload: bytes) -> bytes:
+    return tag(field_number, _LENGTH_DELIMITED) + varint(len(payload)) + payload
+
+
+def fieldSize(payload: bytes) -> int:
+    """Bytes a length-delimited field with a field number below 16 takes."""
+    return 1 + len(varint(len(payload))) + len(payload)
+
+
+@lru_cache(maxsize=65536)
+def coord(x: int, y: int) -> bytes:
+    """A serialized GameState.Coord; snakes are made of unit offsets, so few distinct ones exist."""
+    return snakes.GameState.Coord(x=x, y=y).SerializeToString()
+
+
+def encodeSnake(player_id: int, points: List[tuple], state: int, direction: int) -> bytes:
+    """Same bytes as GameState.Snake(...).SerializeToString(), without building a Coord per point."""
+    points_tag = tag(SNAKE_POINTS, _LENGTH_DELIMITED)
+    parts = [varintField(SNAKE_PLAYER_ID, player_id)]
+    for x, y in points:
+        point = coord(x, y)
+        parts.append(points_tag + varint(len(point)) + point)
+    parts.append(varintField(SNAKE_STATE, state))
+    parts.append(varintField(SNAKE_HEAD_DIRECTION, direction))
+    return b"".join(parts)
+
+
+
+class StateFragments(NamedTuple):
+    """A GameState as the serialized GamePlayer, GameState.Snake and GameState.Coord of its parts."""
+    state_order: int
+    players: List[bytes]
+    snakes: List[bytes]
+    foods: List[bytes]
+
+
+def encodeGameState(fragments: StateFragments) -> bytes:
+    players = b"".join(lengthDelimited(GAME_PLAYERS_PLAYERS, player) for player in fragments.players)
+    return b"".join((
+        varintField(GAME_STATE_STATE_ORDER, fragments.state_order),
+        b"".join(lengthDelimited(GAME_STATE_SNAKES, snake) for snake in fragments.snakes),
+        b"".join(lengthDelimited(GAME_STATE_FOODS, food) for food in fragments.foods),
+        lengthDelimited(GAME_STATE_PLAYERS, players),
+    ))
+
+
+def encodeStateMsg(game_state: bytes, chunk_index: Union[int, None] = None,
+                   chunk_count: Union[int, None] = None, partial: bool = False) -> bytes:
+    """A GameMessage body carrying a StateMsg, to be sent after a per-recipient header."""
+    state_msg = lengthDelimited(STATE_MSG_STATE, game_state)
+    if chunk_count is not None:
+        state_msg += varintField(STATE_MSG_CHUNK_INDEX, chunk_index) + varintField(STATE_MSG_CHUNK_COUNT, chunk_count)
+    if partial:
+        state_msg += varintField(STATE_MSG_PARTIAL, 1)
+    return lengthDelimited(GAME_MESSAGE_STATE, state_msg)
@@ -0,0 +1,181 @@
+import heapq
+import time
+from typing import Dict, List, Tuple, Union
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QTimer
+from PyQt6.QtGui import QFont
+import snakes.snakes_pb2 as snakes
+
+
+def stripMsgSeq(raw: bytes) -> bytes:
+    """Drops the leading msg_seq field, the only part of a repeated announcement that changes every second."""
+    if len(raw) == 0 or raw[0] != 0x08:
+        return raw
+    offset = 1
+    while offset < len(raw) and raw[offset] & 0x80:
+        offset += 1
+    return raw[offset + 1:]
+
+
+
+GameKey = Tuple[Tuple[str, int], str]
+
+
+
+class GameEntry:
+    __slots__ = ("name", "host", "port", "game", "sender", "expires_at")
+
+    def __init__(self, name: str, host: str, port: int, game: snakes.GameAnnouncement, expires_at: float):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.game = game
+        self.sender = (host, port)
+        self.expires_at = expires_at
+
+    @property
+    def key(self) -> GameKey:
+        return self.sender, self.game.game_name
+
+    def columns(self) -> Tuple[str, str, str, str]:
+        return (
+            self.name,
+            f"{len(self.game.players.players)}",
+            f"{self.game.config.width}x{self.game.config.height}",
+            f"{self.game.config.food_static} + 1x"
+        )
+
+
+
+class GameBrowserModel(QAbstractTableModel):
+    """Announced games, one row per sender and game name.
+
+    Rows are only inserted, changed or removed when an announcement says so. Expiry times are kept
+    in a min-heap and a single-shot timer fires at the earliest one; entries refreshed since they were
+    pushed are skipped when popped. A sender may split its games across several announcements, so
+    the unchanged ones are remembered by sender and body."""
+    HEADERS = ("Master", "Players", "Size", "Food")
+    EXPIRY_S = 3
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+        self._rows: List[GameEntry] = list()
+        self._row_by_key: Dict[GameKey, int] = dict()
+        self._expiry_heap: List[Tuple[float, GameKey]] = list()
+        self._announcements: Dict[Tuple[Tuple[str, int], bytes], List[GameKey]] = dict()
+        self._announcement_of: Dict[GameKey, Tuple[Tuple[str, int], bytes]] = dict()
+        self._expiry_timer = QTimer(self)
+        self._expiry_timer.setSingleShot(True)
+        self._expiry_timer.timeout.connect(self._expire)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self._rows[index.row()].columns()[index.column()]
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if orientation != Qt.Orientation.Horizontal:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        if role == Qt.ItemDataRole.FontRole:
+            font = QFont()
+            font.setBold(True)
+            return font
+        return None
+
+    def gameAt(self, row: int) -> Union[GameEntry, None]:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def refresh(self, sender: Tuple[str, int], body: bytes) -> bool:
+        """Extends the games of an announcement identical to an earlier one from this sender.
+
+        Returns False if the announcement is new or changed and has to be parsed and passed to update()."""
+        keys = self._announcements.get((sender, body))
+        if keys is None:
+            return False
+        expires_at = time.monotonic() + self.EXPIRY_S
+        for key in keys:
+            row = self._row_by_key.get(key)
+            if row is not None:
+                self._rows[row].expires_at = expires_at
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+        self._scheduleExpiry()
+        return True
+
+    def update(self, sender: Tuple[str, int], body: bytes, games: List[Tuple[str, snakes.GameAnnouncement]]) -> None:
+        """games are the announced games with the names of their MASTERs."""
+        expires_at = time.monotonic() + self.EXPIRY_S
+        host, port = sender
+        keys = list()
+        for name, game in games:
+            key = (sender, game.game_name)
+            keys.append(key)
+            row = self._row_by_key.get(key)
+            if row is None:
+                row = len(self._rows)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._rows.append(GameEntry(name, host, port, game, expires_at))
+                self._row_by_key[key] = row
+                self.endInsertRows()
+            else:
+                entry = self._rows[row]
+                changed = entry.columns() != GameEntry(name, host, port, game, expires_at).columns()
+                entry.name = name
+                entry.game = game
+                entry.expires_at = expires_at
+                if changed:
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            # The announcement this game was last seen in has changed and will not come again.
+            self._forgetAnnouncement(key)
+            self._announcement_of[key] = (sender, body)
+        # Nothing would ever forget an announcement without joinable games, so it is not remembered.
+        if keys:
+            self._announcements[(sender, body)] = keys
+        self._scheduleExpiry()
+
+    def _forgetAnnouncement(self, key: GameKey) -> None:
+        announcement = self._announcement_of.pop(key, None)
+        if announcement is None:
+            return
+        for other in self._announcements.pop(announcement, ()):
+            self._announcement_of.pop(other, None)
+
+    def _scheduleExpiry(self) -> None:
+        if len(self._expiry_heap) == 0:
+            self._expiry_timer.stop()
+            return
+        delay_ms = max(0, int((self._expiry_heap[0][0] - time.monotonic()) * 1000) + 1)
+        self._expiry_timer.start(delay_ms)
+
+    def _expire(self) -> None:
+        try:
+            current_time = time.monotonic()
+            while self._expiry_heap and self._expiry_heap[0][0] <= current_time:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                row = self._row_by_key.get(key)
+                if row is None or self._rows[row].expires_at != expires_at:
+                    continue
+                self._removeRow(row)
+        except Exception as e:
+            print("_expire", e)
+        self._scheduleExpiry()
+
+    def _removeRow(self, row: int) -> None:
+        entry = self._rows[row]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._rows.pop(row)
+        self._row_by_key.pop(entry.key)
+        for i in range(row, len(self._rows)):
+            self._row_by_key[self._rows[i].key] = i
+        self.endRemoveRows()
+        self._forgetAnnouncement(entry.key)
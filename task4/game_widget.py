@@ -1,36 +1,56 @@
 from PyQt6 import uic
-from PyQt6.QtCore import pyqtSignal
-from PyQt6.QtGui import QKeyEvent, QPainter, QColor
+from PyQt6.QtCore import pyqtSignal, QRect, QTimer
+from PyQt6.QtGui import QKeyEvent, QPainter, QColor, QImage, QFont
 from PyQt6.QtWidgets import QWidget, QListWidgetItem
 import random
+import time
 from math import ceil
 from string import ascii_letters
-from typing import Set, Tuple
+from typing import Tuple, Dict, List, Iterable, Union
 import snakes.snakes_pb2 as snakes
-from network import NetworkHandler, Subscriber
-from game.engine import GameEngine, Snake
+from engine_thread import EngineThread, Snapshot, SnakeView
 
 
 
 class GameWidget(QWidget):
     key_pressed = pyqtSignal(QKeyEvent)
+    snapshot_published = pyqtSignal()
     keys_to_directions = {
         16777234: snakes.Direction.LEFT,
         16777235: snakes.Direction.UP,
         16777236: snakes.Direction.RIGHT,
         16777237: snakes.Direction.DOWN
     }
+    TELEMETRY_KEY = 16777266  # F3
+
+    FRAME_MS = 33
 
     def paintEvent(self, event) -> None:
         try:
-            self.drawServerData()
-            self.updateRatingData()
-            self.drawField()
+            if not self.field_widget.draw():
+                self._frame_timer.stop()
+            if self._show_telemetry:
+                self.drawTelemetry()
         except Exception as e:
             print("paintEvent", e)
 
+    def drawTelemetry(self) -> None:
+        painter = QPainter(self)
+        font = QFont("monospace")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        painter.setFont(font)
+        metrics = painter.fontMetrics()
+        lines = self.snapshot.telemetry if self.snapshot is not None else ("no ticks yet",)
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 8
+        left, top = self.artWidget.x(), self.artWidget.y()
+        painter.fillRect(QRect(left, top, width, metrics.height() * len(lines) + 4), QColor(0, 0, 0, 160))
+        painter.setPen(QColor("yellow"))
+        for i, line in enumerate(lines):
+            painter.drawText(left + 4, top + 2 + metrics.height() * i + metrics.ascent(), line)
+        painter.end()
+
     def closeEvent(self, event) -> None:
-        self.engine.stop()
+        self.engine_thread.stop()
         self.client_widget.gameWidget = None
         self.client_widget.playerNameLine.setEnabled(True)
         self.client_widget.hostButton.setEnabled(True)
@@ -40,7 +60,6 @@ class GameWidget(QWidget):
     def __init__(
             self,
             client_widget: QWidget,
-            network_handler: NetworkHandler,
             host: str,
             port: int,
             server_name: str,
@@ -61,33 +80,57 @@ class GameWidget(QWidget):
         else:
             client_requested_role = snakes.NodeRole.VIEWER
 
-        self.engine = GameEngine(
-            game_name=server_name,
-            field_width=game_config.width,
-            field_height=game_config.height,
-            food_static=game_config.food_static,
-            state_delay_ms=game_config.state_delay_ms,
-            network_handler=network_handler,
-            client_name=client_name,
-            client_requested_role=client_requested_role,
-            existing_players=players,
-            update_callback=self._update_callback
+        # The engine and its sockets live in their own thread, so painting and ticking never wait
+        # for each other; the widget only reads the snapshots the engine publishes.
+        self.snapshot: Union[Snapshot, None] = None
+        self.engine_thread = EngineThread(
+            engine_kwargs=dict(
+                game_name=server_name,
+                field_width=game_config.width,
+                field_height=game_config.height,
+                food_static=game_config.food_static,
+                state_delay_ms=game_config.state_delay_ms,
+                client_name=client_name,
+                client_requested_role=client_requested_role,
+                existing_players=players
+            ),
+            on_publish=self.snapshot_published.emit
         )
+        self.snapshot_published.connect(self._update_callback)
 
         self.field_widget = FieldWidget(
             canvas=self.artWidget,
             parent=self,
             width=game_config.width,
-            height=game_config.height
+            height=game_config.height,
+            state_delay_ms=game_config.state_delay_ms
         )
+        # Repaints between states while snakes are sliding into their new cells.
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setInterval(self.FRAME_MS)
+        self._frame_timer.timeout.connect(self.update)
+        self._show_telemetry = False
 
         self.key_pressed.connect(self.onKey)
-        self.leaveButton.clicked.connect(self.engine.becomeViewer)
+        self.leaveButton.clicked.connect(self.onLeave)
         self.setWindowTitle(f"Snakes | {server_name} | {client_name}")
         self.show()
-        self.engine.start(is_host, host, port)
+        self.engine_thread.startEngine(is_host, host, port)
+
+    def onLeave(self) -> None:
+        self.engine_thread.call(self.engine_thread.engine.becomeViewer)
 
     def _update_callback(self):
+        snapshot = self.engine_thread.slot.take()
+        if snapshot is None:
+            return
+        self.snapshot = snapshot
+        try:
+            self.drawServerData()
+            self.updateRatingData()
+            self.updateField()
+        except Exception as e:
+            print("_update_callback", e)
         self.update()
 
     def keyPressEvent(self, event: QKeyEvent):
@@ -96,34 +139,36 @@ class GameWidget(QWidget):
 
     def onKey(self, event: QKeyEvent):
         key = event.key()
+        if key == self.TELEMETRY_KEY:
+            self._show_telemetry = not self._show_telemetry
+            self.update()
+            return
         if key not in self.keys_to_directions:
             return
-        self.engine.moveClientSnake(self.keys_to_directions[key])
-
-    def drawField(self) -> None:
-        self.field_widget.startDrawing()
-        self.field_widget.drawFood(self.engine.field_manager.getFood())
-        self.field_widget.drawSnakes(
-            self.engine.field_manager.getSnakes(),
-            client_player_id=self.engine.player_manager.client_player.id
+        # The predicted snake comes back with the snapshot published right after the steer.
+        self.engine_thread.call(self.engine_thread.engine.moveClientSnake, self.keys_to_directions[key])
+
+    def updateField(self) -> None:
+        self.field_widget.updateField(
+            self.snapshot.food,
+            self.snapshot.snakes,
+            client_player_id=self.snapshot.client_player_id
         )
-        self.field_widget.stopDrawing()
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
 
     def drawServerData(self) -> None:
-        master = self.engine.player_manager.getMaster()
-        if master is not None:
-            self.masterLabel.setText(f"MASTER: {master.name}")
+        if self.snapshot.master_name is not None:
+            self.masterLabel.setText(f"MASTER: {self.snapshot.master_name}")
         else:
             self.masterLabel.setText(f"MASTER: <NOT FOUND>")
-        self.foodLabel.setText(f"FOOD: {self.engine.field_manager.food_static} + {len(self.engine.field_manager.getSnakes())}")
-        self.sizeLabel.setText(f"SIZE: {self.engine.field_manager.width}x{self.engine.field_manager.height}")
+        self.foodLabel.setText(f"FOOD: {self.snapshot.food_static} + {len(self.snapshot.snakes)}")
+        self.sizeLabel.setText(f"SIZE: {self.snapshot.width}x{self.snapshot.height}")
 
     def updateRatingData(self):
         self.ratingList.clear()
         sorted_active_players = sorted(
-            self.engine.player_manager.getPlayers(
-                lambda x: x.role != snakes.VIEWER or x.score > 0
-            ),
+            filter(lambda x: x.role != snakes.VIEWER or x.score > 0, self.snapshot.players),
             key=lambda x: x.score,
             reverse=True
         )
@@ -133,12 +178,29 @@ class GameWidget(QWidget):
 
 
 class FieldWidget:
-    def __init__(self, canvas: QWidget, parent: QWidget, width: int, height: int):
+    EMPTY_COLOR = QColor("black").rgb()
+    FOOD_COLOR = QColor("green").rgb()
+    HEAD_COLOR = QColor("red").rgb()
+    TAIL_COLOR = QColor("pink").rgb()
+    CLIENT_HEAD_COLOR = QColor("blue").rgb()
+    CLIENT_TAIL_COLOR = QColor("aqua").rgb()
+
+    def __init__(self, canvas: QWidget, parent: QWidget, width: int, height: int, state_delay_ms: int):
         self.canvas = canvas
         self.parent = parent
         self.width = width
         self.height = height
-        self._painter = None
+        self.state_delay_ms = state_delay_ms
+        # One pixel per cell, scaled up without smoothing when painted.
+        self._image = QImage(width, height, QImage.Format.Format_RGB32)
+        self._image.fill(self.EMPTY_COLOR)
+        self._cells: Dict[Tuple[int, int], int] = dict()
+        # Per player: head and tail end cells of the previous update.
+        self._ends: Dict[int, Tuple[Tuple[int, int], Tuple[int, int]]] = dict()
+        # (cell, direction it moves in, color) of heads entering and tail ends leaving a cell.
+        self._heads: List[Tuple[Tuple[int, int], Tuple[int, int], int]] = list()
+        self._tails: List[Tuple[Tuple[int, int], Tuple[int, int], int]] = list()
+        self._updated_at = time.monotonic()
 
     def getPos(self):
         block_dimension = self.getBlockDimension()
@@ -155,44 +217,85 @@ class FieldWidget:
         h_pixels_per_block = int(max_height_in_pixels / height_in_blocks)
         return min(w_pixels_per_block, h_pixels_per_block)
 
-    def drawSnakes(self, snakes_set: Set[Snake], client_player_id: int) -> None:
-        if self._painter is None:
-            return
-        a, b = self.getPos()
-        base = self.getBlockDimension()
+    def _step(self, old: Tuple[int, int], new: Tuple[int, int]) -> Tuple[int, int]:
+        dx = (new[0] - old[0] + 1) % self.width - 1
+        dy = (new[1] - old[1] + 1) % self.height - 1
+        if abs(dx) + abs(dy) != 1:
+            return 0, 0
+        return dx, dy
+
+    def updateField(self, food_set: Iterable[Tuple[int, int]], snakes_set: Iterable[SnakeView],
+                    client_player_id: int) -> None:
+        cells: Dict[Tuple[int, int], int] = dict()
+        ends: Dict[int, Tuple[Tuple[int, int], Tuple[int, int]]] = dict()
+        heads = list()
+        tails = list()
+        for x, y in food_set:
+            cells[(x, y)] = self.FOOD_COLOR
         for snake in snakes_set:
-            x = snake.head_x % self.width
-            y = snake.head_y % self.height
             if snake.player_id == client_player_id:
-                head_color = QColor("blue")
-                tail_color = QColor("aqua")
+                head_color, tail_color = self.CLIENT_HEAD_COLOR, self.CLIENT_TAIL_COLOR
             else:
-                head_color = QColor("red")
-                tail_color = QColor("pink")
-            self._painter.fillRect(a + x * base, b + y * base, base, base, head_color)
-            for tail_block in snake.tail:
-                tx = tail_block[0] % self.width
-                ty = tail_block[1] % self.height
-                self._painter.fillRect(a + tx * base, b + ty * base, base, base, tail_color)
-
-    def drawFood(self, food_set: Set[Tuple[int, int]]) -> None:
-        if self._painter is None:
-            return
-        a, b = self.getPos()
-        base = self.getBlockDimension()
-        for x, y in food_set:
-            self._painter.fillRect(a + x * base, b + y * base, base, base, QColor("green"))
+                head_color, tail_color = self.HEAD_COLOR, self.TAIL_COLOR
+            head = (snake.head_x % self.width, snake.head_y % self.height)
+            cells[head] = head_color
+            for tail_x, tail_y in snake.tail:
+                cells[(tail_x % self.width, tail_y % self.height)] = tail_color
+            tail_end = (snake.tail[-1][0] % self.width, snake.tail[-1][1] % self.height) if snake.tail else head
+            ends[snake.player_id] = (head, tail_end)
+            previous = self._ends.get(snake.player_id)
+            if previous is None:
+                continue
+            head_step = self._step(previous[0], head)
+            if head_step != (0, 0):
+                heads.append((head, head_step, head_color))
+            if previous[1] not in cells:
+                tail_step = self._step(previous[1], tail_end)
+                if tail_step != (0, 0):
+                    tails.append((previous[1], tail_step, tail_color))
+        self._ends = ends
+        self._heads = heads
+        self._tails = tails
+        self._updated_at = time.monotonic()
 
-    def startDrawing(self):
-        if self._painter is not None:
-            return
-        self._painter = QPainter(self.parent)
+        # Only cells that differ from the previous state touch the image.
+        for (x, y), color in cells.items():
+            if self._cells.get((x, y)) != color:
+                self._image.setPixel(x, y, color)
+        for x, y in self._cells.keys() - cells.keys():
+            self._image.setPixel(x, y, self.EMPTY_COLOR)
+        self._cells = cells
+
+    @staticmethod
+    def _sliver(left: int, top: int, block: int, side: Tuple[int, int], fraction: float) -> QRect:
+        size = round(block * fraction)
+        if side == (1, 0):
+            return QRect(left + block - size, top, size, block)
+        if side == (-1, 0):
+            return QRect(left, top, size, block)
+        if side == (0, 1):
+            return QRect(left, top + block - size, block, size)
+        return QRect(left, top, block, size)
+
+    def draw(self) -> bool:
+        """Paints the field; returns False once no snake is still sliding between cells."""
         x, y = self.getPos()
         block_dimension = self.getBlockDimension()
-        self._painter.fillRect(x, y, block_dimension * self.width, block_dimension * self.height, QColor('black'))
+        painter = QPainter(self.parent)
+        painter.drawImage(QRect(x, y, block_dimension * self.width, block_dimension * self.height), self._image)
 
-    def stopDrawing(self):
-        if self._painter is None:
-            return
-        self._painter.end()
-        self._painter = None
+        # The image holds the newest state; heads grow into their cells and tail ends shrink out of
+        # theirs over one state_delay_ms, until the next state arrives.
+        fraction = (time.monotonic() - self._updated_at) * 1000 / self.state_delay_ms
+        moving = fraction < 1 and (len(self._heads) > 0 or len(self._tails) > 0)
+        if moving:
+            empty = QColor(self.EMPTY_COLOR)
+            for (cell_x, cell_y), (dx, dy), color in self._heads:
+                left, top = x + cell_x * block_dimension, y + cell_y * block_dimension
+                painter.fillRect(QRect(left, top, block_dimension, block_dimension), empty)
+                painter.fillRect(self._sliver(left, top, block_dimension, (-dx, -dy), fraction), QColor(color))
+            for (cell_x, cell_y), (dx, dy), color in self._tails:
+                left, top = x + cell_x * block_dimension, y + cell_y * block_dimension
+                painter.fillRect(self._sliver(left, top, block_dimension, (dx, dy), 1 - fraction), QColor(color))
+        painter.end()
+        return moving
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import socket
+import struct
+from typing import Tuple, Union
+import snakes.snakes_pb2 as snakes
+from transport import Subscriber, Datagram, MessageDispatcher, MULTICAST_GROUP, MULTICAST_PORT, localHost
+
+
+# A field number of 0 is invalid in protobuf, so no GameMessage can start with this prefix.
+RELAY_MAGIC = b"\x00SNK"
+_RELAY_HEADER = struct.Struct("!4sH")
+
+
+def packRelay(payload: bytes, host: str = "0.0.0.0", port: int = 0) -> bytes:
+    return RELAY_MAGIC + _RELAY_HEADER.pack(socket.inet_aton(host), port) + payload
+
+
+def unpackRelay(data: bytes) -> Union[Tuple[bytes, str, int], None]:
+    if not data.startswith(RELAY_MAGIC):
+        return None
+    offset = len(RELAY_MAGIC)
+    packed_host, port = _RELAY_HEADER.unpack_from(data, offset)
+    return data[offset + _RELAY_HEADER.size:], socket.inet_ntoa(packed_host), port
+
+
+
+class AsyncioTimer:
+    """Repeating timer with the start()/stop() interface of QTimer, scheduled on the asyncio loop.
+
+    Ticks are planned against a monotonic deadline, so a slow callback does not shift later ticks;
+    if the loop falls more than one interval behind, the missed ticks are skipped. lateness is how
+    late the current tick fired, skipped counts all ticks dropped so far."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, delay_ms: int, callback):
+        self._loop = loop
+        self._interval = delay_ms / 1000
+        self._callback = callback
+        self._deadline = 0.0
+        self._handle: Union[asyncio.TimerHandle, None] = None
+        self.lateness = 0.0
+        self.skipped = 0
+
+    def setInterval(self, delay_ms: int) -> None:
+        self._interval = delay_ms / 1000
+
+    def isActive(self) -> bool:
+        return self._handle is not None
+
+    def start(self, first_delay_ms: Union[float, None] = None) -> None:
+        """The first tick comes after first_delay_ms if given, the following ones an interval apart."""
+        self.stop()
+        first_delay = self._interval if first_delay_ms is None else first_delay_ms / 1000
+        self._deadline = self._loop.time() + first_delay
+        self._handle = self._loop.call_at(self._deadline, self._fire)
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _fire(self) -> None:
+        now = self._loop.time()
+        self.lateness = now - self._deadline
+        self._deadline += self._interval
+        if self._deadline <= now:
+            missed = int((now - self._deadline) // self._interval) + 1
+            self._deadline += missed * self._interval
+            self.skipped += missed
+        self._handle = self._loop.call_at(self._deadline, self._fire)
+        try:
+            self._callback()
+        except Exception as e:
+            print("AsyncioTimer", e)
+
+
+
+class _SubscribersProtocol(asyncio.DatagramProtocol):
+    def __init__(self, network_handler: "AsyncioNetworkHandler"):
+        self._network_handler = network_handler
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            self._network_handler.onDatagram(data, addr)
+        except Exception as e:
+            print("datagram_received", e)
+
+    def error_received(self, exc: Exception) -> None:
+        logging.warning(f"UDP error: {exc}")
+
+
+
+class AsyncioNetworkHandler:
+    """Drop-in replacement for NetworkHandler that runs on an asyncio loop instead of Qt sockets."""
+    MULTICAST_GROUP = MULTICAST_GROUP
+    MULTICAST_PORT = MULTICAST_PORT
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._subscribers = list()
+        self.dispatcher = MessageDispatcher()
+        self._direct_transport: Union[asyncio.DatagramTransport, None] = None
+        self._multicast_transport: Union[asyncio.DatagramTransport, None] = None
+
+    @classmethod
+    async def create(cls, port: int = 0, listen_multicast: bool = True) -> "AsyncioNetworkHandler":
+        loop = asyncio.get_running_loop()
+        handler = cls(loop)
+
+        handler._direct_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _SubscribersProtocol(handler),
+            local_addr=("0.0.0.0", port)
+        )
+        direct_socket = handler._direct_transport.get_extra_info("socket")
+        direct_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 100)
+        direct_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+        if listen_multicast:
+            handler._multicast_transport, _ = await loop.create_datagram_endpoint(
+                lambda: _SubscribersProtocol(handler),
+                sock=cls._createMulticastSocket()
+            )
+        return handler
+
+    @classmethod
+    def _createMulticastSocket(cls) -> socket.socket:
+        multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        multicast_socket.bind(("", cls.MULTICAST_PORT))
+        membership = struct.pack("4s4s", socket.inet_aton(cls.MULTICAST_GROUP), socket.inet_aton("0.0.0.0"))
+        multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        multicast_socket.setblocking(False)
+        return multicast_socket
+
+    def close(self) -> None:
+        for transport in (self._direct_transport, self._multicast_transport):
+            if transport is not None:
+                transport.close()
+
+    def subscribe(self, subscriber: Subscriber):
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.remove(subscriber)
+
+    def onDatagram(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self.notifySubscribers(Datagram(data, addr[0], addr[1]))
+
+    def notifySubscribers(self, datagram: Datagram):
+        for subscriber in self._subscribers:
+            subscriber.notify(datagram)
+        self.dispatcher.dispatch(datagram)
+
+    def multicast(self, message: snakes.GameMessage):
+        self.multicastBytes(message.SerializeToString())
+
+    def multicastBytes(self, data: bytes):
+        # Sent from the game socket, so listeners see the port that accepts JoinMsg as the sender.
+        self._direct_transport.sendto(data, (self.MULTICAST_GROUP, self.MULTICAST_PORT))
+
+    def unicast(self, message: snakes.GameMessage, host: str, port: int):
+        self.unicastBytes(message.SerializeToString(), host, port)
+
+    def unicastBytes(self, data: bytes, host: str, port: int):
+        self._direct_transport.sendto(data, (host, port))
+
+    def createTimer(self, delay_ms: int, callback) -> AsyncioTimer:
+        return AsyncioTimer(self._loop, delay_ms, callback)
+
+    @property
+    def port(self):
+        return self._direct_transport.get_extra_info("sockname")[1]
+
+    @property
+    def host(self):
+        return localHost()
@@ -1,16 +1,17 @@
-import sys, os, json, time, random, logging
-from PyQt6.QtWidgets import QApplication, QWidget, QTableWidgetItem
+import sys, os, json, random, logging
+from PyQt6.QtCore import QModelIndex
+from PyQt6.QtWidgets import QApplication, QWidget
 from PyQt6.QtGui import QMovie
-from PyQt6.QtNetwork import QNetworkDatagram
 from qtpy import uic
 import snakes.snakes_pb2 as snakes
-from network import NetworkHandler, Subscriber
+from network import NetworkHandler
+from game_browser import GameBrowserModel, stripMsgSeq
 from game_widget import GameWidget
 from settings import ServerSettingsWindow
 
 
 
-class ClientWindow(QWidget, Subscriber):
+class ClientWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.ui = uic.loadUi('ui/client.ui', self)
@@ -20,50 +21,45 @@ class ClientWindow(QWidget, Subscriber):
         self.snakes_gif_movie.start()
 
         self.networkHandler = NetworkHandler()
-        self.networkHandler.subscribe(self)
 
         self.gameWidget = None
-        self.games = dict()
+        self.games = GameBrowserModel(self)
+        self.avaliableGamesTable.setModel(self.games)
+        # The browser only lists games, everything else is dropped undecoded by the dispatcher.
+        self.networkHandler.dispatcher.addHandler("announcement", self.onAnnouncement, known=self.isKnownAnnouncement)
         self.trying_to_join = None
 
         self.setWindowTitle("Snakes | Client")
 
         self.playerNameLine.editingFinished.connect(self.saveUserConfig)
         self.hostButton.clicked.connect(self.openServerSettingsScreen)
-        self.avaliableGamesTable.cellDoubleClicked.connect(self.onServerDoubleClick)
+        self.avaliableGamesTable.doubleClicked.connect(self.onServerDoubleClick)
         self.modeButton.clicked.connect(self.changeConnectionMode)
 
         self.loadUserConfig()
         self.show()
 
-    def paintEvent(self, event) -> None:
-        super().paintEvent(event)
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
         self.adjustTableSize()
 
-    def notify(self, datagram: QNetworkDatagram):
+    def isKnownAnnouncement(self, raw: bytes, host: str, port: int) -> bool:
+        return self.games.refresh((host, port), stripMsgSeq(raw))
+
+    def onAnnouncement(self, message: snakes.GameMessage, host: str, port: int, raw: bytes):
         try:
-            raw = bytes(datagram.data())
-            message = snakes.GameMessage()
-            message.ParseFromString(raw)
-            msg_type = message.WhichOneof("Type")
-            if msg_type == "announcement":
-                games = message.announcement.games
-                for game in games:
-                    if not game.can_join:
-                        continue
-                    masters = [p for p in game.players.players if p.role == snakes.NodeRole.MASTER]
-                    if len(masters) != 1:
-                        logging.info(f"got strange announce packet with {len(masters)} MASTERS from {game.game_name}")
-                        return
-                    master = masters[0]
-                    self.games[master.name] = {
-                        "host": datagram.senderAddress(),
-                        "port": datagram.senderPort(),
-                        "game": game,
-                        "last_update": time.time_ns()
-                    }
+            games = list()
+            for game in message.announcement.games:
+                if not game.can_join:
+                    continue
+                masters = [p for p in game.players.players if p.role == snakes.NodeRole.MASTER]
+                if len(masters) != 1:
+                    logging.info(f"got strange announce packet with {len(masters)} MASTERS from {game.game_name}")
+                    return
+                games.append((masters[0].name, game))
+            self.games.update((host, port), stripMsgSeq(raw), games)
         except Exception as e:
-            print("notify", e)
+            print("onAnnouncement", e)
 
     def adjustTableSize(self):
         width = self.avaliableGamesTable.width()
@@ -76,42 +72,6 @@ class ClientWindow(QWidget, Subscriber):
         self.avaliableGamesTable.setColumnWidth(2, col2)
         self.avaliableGamesTable.setColumnWidth(3, col3)
 
-        try:
-            name_to_row = dict()
-            for row in range(self.avaliableGamesTable.rowCount()):
-                item = self.avaliableGamesTable.item(row, 0)
-                if item:
-                    name_to_row[item.text()] = row
-
-            current_time = time.time_ns()
-            to_be_deleted = []
-            for master, data in self.games.items():
-                if current_time - data["last_update"] > 3e9:
-                    to_be_deleted.append(master)
-                    continue
-
-                if master in name_to_row:
-                    continue
-                else:
-                    row = self.avaliableGamesTable.rowCount()
-                    self.avaliableGamesTable.setRowCount(row + 1)
-
-                players = f'{len(data["game"].players.players)}'
-                size = f'{data["game"].config.width}x{data["game"].config.height}'
-                food = f'{data["game"].config.food_static} + 1x'
-                self.avaliableGamesTable.setItem(row, 0, QTableWidgetItem(master))
-                self.avaliableGamesTable.setItem(row, 1, QTableWidgetItem(players))
-                self.avaliableGamesTable.setItem(row, 2, QTableWidgetItem(size))
-                self.avaliableGamesTable.setItem(row, 3, QTableWidgetItem(food))
-
-            for i in to_be_deleted:
-                if i in self.games:
-                    self.games.pop(i)
-                if i in name_to_row:
-                    self.avaliableGamesTable.removeRow(name_to_row[i])
-        except Exception as e:
-            print("adjustTableSize", e, type(e))
-
     def changeConnectionMode(self):
         current = self.modeButton.text()
         if current == "MODE: NORMAL":
@@ -119,11 +79,9 @@ class ClientWindow(QWidget, Subscriber):
         else:
             self.modeButton.setText("MODE: NORMAL")
 
-    def onServerDoubleClick(self, row, col):
+    def onServerDoubleClick(self, index: QModelIndex):
         try:
-            name = self.avaliableGamesTable.item(row, 0).text()
-            data = self.games[name]
-            self.trying_to_join = name
+            self.trying_to_join = self.games.gameAt(index.row())
             self.startGame()
         except Exception as e:
             print(e)
@@ -143,12 +101,11 @@ class ClientWindow(QWidget, Subscriber):
         try:
             if self.trying_to_join is None:
                 return
-            game = self.games[self.trying_to_join]["game"]
+            game = self.trying_to_join.game
             self.gameWidget = GameWidget(
                 self,
-                self.networkHandler,
-                self.games[self.trying_to_join]["host"].toString().replace("::ffff:", ""),
-                self.games[self.trying_to_join]["port"],
+                self.trying_to_join.host,
+                self.trying_to_join.port,
                 game.game_name,
                 snakes.GameConfig(
                     width=game.config.width,
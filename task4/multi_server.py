@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, List, Tuple, Union
+
+import snakes.snakes_pb2 as snakes
+from game.engine import GameEngine
+from game.packetizer import StatePacketizer
+from game.reliability import TokenBucket
+from game.wire import varint
+from headless_network import AsyncioNetworkHandler, packRelay, unpackRelay
+from server import bounded_int, field_manager_class
+from transport import Subscriber, Datagram, senderOf, peekMessageType
+
+
+
+class RoomNetworkHandler(AsyncioNetworkHandler):
+    """Network handler of a single room living in a worker process.
+
+    Client traffic reaches the room through the front socket wrapped with packRelay, and the room's
+    announcements go back to the front instead of the multicast group. Everything else (states, acks,
+    pings) is sent straight from the room's own socket."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__(loop)
+        self.front_address: Union[Tuple[str, int], None] = None
+
+    def onDatagram(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if addr == self.front_address:
+            relayed = unpackRelay(data)
+            if relayed is not None:
+                payload, host, port = relayed
+                self.notifySubscribers(Datagram(payload, host, port))
+            return
+        super().onDatagram(data, addr)
+
+    def multicastBytes(self, data: bytes):
+        self.unicastBytes(packRelay(data), *self.front_address)
+
+
+
+class FrontServer(Subscriber):
+    """Public entry point of a multi-room host.
+
+    Collects the announcements of all rooms into AnnouncementMsg datagrams that each fit one MTU,
+    answers DiscoverMsg, and relays client datagrams to rooms: JoinMsg by game_name, anything else by
+    the address that joined. Routes of clients that went silent are dropped."""
+    ROOM_EXPIRY_NS = 3e9
+    ROUTE_EXPIRY_NS = 10e9
+    # msg_seq, the announcement field header and slack for the varint lengths
+    ANNOUNCEMENT_HEADER_SIZE = 24
+
+    def __init__(self, network_handler: AsyncioNetworkHandler):
+        self.network_handler = network_handler
+        self.network_handler.subscribe(self)
+        self._rooms: Dict[str, Tuple[Tuple[str, int], snakes.GameAnnouncement, int]] = dict()
+        self._routes: Dict[Tuple[str, int], Tuple[Tuple[str, int], int]] = dict()
+        self.__msg_seq = 0
+        self._discover_replies = TokenBucket(rate=GameEngine.DISCOVER_REPLY_RATE, burst=GameEngine.DISCOVER_REPLY_RATE)
+        self._announce_timer = self.network_handler.createTimer(1000, self._announce)
+
+    def start(self) -> None:
+        self._announce_timer.start()
+
+    def stop(self) -> None:
+        self._announce_timer.stop()
+        self.network_handler.unsubscribe(self)
+
+    def _msg_seq(self):
+        msg_seq = self.__msg_seq
+        self.__msg_seq += 1
+        return msg_seq
+
+    def _expire(self) -> None:
+        current_time = time.time_ns()
+        expired = [name for name, (_, _, last_update) in self._rooms.items()
+                   if current_time - last_update > self.ROOM_EXPIRY_NS]
+        expired_addresses = set()
+        for name in expired:
+            room_address, _, _ = self._rooms.pop(name)
+            logging.warning(f"Room {name} stopped announcing, dropping it")
+            expired_addresses.add(room_address)
+        self._routes = {client: (room, last_seen) for client, (room, last_seen) in self._routes.items()
+                        if room not in expired_addresses and current_time - last_seen <= self.ROUTE_EXPIRY_NS}
+
+    def _announcementMsgs(self) -> List[snakes.GameMessage]:
+        """Packs the rooms' announcements greedily into messages no larger than one datagram.
+
+        A room whose announcement alone exceeds the budget still gets a message of its own."""
+        budget = StatePacketizer.MAX_DATAGRAM - self.ANNOUNCEMENT_HEADER_SIZE
+        parts: List[List[snakes.GameAnnouncement]] = [list()]
+        size = 0
+        for _, game, _ in self._rooms.values():
+            game_size = game.ByteSize()
+            game_size += 1 + len(varint(game_size))
+            if parts[-1] and size + game_size > budget:
+                parts.append(list())
+                size = 0
+            parts[-1].append(game)
+            size += game_size
+        return [
+            snakes.GameMessage(
+                msg_seq=self._msg_seq(),
+                announcement=snakes.GameMessage.AnnouncementMsg(games=games)
+            )
+            for games in parts
+        ]
+
+    def _announce(self) -> None:
+        self._expire()
+        for message in self._announcementMsgs():
+            self.network_handler.multicast(message)
+
+    def notify(self, datagram: Datagram):
+        try:
+            data = bytes(datagram.data())
+            host, port = senderOf(datagram)
+            if host.startswith("127."):
+                relayed = unpackRelay(data)
+                if relayed is not None:
+                    self._onRoomAnnouncement(relayed[0], (host, port))
+                    return
+
+            # Only a JoinMsg has to be decoded, everything else is routed by its type alone.
+            match peekMessageType(data):
+                case None | "announcement":
+                    return
+                case "discover":
+                    if self._discover_replies.take():
+                        for message in self._announcementMsgs():
+                            self.network_handler.unicast(message, host, port)
+                    return
+                case "join":
+                    message = snakes.GameMessage()
+                    message.ParseFromString(data)
+                    room = self._rooms.get(message.join.game_name)
+                    if room is None:
+                        errorMessage = snakes.GameMessage(
+                            msg_seq=message.msg_seq,
+                            error=snakes.GameMessage.ErrorMsg(
+                                error_message=f"No game named {message.join.game_name} on this server."
+                            )
+                        )
+                        self.network_handler.unicast(errorMessage, host, port)
+                        return
+                    self._routes[(host, port)] = (room[0], time.time_ns())
+            route = self._routes.get((host, port))
+            if route is None:
+                return
+            room_address = route[0]
+            self._routes[(host, port)] = (room_address, time.time_ns())
+            self.network_handler.unicastBytes(packRelay(data, host, port), *room_address)
+        except Exception as e:
+            print("FrontServer.notify", e)
+
+    def _onRoomAnnouncement(self, payload: bytes, room_address: Tuple[str, int]) -> None:
+        message = snakes.GameMessage()
+        message.ParseFromString(payload)
+        if message.WhichOneof("Type") != "announcement":
+            return
+        for game in message.announcement.games:
+            self._rooms[game.game_name] = (room_address, game, time.time_ns())
+
+
+
+async def _serveRooms(rooms: List[dict], front_port: int) -> None:
+    engines = list()
+    for room in rooms:
+        network_handler = await RoomNetworkHandler.create(listen_multicast=False)
+        network_handler.front_address = ("127.0.0.1", front_port)
+        engine = GameEngine(
+            game_name=room["name"],
+            field_width=room["width"],
+            field_height=room["height"],
+            food_static=room["food"],
+            state_delay_ms=room["delay"],
+            network_handler=network_handler,
+            client_name=room["name"],
+            client_requested_role=snakes.NodeRole.MASTER,
+            existing_players=None,
+            update_callback=lambda: None,
+            field_manager_class=field_manager_class(room["backend"])
+        )
+        engine.start(
+            is_host=True,
+            master_host=network_handler.host,
+            master_port=network_handler.port,
+            host_plays=False
+        )
+        engines.append(engine)
+        logging.info(f"[{os.getpid()}] Room '{room['name']}' on port {network_handler.port}")
+    await asyncio.Event().wait()
+
+
+def _runWorker(rooms: List[dict], front_port: int, log_level: str) -> None:
+    logging.basicConfig(format="[%(levelname)s]: %(message)s", level=log_level)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serveRooms(rooms, front_port))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Headless Snakes server hosting several games")
+    parser.add_argument("--name", default="Snakes room", help="room name prefix")
+    parser.add_argument("--rooms", type=bounded_int(1, 10000), default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--width", type=bounded_int(10, 100), default=40)
+    parser.add_argument("--height", type=bounded_int(10, 100), default=30)
+    parser.add_argument("--food", type=bounded_int(0, 100), default=1, help="static food count")
+    parser.add_argument("--delay", type=bounded_int(100, 3000), default=1000, help="state_delay_ms")
+    parser.add_argument("--port", type=int, default=0, help="public UDP port, random by default")
+    parser.add_argument("--backend", choices=("reference", "numpy"), default="reference",
+                        help="field simulation backend, numpy needs the numpy package")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    network_handler = await AsyncioNetworkHandler.create(port=args.port)
+    front = FrontServer(network_handler)
+    front.start()
+
+    rooms = [
+        {"name": f"{args.name} {i + 1}", "width": args.width, "height": args.height,
+         "food": args.food, "delay": args.delay, "backend": args.backend}
+        for i in range(args.rooms)
+    ]
+    workers_count = max(1, min(args.workers, len(rooms)))
+    workers = list()
+    for worker_index in range(workers_count):
+        worker = multiprocessing.Process(
+            target=_runWorker,
+            args=(rooms[worker_index::workers_count], network_handler.port, args.log_level),
+            daemon=True
+        )
+        worker.start()
+        workers.append(worker)
+    logging.info(f"Hosting {len(rooms)} rooms in {workers_count} processes on "
+                 f"{network_handler.host}:{network_handler.port}")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop_event.wait()
+    finally:
+        front.stop()
+        network_handler.close()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        logging.info("Server stopped")
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(format="[%(levelname)s]: %(message)s", level=arguments.log_level)
+    asyncio.run(serve(arguments))
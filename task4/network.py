@@ -1,22 +1,19 @@
-import socket
-import time
 from PyQt6.QtNetwork import QUdpSocket, QAbstractSocket, QHostAddress, QNetworkDatagram
 import snakes.snakes_pb2 as snakes
-
-
-
-class Subscriber:
-    def notify(self, datagram: QNetworkDatagram):
-        pass
+from transport import Subscriber, MessageDispatcher, MULTICAST_GROUP, MULTICAST_PORT, localHost
 
 
 
 class NetworkHandler:
-    MULTICAST_GROUP = "224.0.0.1"
-    MULTICAST_PORT = 9192
+    """Qt sockets of the game browser: announcements from the multicast group and direct replies.
+
+    Games themselves run on the EngineThread's own AsyncioNetworkHandler."""
+    MULTICAST_GROUP = MULTICAST_GROUP
+    MULTICAST_PORT = MULTICAST_PORT
 
     def __init__(self):
         self._subscribers = list()
+        self.dispatcher = MessageDispatcher()
 
         self.direct_socket = QUdpSocket()
         self.direct_socket.bind()
@@ -58,6 +55,7 @@ class NetworkHandler:
     def notifySubscribers(self, datagram: QNetworkDatagram):
         for subscriber in self._subscribers:
             subscriber.notify(datagram)
+        self.dispatcher.dispatch(datagram)
 
     def multicast(self, message: snakes.GameMessage):
         self.multicast_socket.writeDatagram(
@@ -79,7 +77,4 @@ class NetworkHandler:
 
     @property
     def host(self):
-        local_hostname = socket.gethostname()
-        ip_addresses = socket.gethostbyname_ex(local_hostname)[2]
-        filtered_ips = [ip for ip in ip_addresses if not ip.startswith("127.")]
-        return filtered_ips[0]
+        return localHost()
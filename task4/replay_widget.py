@@ -0,0 +1,115 @@
+import sys
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QSlider, QPushButton, QLabel, \
+    QListWidget, QListWidgetItem
+import snakes.snakes_pb2 as snakes
+from game.replay import ReplayReader
+from game_widget import FieldWidget
+
+
+
+class ReplayWidget(QWidget):
+    """Plays a replay written by GameEngine(replay_path=...); the slider seeks to any state_order."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.reader = ReplayReader(path)
+        config = self.reader.config
+
+        self.artWidget = QWidget(self)
+        self.ratingList = QListWidget(self)
+        self.ratingList.setMaximumWidth(200)
+        self.playButton = QPushButton("PLAY", self)
+        self.orderLabel = QLabel(self)
+        self.slider = QSlider(Qt.Orientation.Horizontal, self)
+        self.slider.setRange(self.reader.first_state_order, self.reader.last_state_order)
+
+        field_layout = QHBoxLayout()
+        field_layout.addWidget(self.artWidget, 1)
+        field_layout.addWidget(self.ratingList)
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(self.playButton)
+        controls_layout.addWidget(self.slider, 1)
+        controls_layout.addWidget(self.orderLabel)
+        layout = QVBoxLayout(self)
+        layout.addLayout(field_layout, 1)
+        layout.addLayout(controls_layout)
+
+        self.field_widget = FieldWidget(
+            canvas=self.artWidget,
+            parent=self,
+            width=config.width,
+            height=config.height,
+            state_delay_ms=config.state_delay_ms
+        )
+        self._play_timer = QTimer(self)
+        self._play_timer.setInterval(config.state_delay_ms)
+        self._play_timer.timeout.connect(self.onPlayTimer)
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setInterval(33)
+        self._frame_timer.timeout.connect(self.update)
+
+        self.slider.valueChanged.connect(self.onSliderMoved)
+        self.playButton.clicked.connect(self.onPlayClicked)
+        self.setWindowTitle(f"Snakes replay | {path}")
+        self.resize(800, 600)
+        self.show()
+        self.reader.seek(self.reader.first_state_order)
+        self.showState()
+
+    def paintEvent(self, event) -> None:
+        try:
+            if not self.field_widget.draw():
+                self._frame_timer.stop()
+        except Exception as e:
+            print("paintEvent", e)
+
+    def closeEvent(self, event) -> None:
+        self._play_timer.stop()
+        self.reader.close()
+
+    def onPlayClicked(self) -> None:
+        if self._play_timer.isActive():
+            self._play_timer.stop()
+            self.playButton.setText("PLAY")
+        else:
+            self._play_timer.start()
+            self.playButton.setText("PAUSE")
+
+    def onPlayTimer(self) -> None:
+        if not self.reader.step():
+            self.onPlayClicked()
+            return
+        self.showState()
+
+    def onSliderMoved(self, state_order: int) -> None:
+        if state_order != self.reader.state_order:
+            self.reader.seek(state_order)
+            self.showState()
+
+    def showState(self) -> None:
+        try:
+            self.slider.blockSignals(True)
+            self.slider.setValue(self.reader.state_order)
+            self.slider.blockSignals(False)
+            self.orderLabel.setText(f"{self.reader.state_order} / {self.reader.last_state_order}")
+            self.field_widget.updateField(self.reader.field.getFood(), self.reader.field.getSnakes(),
+                                          client_player_id=-1)
+            self.ratingList.clear()
+            for player in sorted(self.reader.players.values(), key=lambda x: x.score, reverse=True):
+                if player.role != snakes.VIEWER or player.score > 0:
+                    self.ratingList.addItem(QListWidgetItem(f"{player.score:5} | {player.name}#{player.id}"))
+        except Exception as e:
+            print("showState", e)
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+        self.update()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"usage: {sys.argv[0]} REPLAY_FILE")
+        sys.exit(1)
+    app = QApplication(sys.argv)
+    widget = ReplayWidget(sys.argv[1])
+    sys.exit(app.exec())
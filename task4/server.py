@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+
+import snakes.snakes_pb2 as snakes
+from game.engine import GameEngine
+from game.field_manager import FieldManager
+from game.replay import indexPath
+from headless_network import AsyncioNetworkHandler
+
+
+def bounded_int(low: int, high: int):
+    def parse(value: str) -> int:
+        number = int(value)
+        if not low <= number <= high:
+            raise argparse.ArgumentTypeError(f"must be between {low} and {high}")
+        return number
+    return parse
+
+
+def field_manager_class(backend: str):
+    if backend == "numpy":
+        from game.vector_field_manager import VectorFieldManager
+        return VectorFieldManager
+    return FieldManager
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Headless Snakes game server")
+    parser.add_argument("--name", default="Snakes server", help="game name shown in announcements")
+    parser.add_argument("--width", type=bounded_int(10, 100), default=40)
+    parser.add_argument("--height", type=bounded_int(10, 100), default=30)
+    parser.add_argument("--food", type=bounded_int(0, 100), default=1, help="static food count")
+    parser.add_argument("--delay", type=bounded_int(100, 3000), default=1000, help="state_delay_ms")
+    parser.add_argument("--port", type=int, default=0, help="UDP port for game traffic, random by default")
+    parser.add_argument("--backend", choices=("reference", "numpy"), default="reference",
+                        help="field simulation backend, numpy needs the numpy package")
+    parser.add_argument("--record", help="write every state to this new replay file")
+    parser.add_argument("--lockstep", action="store_true",
+                        help="send players that support it only each tick's inputs instead of the state")
+    parser.add_argument("--relay-fanout", type=bounded_int(0, 16), default=0, metavar="N",
+                        help="let players forward states to up to N VIEWERs each, off by default")
+    parser.add_argument("--hot-standby", action="store_true",
+                        help="stream the DEPUTY what it needs to take over within a tick if this server fails")
+    parser.add_argument("--telemetry", type=int, default=0, metavar="SECONDS",
+                        help="log tick timings every SECONDS, off by default")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    if args.record is not None and (os.path.exists(args.record) or os.path.exists(indexPath(args.record))):
+        parser.error(f"--record: {args.record} already exists")
+    return args
+
+
+async def serve(args: argparse.Namespace) -> None:
+    network_handler = await AsyncioNetworkHandler.create(port=args.port)
+    engine = GameEngine(
+        game_name=args.name,
+        field_width=args.width,
+        field_height=args.height,
+        food_static=args.food,
+        state_delay_ms=args.delay,
+        network_handler=network_handler,
+        client_name=args.name,
+        client_requested_role=snakes.NodeRole.MASTER,
+        existing_players=None,
+        update_callback=lambda: None,
+        field_manager_class=field_manager_class(args.backend),
+        replay_path=args.record,
+        lockstep=args.lockstep,
+        relay_fanout=args.relay_fanout,
+        hot_standby=args.hot_standby
+    )
+    engine.start(
+        is_host=True,
+        master_host=network_handler.host,
+        master_port=network_handler.port,
+        host_plays=False
+    )
+    logging.info(f"Hosting '{args.name}' {args.width}x{args.height} on "
+                 f"{network_handler.host}:{network_handler.port}")
+    telemetry_timer = network_handler.createTimer(
+        args.telemetry * 1000, lambda: logging.info("\n".join(engine.telemetry.lines()))
+    )
+    if args.telemetry > 0:
+        telemetry_timer.start()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop_event.wait()
+    finally:
+        telemetry_timer.stop()
+        engine.stop()
+        network_handler.close()
+        logging.info("Server stopped")
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(format="[%(levelname)s]: %(message)s", level=arguments.log_level)
+    asyncio.run(serve(arguments))
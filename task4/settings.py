@@ -81,7 +81,6 @@ class ServerSettingsWindow(QWidget):
         try:
             self.client.gameWidget = GameWidget(
                 client_widget=self.client,
-                network_handler=self.client.networkHandler,
                 host=self.client.networkHandler.host,
                 port=self.client.networkHandler.port,
                 server_name=self.serverNameLine.text(),
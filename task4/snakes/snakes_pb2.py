@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0csnakes.proto\x12\x06snakes\"\xa0\x01\n\nGamePlayer\x12\x0c\n\x04name\x18\x01 \x02(\t\x12\n\n\x02id\x18\x02 \x02(\x05\x12\x12\n\nip_address\x18\x03 \x01(\t\x12\x0c\n\x04port\x18\x04 \x01(\x05\x12\x1e\n\x04role\x18\x05 \x02(\x0e\x32\x10.snakes.NodeRole\x12\'\n\x04type\x18\x06 \x01(\x0e\x32\x12.snakes.PlayerType:\x05HUMAN\x12\r\n\x05score\x18\x07 \x02(\x05\"i\n\nGameConfig\x12\x11\n\x05width\x18\x01 \x01(\x05:\x02\x34\x30\x12\x12\n\x06height\x18\x02 \x01(\x05:\x02\x33\x30\x12\x16\n\x0b\x66ood_static\x18\x03 \x01(\x05:\x01\x31\x12\x1c\n\x0estate_delay_ms\x18\x05 \x01(\x05:\x04\x31\x30\x30\x30\"2\n\x0bGamePlayers\x12#\n\x07players\x18\x01 \x03(\x0b\x32\x12.snakes.GamePlayer\"\x8c\x03\n\tGameState\x12\x13\n\x0bstate_order\x18\x01 \x02(\x05\x12\'\n\x06snakes\x18\x02 \x03(\x0b\x32\x17.snakes.GameState.Snake\x12&\n\x05\x66oods\x18\x03 \x03(\x0b\x32\x17.snakes.GameState.Coord\x12$\n\x07players\x18\x04 \x02(\x0b\x32\x13.snakes.GamePlayers\x1a#\n\x05\x43oord\x12\x0c\n\x01x\x18\x01 \x01(\x11:\x01\x30\x12\x0c\n\x01y\x18\x02 \x01(\x11:\x01\x30\x1a\xcd\x01\n\x05Snake\x12\x11\n\tplayer_id\x18\x01 \x02(\x05\x12\'\n\x06points\x18\x02 \x03(\x0b\x32\x17.snakes.GameState.Coord\x12\x38\n\x05state\x18\x03 \x02(\x0e\x32\".snakes.GameState.Snake.SnakeState:\x05\x41LIVE\x12)\n\x0ehead_direction\x18\x04 \x02(\x0e\x32\x11.snakes.Direction\"#\n\nSnakeState\x12\t\n\x05\x41LIVE\x10\x00\x12\n\n\x06ZOMBIE\x10\x01\"\x87\x01\n\x10GameAnnouncement\x12$\n\x07players\x18\x01 \x02(\x0b\x32\x13.snakes.GamePlayers\x12\"\n\x06\x63onfig\x18\x02 \x02(\x0b\x32\x12.snakes.GameConfig\x12\x16\n\x08\x63\x61n_join\x18\x03 \x01(\x08:\x04true\x12\x11\n\tgame_name\x18\x04 \x02(\t\"\xde\x07\n\x0bGameMessage\x12\x0f\n\x07msg_seq\x18\x01 \x02(\x03\x12\x11\n\tsender_id\x18\n \x01(\x05\x12\x13\n\x0breceiver_id\x18\x0b \x01(\x05\x12+\n\x04ping\x18\x02 \x01(\x0b\x32\x1b.snakes.GameMessage.PingMsgH\x00\x12-\n\x05steer\x18\x03 \x01(\x0b\x32\x1c.snakes.GameMessage.SteerMsgH\x00\x12)\n\x03\x61\x63k\x18\x04 \x01(\x0b\x32\x1a.snakes.GameMessage.AckMsgH\x00\x12-\n\x05state\x18\x05 \x01(\x0b\x32\x1c.snakes.GameMessage.StateMsgH\x00\x12;\n\x0c\x61nnouncement\x18\x06 \x01(\x0b\x32#.snakes.GameMessage.AnnouncementMsgH\x00\x12+\n\x04join\x18\x07 \x01(\x0b\x32\x1b.snakes.GameMessage.JoinMsgH\x00\x12-\n\x05\x65rror\x18\x08 \x01(\x0b\x32\x1c.snakes.GameMessage.ErrorMsgH\x00\x12\x38\n\x0brole_change\x18\t \x01(\x0b\x32!.snakes.GameMessage.RoleChangeMsgH\x00\x12\x33\n\x08\x64iscover\x18\x0c \x01(\x0b\x32\x1f.snakes.GameMessage.DiscoverMsgH\x00\x1a\t\n\x07PingMsg\x1a\x30\n\x08SteerMsg\x12$\n\tdirection\x18\x01 \x02(\x0e\x32\x11.snakes.Direction\x1a\x08\n\x06\x41\x63kMsg\x1a,\n\x08StateMsg\x12 \n\x05state\x18\x01 \x02(\x0b\x32\x11.snakes.GameState\x1a:\n\x0f\x41nnouncementMsg\x12\'\n\x05games\x18\x01 \x03(\x0b\x32\x18.snakes.GameAnnouncement\x1a\r\n\x0b\x44iscoverMsg\x1a\x8b\x01\n\x07JoinMsg\x12.\n\x0bplayer_type\x18\x01 \x01(\x0e\x32\x12.snakes.PlayerType:\x05HUMAN\x12\x13\n\x0bplayer_name\x18\x03 \x02(\t\x12\x11\n\tgame_name\x18\x04 \x02(\t\x12(\n\x0erequested_role\x18\x05 \x02(\x0e\x32\x10.snakes.NodeRole\x1a!\n\x08\x45rrorMsg\x12\x15\n\rerror_message\x18\x01 \x02(\t\x1a_\n\rRoleChangeMsg\x12%\n\x0bsender_role\x18\x01 \x01(\x0e\x32\x10.snakes.NodeRole\x12\'\n\rreceiver_role\x18\x02 \x01(\x0e\x32\x10.snakes.NodeRoleB\x06\n\x04Type*:\n\x08NodeRole\x12\n\n\x06NORMAL\x10\x00\x12\n\n\x06MASTER\x10\x01\x12\n\n\x06\x44\x45PUTY\x10\x02\x12\n\n\x06VIEWER\x10\x03*\"\n\nPlayerType\x12\t\n\x05HUMAN\x10\x00\x12\t\n\x05ROBOT\x10\x01*2\n\tDirection\x12\x06\n\x02UP\x10\x01\x12\x08\n\x04\x44OWN\x10\x02\x12\x08\n\x04LEFT\x10\x03\x12\t\n\x05RIGHT\x10\x04\x42&\n\x17me.ippolitov.fit.snakesB\x0bSnakesProto')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0csnakes.proto\x12\x06snakes\"\xac\x02\n\nGamePlayer\x12\x0c\n\x04name\x18\x01 \x02(\t\x12\n\n\x02id\x18\x02 \x02(\x05\x12\x12\n\nip_address\x18\x03 \x01(\t\x12\x0c\n\x04port\x18\x04 \x01(\x05\x12\x1e\n\x04role\x18\x05 \x02(\x0e\x32\x10.snakes.NodeRole\x12\'\n\x04type\x18\x06 \x01(\x0e\x32\x12.snakes.PlayerType:\x05HUMAN\x12\r\n\x05score\x18\x07 \x02(\x05\x12#\n\x14supports_state_delta\x18\x64 \x01(\x08:\x05\x66\x61lse\x12$\n\x15supports_state_chunks\x18\x65 \x01(\x08:\x05\x66\x61lse\x12 \n\x11supports_lockstep\x18\x66 \x01(\x08:\x05\x66\x61lse\x12\x1d\n\x0esupports_relay\x18g \x01(\x08:\x05\x66\x61lse\"i\n\nGameConfig\x12\x11\n\x05width\x18\x01 \x01(\x05:\x02\x34\x30\x12\x12\n\x06height\x18\x02 \x01(\x05:\x02\x33\x30\x12\x16\n\x0b\x66ood_static\x18\x03 \x01(\x05:\x01\x31\x12\x1c\n\x0estate_delay_ms\x18\x05 \x01(\x05:\x04\x31\x30\x30\x30\"2\n\x0bGamePlayers\x12#\n\x07players\x18\x01 \x03(\x0b\x32\x12.snakes.GamePlayer\"\x8c\x03\n\tGameState\x12\x13\n\x0bstate_order\x18\x01 \x02(\x05\x12\'\n\x06snakes\x18\x02 \x03(\x0b\x32\x17.snakes.GameState.Snake\x12&\n\x05\x66oods\x18\x03 \x03(\x0b\x32\x17.snakes.GameState.Coord\x12$\n\x07players\x18\x04 \x02(\x0b\x32\x13.snakes.GamePlayers\x1a#\n\x05\x43oord\x12\x0c\n\x01x\x18\x01 \x01(\x11:\x01\x30\x12\x0c\n\x01y\x18\x02 \x01(\x11:\x01\x30\x1a\xcd\x01\n\x05Snake\x12\x11\n\tplayer_id\x18\x01 \x02(\x05\x12\'\n\x06points\x18\x02 \x03(\x0b\x32\x17.snakes.GameState.Coord\x12\x38\n\x05state\x18\x03 \x02(\x0e\x32\".snakes.GameState.Snake.SnakeState:\x05\x41LIVE\x12)\n\x0ehead_direction\x18\x04 \x02(\x0e\x32\x11.snakes.Direction\"#\n\nSnakeState\x12\t\n\x05\x41LIVE\x10\x00\x12\n\n\x06ZOMBIE\x10\x01\"\xaa\x04\n\x0eGameStateDelta\x12\x13\n\x0bstate_order\x18\x01 \x02(\x05\x12\x18\n\x10\x62\x61se_state_order\x18\x02 \x02(\x05\x12\x37\n\x0cmoved_snakes\x18\x03 \x03(\x0b\x32!.snakes.GameStateDelta.SnakeDelta\x12+\n\nnew_snakes\x18\x04 \x03(\x0b\x32\x17.snakes.GameState.Snake\x12\x16\n\x0eremoved_snakes\x18\x05 \x03(\x05\x12,\n\x0b\x61\x64\x64\x65\x64_foods\x18\x06 \x03(\x0b\x32\x17.snakes.GameState.Coord\x12.\n\rremoved_foods\x18\x07 \x03(\x0b\x32\x17.snakes.GameState.Coord\x12+\n\x0f\x63hanged_players\x18\x08 \x03(\x0b\x32\x12.snakes.GamePlayer\x12\x17\n\x0fremoved_players\x18\t \x03(\x05\x1a\xc6\x01\n\nSnakeDelta\x12\x11\n\tplayer_id\x18\x01 \x02(\x05\x12%\n\x04head\x18\x02 \x02(\x0b\x32\x17.snakes.GameState.Coord\x12)\n\x0ehead_direction\x18\x03 \x02(\x0e\x32\x11.snakes.Direction\x12\x38\n\x05state\x18\x04 \x01(\x0e\x32\".snakes.GameState.Snake.SnakeState:\x05\x41LIVE\x12\x19\n\x0etail_retracted\x18\x05 \x01(\x05:\x01\x31\"\x87\x01\n\x10GameAnnouncement\x12$\n\x07players\x18\x01 \x02(\x0b\x32\x13.snakes.GamePlayers\x12\"\n\x06\x63onfig\x18\x02 \x02(\x0b\x32\x12.snakes.GameConfig\x12\x16\n\x08\x63\x61n_join\x18\x03 \x01(\x08:\x04true\x12\x11\n\tgame_name\x18\x04 \x02(\t\"\xad\x10\n\x0bGameMessage\x12\x0f\n\x07msg_seq\x18\x01 \x02(\x03\x12\x11\n\tsender_id\x18\n \x01(\x05\x12\x13\n\x0breceiver_id\x18\x0b \x01(\x05\x12+\n\x04ping\x18\x02 \x01(\x0b\x32\x1b.snakes.GameMessage.PingMsgH\x00\x12-\n\x05steer\x18\x03 \x01(\x0b\x32\x1c.snakes.GameMessage.SteerMsgH\x00\x12)\n\x03\x61\x63k\x18\x04 \x01(\x0b\x32\x1a.snakes.GameMessage.AckMsgH\x00\x12-\n\x05state\x18\x05 \x01(\x0b\x32\x1c.snakes.GameMessage.StateMsgH\x00\x12;\n\x0c\x61nnouncement\x18\x06 \x01(\x0b\x32#.snakes.GameMessage.AnnouncementMsgH\x00\x12+\n\x04join\x18\x07 \x01(\x0b\x32\x1b.snakes.GameMessage.JoinMsgH\x00\x12-\n\x05\x65rror\x18\x08 \x01(\x0b\x32\x1c.snakes.GameMessage.ErrorMsgH\x00\x12\x38\n\x0brole_change\x18\t \x01(\x0b\x32!.snakes.GameMessage.RoleChangeMsgH\x00\x12\x33\n\x08\x64iscover\x18\x0c \x01(\x0b\x32\x1f.snakes.GameMessage.DiscoverMsgH\x00\x12\x38\n\x0bstate_delta\x18\x64 \x01(\x0b\x32!.snakes.GameMessage.StateDeltaMsgH\x00\x12\x33\n\x08viewport\x18\x65 \x01(\x0b\x32\x1f.snakes.GameMessage.ViewportMsgH\x00\x12/\n\x06inputs\x18\x66 \x01(\x0b\x32\x1d.snakes.GameMessage.InputsMsgH\x00\x12/\n\x06resync\x18g \x01(\x0b\x32\x1d.snakes.GameMessage.ResyncMsgH\x00\x12-\n\x05relay\x18h \x01(\x0b\x32\x1c.snakes.GameMessage.RelayMsgH\x00\x12\x31\n\x07standby\x18i \x01(\x0b\x32\x1e.snakes.GameMessage.StandbyMsgH\x00\x1a\t\n\x07PingMsg\x1a\x30\n\x08SteerMsg\x12$\n\tdirection\x18\x01 \x02(\x0e\x32\x11.snakes.Direction\x1a\x08\n\x06\x41\x63kMsg\x1at\n\x08StateMsg\x12 \n\x05state\x18\x01 \x02(\x0b\x32\x11.snakes.GameState\x12\x16\n\x0b\x63hunk_index\x18\x64 \x01(\x05:\x01\x30\x12\x16\n\x0b\x63hunk_count\x18\x65 \x01(\x05:\x01\x31\x12\x16\n\x07partial\x18\x66 \x01(\x08:\x05\x66\x61lse\x1a:\n\x0f\x41nnouncementMsg\x12\'\n\x05games\x18\x01 \x03(\x0b\x32\x18.snakes.GameAnnouncement\x1a\r\n\x0b\x44iscoverMsg\x1a\x97\x02\n\x07JoinMsg\x12.\n\x0bplayer_type\x18\x01 \x01(\x0e\x32\x12.snakes.PlayerType:\x05HUMAN\x12\x13\n\x0bplayer_name\x18\x03 \x02(\t\x12\x11\n\tgame_name\x18\x04 \x02(\t\x12(\n\x0erequested_role\x18\x05 \x02(\x0e\x32\x10.snakes.NodeRole\x12#\n\x14supports_state_delta\x18\x64 \x01(\x08:\x05\x66\x61lse\x12$\n\x15supports_state_chunks\x18\x65 \x01(\x08:\x05\x66\x61lse\x12 \n\x11supports_lockstep\x18\x66 \x01(\x08:\x05\x66\x61lse\x12\x1d\n\x0esupports_relay\x18g \x01(\x08:\x05\x66\x61lse\x1a!\n\x08\x45rrorMsg\x12\x15\n\rerror_message\x18\x01 \x02(\t\x1a_\n\rRoleChangeMsg\x12%\n\x0bsender_role\x18\x01 \x01(\x0e\x32\x10.snakes.NodeRole\x12\'\n\rreceiver_role\x18\x02 \x01(\x0e\x32\x10.snakes.NodeRole\x1a\x36\n\rStateDeltaMsg\x12%\n\x05\x64\x65lta\x18\x01 \x02(\x0b\x32\x16.snakes.GameStateDelta\x1a\x42\n\x0bViewportMsg\x12\t\n\x01x\x18\x01 \x02(\x05\x12\t\n\x01y\x18\x02 \x02(\x05\x12\r\n\x05width\x18\x03 \x02(\x05\x12\x0e\n\x06height\x18\x04 \x02(\x05\x1a\x8f\x02\n\tInputsMsg\x12\x13\n\x0bstate_order\x18\x01 \x02(\x05\x12\x0c\n\x04seed\x18\x02 \x02(\x03\x12\x11\n\tbase_hash\x18\x03 \x02(\x06\x12\x33\n\x06steers\x18\x04 \x03(\x0b\x32#.snakes.GameMessage.InputsMsg.Steer\x12\x0f\n\x07zombies\x18\x05 \x03(\x05\x12+\n\x0f\x63hanged_players\x18\x06 \x03(\x0b\x32\x12.snakes.GamePlayer\x12\x17\n\x0fremoved_players\x18\x07 \x03(\x05\x1a@\n\x05Steer\x12\x11\n\tplayer_id\x18\x01 \x02(\x05\x12$\n\tdirection\x18\x02 \x02(\x0e\x32\x11.snakes.Direction\x1a\x0b\n\tResyncMsg\x1a-\n\x08RelayMsg\x12\x13\n\x07targets\x18\x01 \x03(\x05\x42\x02\x10\x01\x12\x0c\n\x04\x62ody\x18\x02 \x02(\x0c\x1a|\n\nStandbyMsg\x12\x13\n\x0bstate_order\x18\x01 \x02(\x05\x12\x0c\n\x04seed\x18\x02 \x02(\x03\x12\x16\n\x0enext_player_id\x18\x03 \x02(\x05\x12\x33\n\x06steers\x18\x04 \x03(\x0b\x32#.snakes.GameMessage.InputsMsg.SteerB\x06\n\x04Type*:\n\x08NodeRole\x12\n\n\x06NORMAL\x10\x00\x12\n\n\x06MASTER\x10\x01\x12\n\n\x06\x44\x45PUTY\x10\x02\x12\n\n\x06VIEWER\x10\x03*\"\n\nPlayerType\x12\t\n\x05HUMAN\x10\x00\x12\t\n\x05ROBOT\x10\x01*2\n\tDirection\x12\x06\n\x02UP\x10\x01\x12\x08\n\x04\x44OWN\x10\x02\x12\x08\n\x04LEFT\x10\x03\x12\t\n\x05RIGHT\x10\x04\x42&\n\x17me.ippolitov.fit.snakesB\x0bSnakesProto')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,46 +32,65 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'snakes_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._loaded_options = None
   _globals['DESCRIPTOR']._serialized_options = b'\n\027me.ippolitov.fit.snakesB\013SnakesProto'
-  _globals['_NODEROLE']._serialized_start=1876
-  _globals['_NODEROLE']._serialized_end=1934
-  _globals['_PLAYERTYPE']._serialized_start=1936
-  _globals['_PLAYERTYPE']._serialized_end=1970
-  _globals['_DIRECTION']._serialized_start=1972
-  _globals['_DIRECTION']._serialized_end=2022
+  _globals['_GAMEMESSAGE_RELAYMSG']._loaded_options = None
+  _globals['_NODEROLE']._serialized_start=3676
+  _globals['_NODEROLE']._serialized_end=3734
+  _globals['_PLAYERTYPE']._serialized_start=3736
+  _globals['_PLAYERTYPE']._serialized_end=3770
+  _globals['_DIRECTION']._serialized_start=3772
+  _globals['_DIRECTION']._serialized_end=3822
   _globals['_GAMEPLAYER']._serialized_start=25
-  _globals['_GAMEPLAYER']._serialized_end=185
-  _globals['_GAMECONFIG']._serialized_start=187
-  _globals['_GAMECONFIG']._serialized_end=292
-  _globals['_GAMEPLAYERS']._serialized_start=294
-  _globals['_GAMEPLAYERS']._serialized_end=344
-  _globals['_GAMESTATE']._serialized_start=347
-  _globals['_GAMESTATE']._serialized_end=743
-  _globals['_GAMESTATE_COORD']._serialized_start=500
-  _globals['_GAMESTATE_COORD']._serialized_end=535
-  _globals['_GAMESTATE_SNAKE']._serialized_start=538
-  _globals['_GAMESTATE_SNAKE']._serialized_end=743
-  _globals['_GAMESTATE_SNAKE_SNAKESTATE']._serialized_start=708
-  _globals['_GAMESTATE_SNAKE_SNAKESTATE']._serialized_end=743
-  _globals['_GAMEANNOUNCEMENT']._serialized_start=746
-  _globals['_GAMEANNOUNCEMENT']._serialized_end=881
-  _globals['_GAMEMESSAGE']._serialized_start=884
-  _globals['_GAMEMESSAGE']._serialized_end=1874
-  _globals['_GAMEMESSAGE_PINGMSG']._serialized_start=1402
-  _globals['_GAMEMESSAGE_PINGMSG']._serialized_end=1411
-  _globals['_GAMEMESSAGE_STEERMSG']._serialized_start=1413
-  _globals['_GAMEMESSAGE_STEERMSG']._serialized_end=1461
-  _globals['_GAMEMESSAGE_ACKMSG']._serialized_start=1463
-  _globals['_GAMEMESSAGE_ACKMSG']._serialized_end=1471
-  _globals['_GAMEMESSAGE_STATEMSG']._serialized_start=1473
-  _globals['_GAMEMESSAGE_STATEMSG']._serialized_end=1517
-  _globals['_GAMEMESSAGE_ANNOUNCEMENTMSG']._serialized_start=1519
-  _globals['_GAMEMESSAGE_ANNOUNCEMENTMSG']._serialized_end=1577
-  _globals['_GAMEMESSAGE_DISCOVERMSG']._serialized_start=1579
-  _globals['_GAMEMESSAGE_DISCOVERMSG']._serialized_end=1592
-  _globals['_GAMEMESSAGE_JOINMSG']._serialized_start=1595
-  _globals['_GAMEMESSAGE_JOINMSG']._serialized_end=1734
-  _globals['_GAMEMESSAGE_ERRORMSG']._serialized_start=1736
-  _globals['_GAMEMESSAGE_ERRORMSG']._serialized_end=1769
-  _globals['_GAMEMESSAGE_ROLECHANGEMSG']._serialized_start=1771
-  _globals['_GAMEMESSAGE_ROLECHANGEMSG']._serialized_end=1866
+  _globals['_GAMEPLAYER']._serialized_end=325
+  _globals['_GAMECONFIG']._serialized_start=327
+  _globals['_GAMECONFIG']._serialized_end=432
+  _globals['_GAMEPLAYERS']._serialized_start=434
+  _globals['_GAMEPLAYERS']._serialized_end=484
+  _globals['_GAMESTATE']._serialized_start=487
+  _globals['_GAMESTATE']._serialized_end=883
+  _globals['_GAMESTATE_COORD']._serialized_start=640
+  _globals['_GAMESTATE_COORD']._serialized_end=675
+  _globals['_GAMESTATE_SNAKE']._serialized_start=678
+  _globals['_GAMESTATE_SNAKE']._serialized_end=883
+  _globals['_GAMESTATE_SNAKE_SNAKESTATE']._serialized_start=848
+  _globals['_GAMESTATE_SNAKE_SNAKESTATE']._serialized_end=883
+  _globals['_GAMESTATEDELTA']._serialized_start=886
+  _globals['_GAMESTATEDELTA']._serialized_end=1440
+  _globals['_GAMESTATEDELTA_SNAKEDELTA']._serialized_start=1242
+  _globals['_GAMESTATEDELTA_SNAKEDELTA']._serialized_end=1440
+  _globals['_GAMEANNOUNCEMENT']._serialized_start=1443
+  _globals['_GAMEANNOUNCEMENT']._serialized_end=1578
+  _globals['_GAMEMESSAGE']._serialized_start=1581
+  _globals['_GAMEMESSAGE']._serialized_end=3674
+  _globals['_GAMEMESSAGE_PINGMSG']._serialized_start=2406
+  _globals['_GAMEMESSAGE_PINGMSG']._serialized_end=2415
+  _globals['_GAMEMESSAGE_STEERMSG']._serialized_start=2417
+  _globals['_GAMEMESSAGE_STEERMSG']._serialized_end=2465
+  _globals['_GAMEMESSAGE_ACKMSG']._serialized_start=2467
+  _globals['_GAMEMESSAGE_ACKMSG']._serialized_end=2475
+  _globals['_GAMEMESSAGE_STATEMSG']._serialized_start=2477
+  _globals['_GAMEMESSAGE_STATEMSG']._serialized_end=2593
+  _globals['_GAMEMESSAGE_ANNOUNCEMENTMSG']._serialized_start=2595
+  _globals['_GAMEMESSAGE_ANNOUNCEMENTMSG']._serialized_end=2653
+  _globals['_GAMEMESSAGE_DISCOVERMSG']._serialized_start=2655
+  _globals['_GAMEMESSAGE_DISCOVERMSG']._serialized_end=2668
+  _globals['_GAMEMESSAGE_JOINMSG']._serialized_start=2671
+  _globals['_GAMEMESSAGE_JOINMSG']._serialized_end=2950
+  _globals['_GAMEMESSAGE_ERRORMSG']._serialized_start=2952
+  _globals['_GAMEMESSAGE_ERRORMSG']._serialized_end=2985
+  _globals['_GAMEMESSAGE_ROLECHANGEMSG']._serialized_start=2987
+  _globals['_GAMEMESSAGE_ROLECHANGEMSG']._serialized_end=3082
+  _globals['_GAMEMESSAGE_STATEDELTAMSG']._serialized_start=3084
+  _globals['_GAMEMESSAGE_STATEDELTAMSG']._serialized_end=3138
+  _globals['_GAMEMESSAGE_VIEWPORTMSG']._serialized_start=3140
+  _globals['_GAMEMESSAGE_VIEWPORTMSG']._serialized_end=3206
+  _globals['_GAMEMESSAGE_INPUTSMSG']._serialized_start=3209
+  _globals['_GAMEMESSAGE_INPUTSMSG']._serialized_end=3480
+  _globals['_GAMEMESSAGE_INPUTSMSG_STEER']._serialized_start=3416
+  _globals['_GAMEMESSAGE_INPUTSMSG_STEER']._serialized_end=3480
+  _globals['_GAMEMESSAGE_RESYNCMSG']._serialized_start=3482
+  _globals['_GAMEMESSAGE_RESYNCMSG']._serialized_end=3493
+  _globals['_GAMEMESSAGE_RELAYMSG']._serialized_start=3495
+  _globals['_GAMEMESSAGE_RELAYMSG']._serialized_end=3540
+  _globals['_GAMEMESSAGE_STANDBYMSG']._serialized_start=3542
+  _globals['_GAMEMESSAGE_STANDBYMSG']._serialized_end=3666
 # @@protoc_insertion_point(module_scope)
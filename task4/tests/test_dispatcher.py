@@ -0,0 +1,35 @@
+import snakes.snakes_pb2 as snakes
+from transport import Datagram, MessageDispatcher
+
+
+def announcement(name: str) -> Datagram:
+    message = snakes.GameMessage(
+        msg_seq=1,
+        announcement=snakes.GameMessage.AnnouncementMsg(games=[snakes.GameAnnouncement(
+            game_name=name, players=snakes.GamePlayers(), config=snakes.GameConfig()
+        )])
+    )
+    return Datagram(message.SerializeToString(), "127.0.0.1", 5000)
+
+
+def test_known_datagrams_skip_the_handler():
+    dispatcher = MessageDispatcher()
+    seen = set()
+    calls = list()
+
+    def known(data: bytes, host: str, port: int) -> bool:
+        return data in seen
+
+    def handler(message: snakes.GameMessage, host: str, port: int, data: bytes) -> None:
+        calls.append((message.announcement.games[0].game_name, host, port))
+        seen.add(data)
+
+    dispatcher.addHandler("announcement", handler, known=known)
+    dispatcher.dispatch(announcement("a"))
+    dispatcher.dispatch(announcement("a"))
+    dispatcher.dispatch(announcement("b"))
+    assert calls == [("a", "127.0.0.1", 5000), ("b", "127.0.0.1", 5000)]
+
+    dispatcher.removeHandler("announcement", handler)
+    dispatcher.dispatch(announcement("c"))
+    assert len(calls) == 2
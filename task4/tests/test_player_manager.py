@@ -0,0 +1,38 @@
+import snakes.snakes_pb2 as snakes
+from game.player_manager import Player, PlayerManager
+
+
+def makeManager() -> PlayerManager:
+    client = Player(name="client", id=0, ip_address="127.0.0.1", port=1000, role=snakes.MASTER, is_client=True)
+    return PlayerManager(client, None)
+
+
+def test_duplicate_id_replaces_the_shadowed_player():
+    manager = makeManager()
+    first = Player(name="first", id=1, ip_address="127.0.0.1", port=1001, role=snakes.DEPUTY)
+    second = Player(name="second", id=1, ip_address="127.0.0.1", port=1002)
+    manager.addPlayer(first)
+    manager.addPlayer(second)
+
+    assert manager.getPlayerByID(1) is second
+    assert first not in manager.getPlayers()
+    assert manager.getDeputy() is None
+
+    manager.removePlayerByID(1)
+    assert manager.getPlayers() == {manager.client_player}
+    assert manager.getPlayersWithRole(snakes.NORMAL) == set()
+
+
+def test_client_keeps_its_id():
+    manager = makeManager()
+    stray = Player(name="stray", id=5, ip_address="127.0.0.1", port=1003, role=snakes.VIEWER)
+    manager.addPlayer(stray)
+    manager.client_player.id = 5
+
+    assert manager.getPlayerByID(5) is manager.client_player
+    assert manager.getPlayers() == {manager.client_player}
+    assert manager.getPlayersWithRole(snakes.VIEWER) == set()
+
+    manager.addPlayer(Player(name="late", id=5, ip_address="127.0.0.1", port=1004))
+    assert manager.getPlayerByID(5) is manager.client_player
+    assert manager.getPlayers() == {manager.client_player}
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Tuple
+
+import snakes.snakes_pb2 as snakes
+from game.engine import GameEngine
+from headless_network import AsyncioNetworkHandler
+from transport import peekMessageType
+
+
+
+class DeltaDroppingHandler(AsyncioNetworkHandler):
+    """Loses the first state delta that arrives once armed."""
+    armed = False
+    dropped_order = None
+
+    def onDatagram(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if self.armed and peekMessageType(data) == "state_delta":
+            message = snakes.GameMessage()
+            message.ParseFromString(data)
+            self.armed = False
+            self.dropped_order = message.state_delta.delta.state_order
+            return
+        super().onDatagram(data, addr)
+
+
+async def runGame() -> Tuple[GameEngine, DeltaDroppingHandler, GameEngine]:
+    master_handler = await AsyncioNetworkHandler.create(listen_multicast=False)
+    master = GameEngine("delta", 40, 30, 5, 100, master_handler, "master", snakes.MASTER, None, lambda: None)
+    # Without a resync the client would wait for the next keyframe, long after the test ends.
+    master.KEYFRAME_INTERVAL = 1000
+    master.start(True, master_handler.host, master_handler.port, host_plays=False)
+    client_handler = await DeltaDroppingHandler.create(listen_multicast=False)
+    client = GameEngine("delta", 40, 30, 5, 100, client_handler, "client", snakes.NORMAL,
+                        snakes.GamePlayers(players=master.player_manager.asMsg()), lambda: None)
+    client.start(False, "127.0.0.1", master_handler.port)
+    try:
+        await asyncio.sleep(1)
+        client_handler.armed = True
+        await asyncio.sleep(1)
+    finally:
+        client.stop()
+        master.stop()
+        client_handler.close()
+        master_handler.close()
+    return master, client_handler, client
+
+
+def test_lost_delta_is_followed_by_a_full_state():
+    master, client_handler, client = asyncio.run(runGame())
+
+    assert client_handler.dropped_order is not None
+    assert client.state_order > client_handler.dropped_order
+    assert client.state_order >= master.state_order - 2
@@ -0,0 +1,78 @@
+import asyncio
+from typing import List
+
+import snakes.snakes_pb2 as snakes
+from bots import Swarm, Viewer
+from game.engine import GameEngine
+from game.field_manager import FieldManager
+from headless_network import AsyncioNetworkHandler
+
+
+WIDTH, HEIGHT = 40, 40
+VIEWPORT = (0, 0, 16, 16)
+
+
+
+class RecordingViewer(Viewer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.states: List[snakes.GameMessage.StateMsg] = list()
+
+    def _onState(self, message: snakes.GameMessage) -> None:
+        super()._onState(message)
+        self.states.append(message.state)
+
+
+async def runGame(seconds: float) -> RecordingViewer:
+    network_handler = await AsyncioNetworkHandler.create(listen_multicast=False)
+    engine = GameEngine(
+        game_name="viewport",
+        field_width=WIDTH,
+        field_height=HEIGHT,
+        food_static=30,
+        state_delay_ms=100,
+        network_handler=network_handler,
+        client_name="viewport",
+        client_requested_role=snakes.NodeRole.MASTER,
+        existing_players=None,
+        update_callback=lambda: None
+    )
+    engine.OVERVIEW_INTERVAL = 5
+    engine.start(is_host=True, master_host=network_handler.host, master_port=network_handler.port,
+                 host_plays=False)
+    swarm = Swarm((network_handler.host, network_handler.port), "viewport", search_limit=64)
+    try:
+        await swarm.discover()
+        await swarm.spawnBots(8, rate=100)
+        viewer_handler = await AsyncioNetworkHandler.create(listen_multicast=False)
+        viewer = RecordingViewer(swarm, viewer_handler, name="viewer", viewport=VIEWPORT)
+        swarm.bots.append(viewer)
+        viewer.start()
+        await asyncio.sleep(seconds)
+    finally:
+        swarm.stop()
+        engine.stop()
+        network_handler.close()
+    return viewer
+
+
+def inViewport(x: int, y: int) -> bool:
+    left, top, width, height = VIEWPORT
+    return (x - left) % WIDTH < width and (y - top) % HEIGHT < height
+
+
+def test_viewer_gets_its_region_and_an_overview():
+    viewer = asyncio.run(runGame(2))
+
+    partial = [state for state in viewer.states if state.partial]
+    full = [state for state in viewer.states if not state.partial]
+    assert len(partial) > 0
+    assert len(full) > 0
+    for state in partial:
+        assert all(inViewport(food.x, food.y) for food in state.state.foods)
+        field = FieldManager(width=WIDTH, height=HEIGHT, food_static=0)
+        field.snakesFromMsg(state.state.snakes)
+        for snake in field.getSnakes():
+            cells = [(snake.head_x, snake.head_y)] + list(snake.tail)
+            # The region is looked up in whole buckets, which VIEWPORT is aligned to.
+            assert any(inViewport(x % WIDTH, y % HEIGHT) for x, y in cells)
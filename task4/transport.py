@@ -0,0 +1,161 @@
+import socket
+from typing import Callable, Dict, List, Tuple, Union
+
+import snakes.snakes_pb2 as snakes
+
+
+MULTICAST_GROUP = "224.0.0.1"
+MULTICAST_PORT = 9192
+
+
+
+class Subscriber:
+    def notify(self, datagram):
+        pass
+
+
+
+class HostAddress:
+    def __init__(self, address: str):
+        self._address = address
+
+    def toString(self) -> str:
+        return self._address
+
+
+
+class Datagram:
+    """Qt-free stand-in for the part of QNetworkDatagram that subscribers use."""
+
+    def __init__(self, data: bytes, host: str, port: int):
+        self._data = data
+        self._sender_address = HostAddress(host)
+        self._sender_port = port
+
+    def data(self) -> bytes:
+        return self._data
+
+    def senderAddress(self) -> HostAddress:
+        return self._sender_address
+
+    def senderPort(self) -> int:
+        return self._sender_port
+
+
+def senderOf(datagram) -> Tuple[str, int]:
+    return datagram.senderAddress().toString().replace("::ffff:", ""), datagram.senderPort()
+
+
+_TYPE_BY_FIELD_NUMBER = {
+    field.number: field.name for field in snakes.GameMessage.DESCRIPTOR.oneofs_by_name["Type"].fields
+}
+
+
+def _readVarint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def peekMessageType(data: bytes) -> Union[str, None]:
+    """Name of the Type oneof field set in a serialized GameMessage, found by skipping over the
+    top-level fields without decoding them. None if the bytes are not a GameMessage."""
+    message_type = None
+    offset = 0
+    try:
+        while offset < len(data):
+            tag, offset = _readVarint(data, offset)
+            wire_type = tag & 0x7
+            if wire_type == 0:
+                _, offset = _readVarint(data, offset)
+            elif wire_type == 1:
+                offset += 8
+            elif wire_type == 2:
+                length, offset = _readVarint(data, offset)
+                offset += length
+            elif wire_type == 5:
+                offset += 4
+            else:
+                return None
+            # Like the parser, the last oneof field wins.
+            message_type = _TYPE_BY_FIELD_NUMBER.get(tag >> 3, message_type)
+    except IndexError:
+        return None
+    if offset != len(data):
+        return None
+    return message_type
+
+
+
+class MessageDispatcher:
+    """Parses each datagram at most once and hands it to the handlers registered for its type.
+
+    Handlers are called as handler(message, host, port) with the sender address already normalized.
+    Datagrams of a type nobody handles are dropped before they are decoded. A handler registered with
+    a known(data, host, port) check is skipped when the check recognizes the raw datagram, and is
+    otherwise called as handler(message, host, port, data)."""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Tuple[Callable, Union[Callable, None]]]] = dict()
+
+    def addHandler(self, message_type: str, handler: Callable, known: Union[Callable, None] = None) -> None:
+        self._handlers.setdefault(message_type, list()).append((handler, known))
+
+    def removeHandler(self, message_type: str, handler: Callable) -> None:
+        handlers = self._handlers.get(message_type)
+        if handlers is None:
+            return
+        handlers[:] = [entry for entry in handlers if entry[0] != handler]
+        if len(handlers) == 0:
+            self._handlers.pop(message_type)
+
+    def dispatch(self, datagram) -> None:
+        if len(self._handlers) == 0:
+            return
+        data = bytes(datagram.data())
+        handlers = self._handlers.get(peekMessageType(data))
+        if handlers is None:
+            return
+        host, port = senderOf(datagram)
+        # A handler may unregister itself while being called.
+        pending = list()
+        for handler, known in tuple(handlers):
+            try:
+                if known is None or not known(data, host, port):
+                    pending.append((handler, known))
+            except Exception as e:
+                print("dispatch", e)
+        if len(pending) == 0:
+            return
+        message = snakes.GameMessage()
+        try:
+            message.ParseFromString(data)
+        except Exception as e:
+            print("dispatch", e)
+            return
+        for handler, known in pending:
+            try:
+                if known is None:
+                    handler(message, host, port)
+                else:
+                    handler(message, host, port, data)
+            except Exception as e:
+                print("dispatch", e)
+
+
+def localHost() -> str:
+    local_hostname = socket.gethostname()
+    try:
+        ip_addresses = socket.gethostbyname_ex(local_hostname)[2]
+    except socket.gaierror:
+        ip_addresses = list()
+    filtered_ips = [ip for ip in ip_addresses if not ip.startswith("127.")]
+    if len(filtered_ips) == 0:
+        return "127.0.0.1"
+    return filtered_ips[0]